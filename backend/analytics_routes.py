@@ -0,0 +1,197 @@
+# 销售分析API
+# 从销售汇总表读取按天/小时、分类、图书统计的报表，以及按已有订单回填汇总表的命令
+# 汇总表随下单、取消订单的增量更新仍在 app.py 中；本模块由 app.py 末尾导入，向 app 注册路由和命令
+
+import os
+import click
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from data_access import SelectQuery
+from app import (
+    app, db, make_response, parse_page_limit,
+    SALES_GRANULARITIES, SALES_ROLLUPS_MISSING_MESSAGE, sales_rollups_available
+)
+
+SALES_GROUP_BY = ('day', 'hour', 'category', 'book')
+# 默认统计最近多少天
+ANALYTICS_DEFAULT_DAYS = 30
+# 按小时统计时最长的日期范围（天）
+ANALYTICS_MAX_HOURLY_DAYS = 31
+ANALYTICS_BOOK_DEFAULT_LIMIT = 50
+ANALYTICS_BOOK_MAX_LIMIT = 500
+# 回填时每批处理的天数
+SALES_BACKFILL_CHUNK_DAYS = int(os.getenv('SALES_BACKFILL_CHUNK_DAYS', '7'))
+
+# 报表查询：按天/小时读取全部订单维度，按分类/图书读取对应维度的日汇总
+SALES_PERIOD_FIELDS = {
+    'period': ('period_start', None),
+    'revenue': ('revenue', None),
+    'units': ('units', None),
+    'order_count': ('order_count', None)
+}
+SALES_BY_PERIOD = SelectQuery(SALES_PERIOD_FIELDS, """
+    FROM sales_rollups
+""", """
+    WHERE granularity = :granularity AND dimension = 'all'
+      AND period_start >= :start AND period_start < :end
+    ORDER BY period_start
+""")
+SALES_BY_CATEGORY = SelectQuery({
+    'category_id': ('r.dimension_id', None),
+    'category': ('c.name', None),
+    'revenue': ('SUM(r.revenue)', None),
+    'units': ('SUM(r.units)', int),
+    'order_count': ('SUM(r.order_count)', int)
+}, """
+    FROM sales_rollups r
+    LEFT JOIN categories c ON r.dimension_id = c.id
+""", """
+    WHERE r.granularity = 'day' AND r.dimension = 'category'
+      AND r.period_start >= :start AND r.period_start < :end
+    GROUP BY r.dimension_id, c.name
+    ORDER BY revenue DESC
+""")
+SALES_BY_BOOK = SelectQuery({
+    'book_id': ('r.dimension_id', None),
+    'title': ('b.title', None),
+    'author': ('b.author', None),
+    'revenue': ('SUM(r.revenue)', None),
+    'units': ('SUM(r.units)', int),
+    'order_count': ('SUM(r.order_count)', int)
+}, """
+    FROM sales_rollups r
+    LEFT JOIN books b ON r.dimension_id = b.id
+""", """
+    WHERE r.granularity = 'day' AND r.dimension = 'book'
+      AND r.period_start >= :start AND r.period_start < :end
+    GROUP BY r.dimension_id, b.title, b.author
+    ORDER BY revenue DESC
+    LIMIT :limit
+""")
+SALES_TOTALS_STATEMENT = text("""
+    SELECT COALESCE(SUM(revenue), 0), COALESCE(SUM(units), 0), COALESCE(SUM(order_count), 0)
+    FROM sales_rollups
+    WHERE granularity = 'day' AND dimension = 'all'
+      AND period_start >= :start AND period_start < :end
+""")
+
+# 解析报表日期范围（YYYY-MM-DD，包含结束日期），返回 [start, end) 的 datetime
+def parse_sales_date_range(from_value, to_value):
+    try:
+        end_date = datetime.strptime(to_value, '%Y-%m-%d') if to_value else datetime.now().replace(
+            hour=0, minute=0, second=0, microsecond=0)
+        start_date = datetime.strptime(from_value, '%Y-%m-%d') if from_value else \
+            end_date - timedelta(days=ANALYTICS_DEFAULT_DAYS - 1)
+    except ValueError:
+        raise ValueError('日期格式应为YYYY-MM-DD')
+    if start_date > end_date:
+        raise ValueError('开始日期不能晚于结束日期')
+    return start_date, end_date + timedelta(days=1)
+
+# 销售报表（from/to 为日期，group_by 为 day、hour、category 或 book）
+@app.route('/api/analytics/sales', methods=['GET'])
+def get_sales_analytics():
+    try:
+        from flask import request
+
+        group_by = request.args.get('group_by', 'day')
+        if group_by not in SALES_GROUP_BY:
+            return make_response(None, f'group_by只能是: {", ".join(SALES_GROUP_BY)}', 400)
+        try:
+            start, end = parse_sales_date_range(request.args.get('from', '').strip(), request.args.get('to', '').strip())
+            limit = parse_page_limit(request.args.get('limit'), ANALYTICS_BOOK_DEFAULT_LIMIT, ANALYTICS_BOOK_MAX_LIMIT)
+        except ValueError as e:
+            return make_response(None, str(e), 400)
+        if group_by == 'hour' and (end - start).days > ANALYTICS_MAX_HOURLY_DAYS:
+            return make_response(None, f'按小时统计的日期范围不能超过{ANALYTICS_MAX_HOURLY_DAYS}天', 400)
+
+        with app.app_context():
+            if not sales_rollups_available():
+                return make_response(None, SALES_ROLLUPS_MISSING_MESSAGE, 503)
+            params = {'start': start, 'end': end}
+            if group_by in SALES_GRANULARITIES:
+                rows = SALES_BY_PERIOD.all(db.session, {**params, 'granularity': group_by})
+            elif group_by == 'category':
+                rows = SALES_BY_CATEGORY.all(db.session, params)
+            else:
+                rows = SALES_BY_BOOK.all(db.session, {**params, 'limit': limit})
+            revenue, units, order_count = db.session.execute(SALES_TOTALS_STATEMENT, params).fetchone()
+
+            return make_response({
+                'from': start.strftime('%Y-%m-%d'),
+                'to': (end - timedelta(days=1)).strftime('%Y-%m-%d'),
+                'group_by': group_by,
+                'rows': rows,
+                'totals': {'revenue': revenue, 'units': int(units), 'order_count': int(order_count)}
+            }, '获取销售统计成功')
+    except Exception as e:
+        return make_response(None, f'获取销售统计失败: {str(e)}', 500)
+
+# 按订单数据重建一个日期区间 [start, end) 的销售汇总
+SALES_ROLLUP_PERIOD_EXPRESSIONS = {
+    'day': 'DATE(o.created_at)',
+    'hour': 'DATE(o.created_at) + INTERVAL HOUR(o.created_at) HOUR'
+}
+# 全部订单维度只按时间分组（dimension_id 固定为0）
+SALES_ROLLUP_DIMENSION_EXPRESSIONS = {
+    'book': 'oi.book_id',
+    'category': 'COALESCE(oi.category_id, b.category_id, 0)',
+    'all': None
+}
+SALES_ROLLUP_BACKFILL_STATEMENTS = [
+    text(f"""
+        INSERT INTO sales_rollups (granularity, period_start, dimension, dimension_id, revenue, units, order_count)
+        SELECT '{granularity}', {period_expression}, '{dimension}', {dimension_expression or 0},
+               SUM(oi.subtotal), SUM(oi.quantity), COUNT(DISTINCT o.id)
+        FROM orders o
+        JOIN order_items oi ON oi.order_id = o.id
+        LEFT JOIN books b ON oi.book_id = b.id
+        WHERE o.status != 'cancelled' AND o.created_at >= :start AND o.created_at < :end
+        GROUP BY {period_expression}{f', {dimension_expression}' if dimension_expression else ''}
+    """)
+    for granularity, period_expression in SALES_ROLLUP_PERIOD_EXPRESSIONS.items()
+    for dimension, dimension_expression in SALES_ROLLUP_DIMENSION_EXPRESSIONS.items()
+]
+
+def backfill_sales_rollups_range(start, end):
+    params = {'start': start, 'end': end}
+    db.session.execute(text("""
+        DELETE FROM sales_rollups WHERE period_start >= :start AND period_start < :end
+    """), params)
+    for statement in SALES_ROLLUP_BACKFILL_STATEMENTS:
+        db.session.execute(statement, params)
+
+# 回填销售汇总（命令行：flask --app app backfill-sales-rollups --from 2024-01-01 --to 2024-12-31）
+# 按批处理的天数分段执行，每段一个事务；分类按订单明细记录的下单时分类统计
+@app.cli.command('backfill-sales-rollups')
+@click.option('--from', 'from_value', default=None, help='开始日期（YYYY-MM-DD，默认最早订单的日期）')
+@click.option('--to', 'to_value', default=None, help='结束日期（YYYY-MM-DD，包含，默认今天）')
+@click.option('--chunk-days', default=SALES_BACKFILL_CHUNK_DAYS, show_default=True, help='每批处理的天数')
+def backfill_sales_rollups_command(from_value, to_value, chunk_days):
+    """按 orders/order_items 重建 sales_rollups"""
+    with app.app_context():
+        if not sales_rollups_available():
+            raise click.ClickException(SALES_ROLLUPS_MISSING_MESSAGE)
+        if not from_value:
+            first_order = db.session.execute(text("SELECT MIN(created_at) FROM orders")).scalar()
+            if first_order is None:
+                print('没有订单数据')
+                return
+            from_value = first_order.strftime('%Y-%m-%d')
+        try:
+            start, end = parse_sales_date_range(from_value, to_value)
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+
+        chunk_start = start
+        while chunk_start < end:
+            chunk_end = min(chunk_start + timedelta(days=max(1, chunk_days)), end)
+            try:
+                backfill_sales_rollups_range(chunk_start, chunk_end)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            print(f"已回填 {chunk_start.strftime('%Y-%m-%d')} 至 {(chunk_end - timedelta(days=1)).strftime('%Y-%m-%d')}")
+            chunk_start = chunk_end
+        print('销售汇总回填完成')
@@ -1,12 +1,42 @@
 # Flask应用主文件
 # 用于连接MySQL数据库并提供基本的API服务
 
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import text
+from sqlalchemy import text, bindparam
+from sqlalchemy.exc import IntegrityError
 import os
-from datetime import datetime
+import sys
+import json
+import math
+import time
+import base64
+import hashlib
+import csv
+import io
+import click
+import queue
+import threading
+import itertools
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
+from search_index import BookSearchIndex
+from suggest_index import SuggestIndex
+from catalog_cache import CatalogCache
+from id_allocator import IdAllocator
+from low_stock import LowStockTracker
+from popular_books import PopularBooksLeaderboard
+from co_purchase import CoPurchaseCounter, SCORE_METHODS
+from restock_forecast import forecast_demand, restock_plan
+from content_similarity import (
+    best_neighbours, build_vectors, document_terms, merge_neighbour, score_against, term_vector, top_k_neighbours
+)
+from response_encoding import FastJSONProvider, available_encodings, compress
+from data_access import SelectQuery, zero_if_null, float_or_zero
+
+# 以 python app.py 运行时，让路由模块中的 from app import ... 引用当前模块，而不是再导入一份 app
+if __name__ == '__main__':
+    sys.modules.setdefault('app', sys.modules[__name__])
 
 # 加载.env文件中的环境变量
 load_dotenv()
@@ -19,6 +49,9 @@ app.config['SQLALCHEMY_DATABASE_URI'] = f"mysql+pymysql://{os.getenv('DB_USERNAM
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key')
 
+# JSON 序列化后端：auto（已安装 orjson 时使用）、orjson 或 json
+app.json = FastJSONProvider(app, os.getenv('JSON_ENCODER', 'auto'))
+
 # 初始化数据库
 db = SQLAlchemy(app)
 
@@ -32,6 +65,119 @@ def make_response(data=None, message='Success', status=200):
         response['data'] = data
     return jsonify(response), status
 
+# 已编码的快照响应：缓存键 -> (数据对象, 提示信息, 响应体, ETag, 最后修改时间, {压缩编码: 压缩后的响应体})
+# 目录缓存命中时返回的是同一个数据对象，据此复用序列化结果，不必每次请求都重新编码和计算哈希
+_encoded_responses = {}
+
+# 定义带条件请求支持的响应格式（ETag / Last-Modified）
+# ETag 为响应体的内容哈希（强校验），客户端 If-None-Match 或 If-Modified-Since 命中时返回 304 且不发送响应体
+# last_modified 可以是 datetime，也可以是以数据为参数的函数（仅在重新编码时调用）
+# cache_key 用于目录缓存快照这类会被多次返回的同一数据对象
+def make_conditional_response(data=None, message='Success', last_modified=None, cache_key=None, private=False):
+    from flask import request
+
+    encoded = _encoded_responses.get(cache_key) if cache_key else None
+    if encoded is None or encoded[0] is not data or encoded[1] != message:
+        response = {
+            'code': 200,
+            'message': message
+        }
+        if data is not None:
+            response['data'] = data
+        body = app.json.dumps_bytes(response)
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        if callable(last_modified):
+            last_modified = last_modified(data)
+        encoded = (data, message, body, etag, last_modified, {})
+        if cache_key:
+            _encoded_responses[cache_key] = encoded
+
+    _, _, body, etag, last_modified, compressed_bodies = encoded
+    resp = Response(body, status=200, mimetype='application/json')
+    # 快照响应的压缩结果同样复用
+    resp.compressed_bodies = compressed_bodies
+    resp.set_etag(etag)
+    if last_modified:
+        resp.last_modified = last_modified
+    # 允许客户端缓存，但每次使用前必须重新校验；用户相关数据不允许共享缓存（代理）保存
+    resp.headers['Cache-Control'] = 'private, no-cache' if private else 'no-cache'
+    return resp.make_conditional(request)
+
+# 将数据库中的时间（本地时间，datetime 或字符串）转换为 Last-Modified 使用的 UTC 时间
+def parse_db_timestamp(value):
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+    return value.astimezone(timezone.utc)
+
+# ============================================
+# 响应压缩
+# ============================================
+
+# 小于该字节数的响应不压缩，设为负数禁用压缩
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '5'))
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/csv', 'text/plain', 'text/html'}
+
+# 按请求头 Accept-Encoding 协商压缩编码（br 优先，未安装 brotli 时只用 gzip）
+# 流式响应（数据导出、SSE）不压缩；压缩后 ETag 改为弱校验，If-None-Match 仍能命中
+@app.after_request
+def compress_response(response):
+    from flask import request
+
+    if (COMPRESSION_MIN_SIZE < 0 or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < COMPRESSION_MIN_SIZE:
+        return response
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if encoding is None:
+        return response
+
+    compressed_bodies = getattr(response, 'compressed_bodies', None)
+    compressed = compressed_bodies.get(encoding) if compressed_bodies is not None else None
+    if compressed is None:
+        compressed = compress(body, encoding, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY)
+        if compressed_bodies is not None:
+            compressed_bodies[encoding] = compressed
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+# ============================================
+# 字段筛选（列表接口的 fields 参数）
+# ============================================
+
+# 解析 fields 参数（逗号分隔的字段名），按允许列表的顺序返回；未传时返回None，表示返回全部字段
+# id 总是返回，不在允许列表中的字段抛出 ValueError
+def parse_fields_param(value, allowed):
+    if value is None:
+        return None
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    if not names:
+        return None
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise ValueError(f"不支持的字段: {', '.join(unknown)}，可选字段: {', '.join(allowed)}")
+    requested = set(names)
+    requested.add('id')
+    return [name for name in allowed if name in requested]
+
+# 从已序列化的记录（目录缓存、搜索索引）中挑选字段
+def project_fields(items, fields):
+    return [{name: item.get(name) for name in fields} for item in items]
+
 # 测试数据库连接的路由
 @app.route('/api/test-connection', methods=['GET'])
 def test_connection():
@@ -82,52 +228,330 @@ def check_users_table():
     except Exception as e:
         return make_response(None, f'检查users表失败: {str(e)}', 500)
 
+# 用户列表字段：{字段名: (SELECT 表达式, 转换函数)}，fields 参数按此校验
+USER_LIST_FIELDS = {
+    'id': ('id', None),
+    'username': ('username', None),
+    'email': ('email', None),
+    'role': ('role', None),
+    'status': ('status', None),
+    'created_at': ('created_at', None)
+}
+
+# 用户列表查询（用户列表和数据导出共用）
+USER_LIST = SelectQuery(USER_LIST_FIELDS, ' FROM users')
+# 新增、修改用户后返回的用户信息，与用户列表字段和取值一致
+USER_BY_ID = USER_LIST.where(' WHERE id = :user_id')
+USER_BY_EMAIL = USER_LIST.where(' WHERE email = :email')
+USER_BY_USERNAME = USER_LIST.where(' WHERE username = :username')
+
 # 获取所有活跃用户
+# fields 参数（如 fields=id,username）只查询并返回指定字段
 @app.route('/api/users', methods=['GET'])
 def get_all_users():
     try:
+        from flask import request
+
+        try:
+            fields = parse_fields_param(request.args.get('fields'), list(USER_LIST_FIELDS))
+        except ValueError as e:
+            return make_response(None, str(e), 400)
+
         with app.app_context():
-            result = db.session.execute(
-                text('SELECT id, username, email, role, status, created_at FROM users'))
-            users = []
-            for row in result:
-                users.append({
-                    'id': row[0],
-                    'username': row[1],
-                    'email': row[2],
-                    'role': row[3],
-                    'status': row[4],
-                    'created_at': row[5].strftime('%Y-%m-%d %H:%M:%S') if row[5] else None
-                })
+            users = USER_LIST.all(db.session, names=fields)
             return make_response({'users': users}, '获取用户列表成功')
     except Exception as e:
         return make_response(None, f'获取用户列表失败: {str(e)}', 500)
 
+# ============================================
+# 统计计数器
+# ============================================
+
+# 全局计数器（stats_counters 表）和每个用户的订单统计（user_order_stats 表）由写操作在同一事务中按已知的增量更新，
+# 读取时不再扫描全表。表结构见 performance_database.sql，创建后执行 flask --app app reconcile-counters 初始化；
+# 表不存在或尚未初始化时，读取自动回退到聚合查询
+STATS_COUNTERS_CHECK_TTL = 60
+_stats_counters_state = {'available': None, 'checked_at': 0.0}
+
+# 计数器的聚合查询（reconcile-counters 从业务表重新计算时使用）
+COUNTER_AGGREGATE_QUERIES = {
+    'users': ("""
+        SELECT COUNT(*),
+               SUM(CASE WHEN status = 'active' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'inactive' THEN 1 ELSE 0 END)
+        FROM users
+    """, ['users_total', 'users_active', 'users_inactive']),
+    'books': ("""
+        SELECT COUNT(*),
+               SUM(CASE WHEN status = 'available' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'available' THEN stock ELSE 0 END),
+               SUM(stock)
+        FROM books
+    """, ['books_total', 'books_available', 'books_available_stock', 'books_stock'])
+}
+
+# 订单按用户分组的统计：订单数、已完成订单数、消费金额（不含已取消订单）
+ORDER_STATS_QUERY = """
+    SELECT user_id,
+           COUNT(*),
+           SUM(CASE WHEN status = 'delivered' THEN 1 ELSE 0 END),
+           SUM(CASE WHEN status != 'cancelled' THEN total_amount ELSE 0 END)
+    FROM orders WHERE {condition}
+    GROUP BY user_id
+"""
+ORDER_COUNTER_NAMES = ['orders_total', 'orders_amount']
+
+# 检查计数器表是否存在（结果缓存一段时间）
+def stats_counters_available():
+    now = time.time()
+    if _stats_counters_state['available'] is None or now - _stats_counters_state['checked_at'] > STATS_COUNTERS_CHECK_TTL:
+        try:
+            count = db.session.execute(text("""
+                SELECT COUNT(*) FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ('stats_counters', 'user_order_stats')
+            """)).scalar()
+            _stats_counters_state['available'] = count == 2
+        except Exception:
+            db.session.rollback()
+            _stats_counters_state['available'] = False
+        _stats_counters_state['checked_at'] = now
+    return _stats_counters_state['available']
+
+# 检查 performance_database.sql 中可选的表或列是否已创建（结果缓存一段时间）
+# 使用单独的连接查询，不影响调用方当前的事务；未创建时相关功能跳过写入并回退
+_schema_objects_state = {}
+
+def schema_object_available(table, column=None):
+    now = time.time()
+    state = _schema_objects_state.get((table, column))
+    if state is None or now - state[1] > STATS_COUNTERS_CHECK_TTL:
+        try:
+            with db.engine.connect() as conn:
+                if column is None:
+                    count = conn.execute(text("""
+                        SELECT COUNT(*) FROM information_schema.TABLES
+                        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table
+                    """), {'table': table}).scalar()
+                else:
+                    count = conn.execute(text("""
+                        SELECT COUNT(*) FROM information_schema.COLUMNS
+                        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND COLUMN_NAME = :column
+                    """), {'table': table, 'column': column}).scalar()
+            available = count > 0
+        except Exception:
+            available = False
+        state = _schema_objects_state[(table, column)] = (available, now)
+    return state[0]
+
+# 单行数据对全局计数器的贡献，写操作前后各算一次，差值即为增量
+def user_counter_values(status):
+    return {
+        'users_total': 1,
+        'users_active': 1 if status == 'active' else 0,
+        'users_inactive': 1 if status == 'inactive' else 0
+    }
+
+def book_counter_values(status, stock):
+    stock = float(stock or 0)
+    return {
+        'books_total': 1,
+        'books_available': 1 if status == 'available' else 0,
+        'books_available_stock': stock if status == 'available' else 0,
+        'books_stock': stock
+    }
+
+COUNTER_ROW_VALUES = {'users': user_counter_values, 'books': book_counter_values}
+
+# 一行数据写操作前后对计数器的增量；before/after 为该行相关字段的元组（None 表示行不存在）
+# users 为 (status,)，books 为 (status, stock)；写操作前的值应在同一事务中按主键加锁读取
+def counter_deltas(kind, before, after):
+    values = COUNTER_ROW_VALUES[kind]
+    old = values(*before) if before is not None else {}
+    new = values(*after) if after is not None else {}
+    return {name: new.get(name, 0) - old.get(name, 0) for name in set(old) | set(new)}
+
+# 在当前事务中把增量累加到全局计数器表（value = value + 增量），计数器表不存在时忽略
+def add_counter_deltas(deltas):
+    if not stats_counters_available():
+        return
+    deltas = {name: round(delta, 2) for name, delta in deltas.items() if round(delta, 2)}
+    if not deltas:
+        return
+    values = []
+    statement_params = {}
+    for i, (name, delta) in enumerate(deltas.items()):
+        values.append(f'(:name_{i}, :value_{i})')
+        statement_params.update({f'name_{i}': name, f'value_{i}': delta})
+    db.session.execute(text(f"""
+        INSERT INTO stats_counters (name, value) VALUES {', '.join(values)}
+        ON DUPLICATE KEY UPDATE value = value + VALUES(value)
+    """), statement_params)
+
+# 只改变库存的写操作（下单、取消订单）对计数器的增量，changes 为 [(图书状态, 库存变化量)]
+def stock_counter_deltas(changes):
+    deltas = {'books_stock': 0, 'books_available_stock': 0}
+    for status, quantity in changes:
+        deltas['books_stock'] += quantity
+        if status == 'available':
+            deltas['books_available_stock'] += quantity
+    return deltas
+
+# 一个订单对订单统计的贡献：(订单数, 已完成订单数, 消费金额)
+def order_counter_values(status, total_amount):
+    return (1, 1 if status == 'delivered' else 0, float(total_amount or 0) if status != 'cancelled' else 0.0)
+
+USER_ORDER_STATS_UPSERT_STATEMENT = text("""
+    INSERT INTO user_order_stats (user_id, total_orders, completed_orders, total_spent)
+    VALUES (:user_id, :orders, :completed, :spent)
+    ON DUPLICATE KEY UPDATE
+        total_orders = total_orders + VALUES(total_orders),
+        completed_orders = completed_orders + VALUES(completed_orders),
+        total_spent = total_spent + VALUES(total_spent)
+""")
+
+# 订单写操作前后的 (status, total_amount)（None 表示订单不存在），在当前事务中更新订单计数器和该用户的订单统计
+def apply_order_counter_change(user_id, before, after):
+    if not stats_counters_available():
+        return
+    old = order_counter_values(*before) if before is not None else (0, 0, 0.0)
+    new = order_counter_values(*after) if after is not None else (0, 0, 0.0)
+    delta = (new[0] - old[0], new[1] - old[1], round(new[2] - old[2], 2))
+    if user_id is not None and any(delta):
+        db.session.execute(USER_ORDER_STATS_UPSERT_STATEMENT, {
+            'user_id': user_id, 'orders': delta[0], 'completed': delta[1], 'spent': delta[2]
+        })
+    add_counter_deltas(dict(zip(ORDER_COUNTER_NAMES, (delta[0], delta[2]))))
+
+# 读取全局计数器（O(1) 主键查询）；计数器未初始化（未执行 reconcile-counters）时返回 None
+def read_counters(names):
+    if not stats_counters_available():
+        return None
+    rows = dict(db.session.execute(
+        text("SELECT name, value FROM stats_counters WHERE name IN :names").bindparams(bindparam('names', expanding=True)),
+        {'names': list(names) + ['initialized']}
+    ).fetchall())
+    if 'initialized' not in rows:
+        return None
+    counters = {}
+    for name in names:
+        value = rows.get(name) or 0
+        counters[name] = round(float(value), 2) if name.endswith('_amount') else int(value)
+    return counters
+
+# 单个用户的订单统计：以计数器的 initialized 行为主表左连接，一次查询同时判断计数器是否已初始化
+# （没有结果行表示未初始化，统计列为 NULL 表示该用户还没有订单）
+USER_ORDER_STATS_STATEMENT = text("""
+    SELECT s.total_orders, s.completed_orders, s.total_spent
+    FROM stats_counters c
+    LEFT JOIN user_order_stats s ON s.user_id = :user_id
+    WHERE c.name = 'initialized'
+""")
+
+# 读取单个用户的订单统计；计数器未初始化时返回 None
+def read_user_order_stats(user_id):
+    if not stats_counters_available():
+        return None
+    row = db.session.execute(USER_ORDER_STATS_STATEMENT, {'user_id': user_id}).fetchone()
+    if not row:
+        return None
+    if row[0] is None:
+        return {'total_orders': 0, 'completed_orders': 0, 'total_spent': 0.0}
+    return {'total_orders': int(row[0]), 'completed_orders': int(row[1]), 'total_spent': float(row[2])}
+
+# 从业务表重新计算全部计数器，返回与当前计数器的偏差；dry_run 时只报告不写入
+# 聚合查询使用共享锁读取，执行期间的写操作会等待，保证重建结果准确
+def reconcile_counters(dry_run=False):
+    actual = {}
+    for sql, names in COUNTER_AGGREGATE_QUERIES.values():
+        row = db.session.execute(text(sql + " LOCK IN SHARE MODE")).fetchone()
+        actual.update({name: round(float(value or 0), 2) for name, value in zip(names, row)})
+    actual_users = {}
+    for row in db.session.execute(text(ORDER_STATS_QUERY.format(condition='1=1') + " LOCK IN SHARE MODE")):
+        actual['orders_total'] = actual.get('orders_total', 0) + int(row[1] or 0)
+        actual['orders_amount'] = round(actual.get('orders_amount', 0) + float(row[3] or 0), 2)
+        if row[0] is not None:
+            actual_users[row[0]] = (int(row[1] or 0), int(row[2] or 0), round(float(row[3] or 0), 2))
+    for name in ORDER_COUNTER_NAMES:
+        actual.setdefault(name, 0)
+
+    stored = {row[0]: round(float(row[1]), 2) for row in db.session.execute(text("SELECT name, value FROM stats_counters"))}
+    drift = {
+        name: {'stored': stored.get(name), 'actual': value}
+        for name, value in actual.items() if stored.get(name) != value
+    }
+    stored_users = {
+        row[0]: (int(row[1]), int(row[2]), round(float(row[3]), 2))
+        for row in db.session.execute(text("SELECT user_id, total_orders, completed_orders, total_spent FROM user_order_stats"))
+    }
+    user_drift = [
+        {'user_id': user_id, 'stored': stored_users.get(user_id), 'actual': actual_users.get(user_id)}
+        for user_id in sorted(set(stored_users) | set(actual_users))
+        if stored_users.get(user_id, (0, 0, 0.0)) != actual_users.get(user_id, (0, 0, 0.0))
+    ]
+
+    if not dry_run:
+        rows = [{'name': name, 'value': value} for name, value in actual.items()]
+        rows.append({'name': 'initialized', 'value': 1})
+        db.session.execute(text("""
+            INSERT INTO stats_counters (name, value) VALUES (:name, :value)
+            ON DUPLICATE KEY UPDATE value = VALUES(value)
+        """), rows)
+        db.session.execute(text("DELETE FROM user_order_stats"))
+        db.session.execute(text(f"""
+            INSERT INTO user_order_stats (user_id, total_orders, completed_orders, total_spent)
+            {ORDER_STATS_QUERY.format(condition='user_id IS NOT NULL')}
+        """))
+    db.session.commit()
+    _stats_counters_state['available'] = None
+
+    return {
+        'initialized': 'initialized' in stored,
+        'counters': actual,
+        'drift': drift,
+        'user_drift_count': len(user_drift),
+        'user_drift': user_drift[:100],
+        'dry_run': dry_run
+    }
+
+# 命令行重建计数器：flask --app app reconcile-counters [--dry-run]
+@app.cli.command('reconcile-counters')
+@click.option('--dry-run', is_flag=True, help='只报告偏差，不写入计数器')
+def reconcile_counters_command(dry_run):
+    """从业务表重新计算统计计数器，并报告与当前计数器的偏差"""
+    with app.app_context():
+        if not stats_counters_available():
+            print('计数器表不存在，请先执行 performance_database.sql')
+            return
+        report = reconcile_counters(dry_run)
+    if not report['initialized']:
+        print('计数器首次初始化')
+    elif not report['drift'] and not report['user_drift_count']:
+        print('计数器与业务数据一致，没有偏差')
+    for name, values in report['drift'].items():
+        print(f"  {name}: 计数器 {values['stored']}，实际 {values['actual']}")
+    if report['user_drift_count']:
+        print(f"  {report['user_drift_count']} 个用户的订单统计存在偏差")
+    print('（仅检查，未写入）' if dry_run else '计数器已重建')
+
+# 一次 GROUP BY 统计各状态的用户数
+def count_users_by_status():
+    counters = read_counters(['users_total', 'users_active', 'users_inactive'])
+    if counters is not None:
+        return {'total': counters['users_total'], 'active': counters['users_active'], 'inactive': counters['users_inactive']}
+
+    counts = {'total': 0, 'active': 0, 'inactive': 0}
+    for status, count in db.session.execute(text("SELECT status, COUNT(*) FROM users GROUP BY status")):
+        counts['total'] += count
+        if status in counts:
+            counts[status] = count
+    return counts
+
 # 获取用户总数API
 @app.route('/api/users/count', methods=['GET'])
 def get_users_count():
     try:
         with app.app_context():
-            # 查询总用户数
-            total_count_query = text("SELECT COUNT(*) FROM users")
-            total_count_result = db.session.execute(total_count_query).fetchone()
-            total_count = total_count_result[0] if total_count_result[0] is not None else 0
-            
-            # 查询活跃用户数
-            active_count_query = text("SELECT COUNT(*) FROM users WHERE status = 'active'")
-            active_count_result = db.session.execute(active_count_query).fetchone()
-            active_count = active_count_result[0] if active_count_result[0] is not None else 0
-            
-            # 查询禁用用户数
-            inactive_count_query = text("SELECT COUNT(*) FROM users WHERE status = 'inactive'")
-            inactive_count_result = db.session.execute(inactive_count_query).fetchone()
-            inactive_count = inactive_count_result[0] if inactive_count_result[0] is not None else 0
-            
-            return make_response({
-                'total': total_count,
-                'active': active_count,
-                'inactive': inactive_count
-            }, '获取用户总数成功')
+            return make_response(count_users_by_status(), '获取用户总数成功')
     except Exception as e:
         return make_response(None, f'获取用户总数失败: {str(e)}', 500)
 
@@ -189,7 +613,8 @@ def add_user():
                 db.session.execute(reset_autoinc_query)
                 db.session.commit()
             
-            # 插入新用户
+            # 插入新用户，同一事务中更新用户计数器
+            status = data.get('status', 'active')
             insert_query = text("""
                 INSERT INTO users (username, email, password, role, status, created_at)
                 VALUES (:username, :email, :password, :role, :status, NOW())
@@ -199,22 +624,13 @@ def add_user():
                 'email': data['email'],
                 'password': data['password'],  # 注意：实际应用中应该加密存储密码
                 'role': data['role'],
-                'status': data.get('status', 'active')
+                'status': status
             })
+            add_counter_deltas(counter_deltas('users', None, (status,)))
             db.session.commit()
             
             # 获取新创建的用户信息
-            new_user_query = text("SELECT id, username, email, role, status, created_at FROM users WHERE email = :email")
-            new_user = db.session.execute(new_user_query, {'email': data['email']}).fetchone()
-            
-            user_data = {
-                'id': new_user[0],
-                'username': new_user[1],
-                'email': new_user[2],
-                'role': new_user[3],
-                'status': new_user[4],
-                'created_at': new_user[5].strftime('%Y-%m-%d %H:%M:%S') if new_user[5] else None
-            }
+            user_data = USER_BY_EMAIL.first(db.session, {'email': data['email']})
             
             return make_response(user_data, '添加用户成功')
     except Exception as e:
@@ -229,8 +645,8 @@ def update_user(user_id):
         data = request.get_json()
         
         with app.app_context():
-            # 检查用户是否存在
-            check_query = text("SELECT id FROM users WHERE id = :user_id")
+            # 检查用户是否存在（锁定该行，修改前的状态用于更新用户计数器）
+            check_query = text("SELECT id, status FROM users WHERE id = :user_id FOR UPDATE")
             check_result = db.session.execute(check_query, {'user_id': user_id}).fetchone()
             
             if not check_result:
@@ -263,22 +679,15 @@ def update_user(user_id):
             if not update_fields:
                 return make_response(None, '没有需要更新的字段', 400)
             
+            # 修改状态时同步更新用户计数器
             update_query = text(f"UPDATE users SET {', '.join(update_fields)} WHERE id = :user_id")
             db.session.execute(update_query, update_params)
+            if 'status' in data:
+                add_counter_deltas(counter_deltas('users', (check_result[1],), (data['status'],)))
             db.session.commit()
             
             # 获取更新后的用户信息
-            updated_user_query = text("SELECT id, username, email, role, status, created_at FROM users WHERE id = :user_id")
-            updated_user = db.session.execute(updated_user_query, {'user_id': user_id}).fetchone()
-            
-            user_data = {
-                'id': updated_user[0],
-                'username': updated_user[1],
-                'email': updated_user[2],
-                'role': updated_user[3],
-                'status': updated_user[4],
-                'created_at': updated_user[5].strftime('%Y-%m-%d %H:%M:%S') if updated_user[5] else None
-            }
+            user_data = USER_BY_ID.first(db.session, {'user_id': user_id})
             
             return make_response(user_data, '更新用户成功')
     except Exception as e:
@@ -290,8 +699,8 @@ def update_user(user_id):
 def delete_user(user_id):
     try:
         with app.app_context():
-            # 检查用户是否存在
-            check_query = text("SELECT id FROM users WHERE id = :user_id")
+            # 检查用户是否存在（锁定该行，状态用于更新用户计数器）
+            check_query = text("SELECT id, status FROM users WHERE id = :user_id FOR UPDATE")
             check_result = db.session.execute(check_query, {'user_id': user_id}).fetchone()
 
             if not check_result:
@@ -304,116 +713,201 @@ def delete_user(user_id):
             if orders_count > 0:
                 return make_response(None, f'无法删除用户：该用户有{orders_count}个关联订单，请先处理这些订单', 400)
 
-            # 删除用户
+            # 删除用户（ID重新排列由 compact-user-ids 命令或 /api/users/fix-ids 单独执行）
+            # 用户的评论随用户级联删除，先从评分聚合中扣除
+            from review_routes import remove_user_reviews_from_rating_stats
+            reviewed_book_ids = remove_user_reviews_from_rating_stats(user_id)
             delete_query = text("DELETE FROM users WHERE id = :user_id")
             db.session.execute(delete_query, {'user_id': user_id})
-
-            # 检查剩余的所有用户是否都没有订单（以便安全地重新排列ID）
-            remaining_users_query = text("SELECT id FROM users ORDER BY id ASC")
-            remaining_users = db.session.execute(remaining_users_query).fetchall()
-
-            can_reorder = True
-            for user in remaining_users:
-                user_orders = db.session.execute(
-                    text("SELECT COUNT(*) FROM orders WHERE user_id = :user_id"),
-                    {'user_id': user[0]}
-                ).scalar()
-                if user_orders > 0:
-                    can_reorder = False
-                    break
-
-            # 如果所有用户都没有订单，重新排列ID
-            if can_reorder and remaining_users:
-                # 第一步：将所有用户ID更新为临时值
-                temp_ids = []
-                for index, user in enumerate(remaining_users, start=1):
-                    temp_id = 20000 + index
-                    db.session.execute(
-                        text("UPDATE users SET id = :temp_id WHERE id = :old_id"),
-                        {'temp_id': temp_id, 'old_id': user[0]}
-                    )
-                    temp_ids.append(temp_id)
-
-                # 第二步：将临时ID更新为正确的连续ID
-                for index, temp_id in enumerate(temp_ids, start=1):
-                    db.session.execute(
-                        text("UPDATE users SET id = :correct_id WHERE id = :temp_id"),
-                        {'correct_id': index, 'temp_id': temp_id}
-                    )
-
-                # 重置AUTO_INCREMENT
-                next_id = len(remaining_users) + 1
-                db.session.execute(text(f"ALTER TABLE users AUTO_INCREMENT = {next_id}"))
-            else:
-                # 不能重排ID，只重置AUTO_INCREMENT到下一个可用值
-                if remaining_users:
-                    max_id = max(user[0] for user in remaining_users)
-                    next_id = max_id + 1
-                else:
-                    next_id = 1
-                db.session.execute(text(f"ALTER TABLE users AUTO_INCREMENT = {next_id}"))
-
+            add_counter_deltas(counter_deltas('users', (check_result[1],), None))
             db.session.commit()
+            sync_books_to_indexes(reviewed_book_ids)
 
-            message = '删除用户成功'
-            if can_reorder and remaining_users:
-                message += '，ID已重新排列'
-
-            return make_response(None, message)
+            return make_response(None, '删除用户成功')
     except Exception as e:
         db.session.rollback()
         return make_response(None, f'删除用户失败: {str(e)}', 500)
 
-# 修复用户ID（临时维护端点）
-@app.route('/api/users/fix-ids', methods=['POST'])
-def fix_user_ids():
-    """修复用户ID，使其连续并重置AUTO_INCREMENT"""
-    try:
-        with app.app_context():
-            # 获取所有用户，按ID排序
-            users_query = text("SELECT id, username, email, password, role, status, created_at FROM users ORDER BY id ASC")
-            users = db.session.execute(users_query).fetchall()
-
-            if not users:
-                return make_response(None, '没有用户需要修复', 200)
-
-            # 检查是否有订单关联
-            for user in users:
-                orders_check = text("SELECT COUNT(*) FROM orders WHERE user_id = :user_id")
-                order_count = db.session.execute(orders_check, {'user_id': user[0]}).scalar()
-                if order_count > 0:
-                    return make_response(None, f'用户ID {user[0]}({user[1]}) 有{order_count}个关联订单，无法重新分配ID', 400)
-
-            # 先将所有用户ID改为临时值
-            temp_mapping = {}
-            for idx, user in enumerate(users, start=1):
-                temp_id = 20000 + idx
-                temp_mapping[temp_id] = (idx, user)
-                db.session.execute(
-                    text("UPDATE users SET id = :temp_id WHERE id = :old_id"),
-                    {'temp_id': temp_id, 'old_id': user[0]}
-                )
-
-            # 然后将临时ID改为正确的连续ID
-            for temp_id, (new_id, user) in temp_mapping.items():
-                db.session.execute(
-                    text("UPDATE users SET id = :new_id WHERE id = :temp_id"),
-                    {'new_id': new_id, 'temp_id': temp_id}
-                )
+# ============================================
+# 用户ID整理
+# ============================================
 
-            # 重置AUTO_INCREMENT
-            next_id = len(users) + 1
-            db.session.execute(text(f"ALTER TABLE users AUTO_INCREMENT = {next_id}"))
+# 每批重新编号的用户数量（每批一个事务）
+USER_COMPACT_BATCH_SIZE = int(os.getenv('USER_COMPACT_BATCH_SIZE', '1000'))
+
+# 将用户ID重新排列为从1开始的连续值（保持原有顺序），并同步修改引用users.id的外键列
+# 有订单的用户存在时不重新排列（订单号、历史记录依赖用户ID），只返回这些用户
+# 新ID = 按原ID排序的行号，总是不大于原ID，按行号分批处理时每批完成后表都处于一致状态，中断后可以重新执行
+def compact_user_ids(batch_size=USER_COMPACT_BATCH_SIZE):
+    with db.engine.connect() as conn:
+        # 一次分组查询找出所有有订单的用户
+        users_with_orders = [
+            {'user_id': row[0], 'order_count': row[1]}
+            for row in conn.execute(text("""
+                SELECT user_id, COUNT(*) FROM orders
+                WHERE user_id IS NOT NULL
+                GROUP BY user_id
+                ORDER BY user_id
+            """))
+        ]
+        if users_with_orders:
+            return {'compacted': False, 'users_with_orders': users_with_orders}
+
+        # 引用 users.id 的外键列（购物车、收货地址、评论等）
+        reference_columns = [tuple(row) for row in conn.execute(text("""
+            SELECT TABLE_NAME, COLUMN_NAME
+            FROM information_schema.KEY_COLUMN_USAGE
+            WHERE REFERENCED_TABLE_SCHEMA = DATABASE()
+              AND REFERENCED_TABLE_NAME = 'users'
+              AND REFERENCED_COLUMN_NAME = 'id'
+        """))]
+
+        # 临时映射表：只包含需要改变ID的用户
+        conn.execute(text("DROP TEMPORARY TABLE IF EXISTS user_id_map"))
+        conn.execute(text("""
+            CREATE TEMPORARY TABLE user_id_map (
+              old_id INT PRIMARY KEY,
+              new_id INT NOT NULL,
+              UNIQUE KEY uk_new_id (new_id)
+            )
+        """))
+        conn.execute(text("""
+            INSERT INTO user_id_map (old_id, new_id)
+            SELECT id, new_id FROM (
+                SELECT id, ROW_NUMBER() OVER (ORDER BY id) AS new_id FROM users
+            ) ranked
+            WHERE id != new_id
+        """))
+        min_new_id, max_new_id, renumbered = conn.execute(
+            text("SELECT MIN(new_id), MAX(new_id), COUNT(*) FROM user_id_map")
+        ).fetchone()
+        # 中转偏移量：先把本批用户移到所有现有ID之上，再整体移回，避免更新过程中出现主键冲突
+        offset = (conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM users")).scalar() or 0) + 1
+        conn.commit()
+
+        batches = 0
+        if renumbered:
+            # 外键列会临时指向尚未改名的用户ID，本连接内关闭外键检查
+            conn.execute(text("SET FOREIGN_KEY_CHECKS = 0"))
+            try:
+                for lower in range(min_new_id, max_new_id + 1, batch_size):
+                    params = {'lower': lower, 'upper': lower + batch_size - 1, 'offset': offset}
+                    try:
+                        for table_name, column_name in reference_columns:
+                            conn.execute(text(f"""
+                                UPDATE `{table_name}` t
+                                JOIN user_id_map m ON t.`{column_name}` = m.old_id
+                                SET t.`{column_name}` = m.new_id
+                                WHERE m.new_id BETWEEN :lower AND :upper
+                            """), params)
+                        conn.execute(text("""
+                            UPDATE users u
+                            JOIN user_id_map m ON u.id = m.old_id
+                            SET u.id = m.new_id + :offset
+                            WHERE m.new_id BETWEEN :lower AND :upper
+                        """), params)
+                        conn.execute(text("""
+                            UPDATE users SET id = id - :offset
+                            WHERE id BETWEEN :lower + :offset AND :upper + :offset
+                        """), params)
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+                    batches += 1
+            finally:
+                conn.execute(text("SET FOREIGN_KEY_CHECKS = 1"))
+                conn.execute(text("DROP TEMPORARY TABLE IF EXISTS user_id_map"))
+
+        # 重置AUTO_INCREMENT
+        next_id = (conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM users")).scalar() or 0) + 1
+        conn.execute(text(f"ALTER TABLE users AUTO_INCREMENT = {int(next_id)}"))
+        conn.commit()
+
+    return {
+        'compacted': True,
+        'renumbered': renumbered or 0,
+        'batches': batches,
+        'next_id': next_id,
+        'reference_tables': [table_name for table_name, _ in reference_columns]
+    }
 
-            db.session.commit()
+# 命令行整理用户ID：flask --app app compact-user-ids --batch-size 1000
+@app.cli.command('compact-user-ids')
+@click.option('--batch-size', default=USER_COMPACT_BATCH_SIZE, show_default=True, help='每批重新编号的用户数量')
+def compact_user_ids_command(batch_size):
+    """将用户ID重新排列为连续值并重置AUTO_INCREMENT"""
+    with app.app_context():
+        start = time.time()
+        report = compact_user_ids(batch_size)
+    if not report['compacted']:
+        print(f"有 {len(report['users_with_orders'])} 个用户存在关联订单，无法重新分配ID：")
+        for item in report['users_with_orders'][:20]:
+            print(f"  用户ID {item['user_id']}: {item['order_count']}个订单")
+        return
+    print(f"重新编号 {report['renumbered']} 个用户（{report['batches']} 批），"
+          f"下一个ID为 {report['next_id']}，耗时 {time.time() - start:.2f}s")
+
+# 整理用户ID的后台任务状态：同一时间只运行一个任务，GET /api/users/fix-ids 查询进度和结果
+_user_compact_job = {'status': 'idle', 'started_at': None, 'finished_at': None, 'result': None, 'error': None}
+_user_compact_lock = threading.Lock()
+
+def user_compact_job_snapshot():
+    with _user_compact_lock:
+        return dict(_user_compact_job)
+
+def finish_user_compact_job(status, result=None, error=None):
+    with _user_compact_lock:
+        _user_compact_job.update({
+            'status': status,
+            'finished_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'result': result,
+            'error': error
+        })
+
+# 后台线程中执行整理，结果写入任务状态
+def run_user_compact_job():
+    with app.app_context():
+        try:
+            report = compact_user_ids()
+            if not report['compacted']:
+                first = report['users_with_orders'][0]
+                finish_user_compact_job('failed', report,
+                                        f"用户ID {first['user_id']} 有{first['order_count']}个关联订单，无法重新分配ID")
+            else:
+                finish_user_compact_job('completed', {
+                    'fixed_count': report['renumbered'],
+                    'next_id': report['next_id'],
+                    'batches': report['batches']
+                })
+        except Exception as e:
+            finish_user_compact_job('failed', error=str(e))
+        finally:
+            db.session.remove()
 
-            return make_response({
-                'fixed_count': len(users),
-                'next_id': next_id
-            }, f'成功修复{len(users)}个用户的ID')
-    except Exception as e:
-        db.session.rollback()
-        return make_response(None, f'修复用户ID失败: {str(e)}', 500)
+# 修复用户ID（维护端点）：在后台线程中执行整理任务，立即返回202，通过 GET 同一地址查询任务状态
+@app.route('/api/users/fix-ids', methods=['POST'])
+def fix_user_ids():
+    """启动用户ID整理任务，使用户ID连续并重置AUTO_INCREMENT"""
+    with _user_compact_lock:
+        if _user_compact_job['status'] == 'running':
+            return make_response(dict(_user_compact_job), '用户ID整理任务正在执行', 409)
+        _user_compact_job.update({
+            'status': 'running',
+            'started_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'finished_at': None,
+            'result': None,
+            'error': None
+        })
+        job = dict(_user_compact_job)
+    threading.Thread(target=run_user_compact_job, name='user-id-compactor', daemon=True).start()
+    return make_response(job, '用户ID整理任务已开始，可通过 GET /api/users/fix-ids 查询进度', 202)
+
+# 查询用户ID整理任务状态（idle / running / completed / failed）
+@app.route('/api/users/fix-ids', methods=['GET'])
+def get_fix_user_ids_status():
+    job = user_compact_job_snapshot()
+    return make_response(job, '获取用户ID整理任务状态成功')
 
 # 切换用户状态API
 @app.route('/api/users/<int:user_id>/status', methods=['PATCH'])
@@ -429,33 +923,24 @@ def toggle_user_status(user_id):
             return make_response(None, '无效的状态值，只能是active或inactive', 400)
         
         with app.app_context():
-            # 检查用户是否存在
-            check_query = text("SELECT id FROM users WHERE id = :user_id")
+            # 检查用户是否存在（锁定该行，修改前的状态用于更新用户计数器）
+            check_query = text("SELECT id, status FROM users WHERE id = :user_id FOR UPDATE")
             check_result = db.session.execute(check_query, {'user_id': user_id}).fetchone()
             
             if not check_result:
                 return make_response(None, '用户不存在', 404)
             
-            # 更新用户状态
+            # 更新用户状态，同一事务中更新用户计数器
             update_query = text("UPDATE users SET status = :status WHERE id = :user_id")
             db.session.execute(update_query, {
                 'status': data['status'],
                 'user_id': user_id
             })
+            add_counter_deltas(counter_deltas('users', (check_result[1],), (data['status'],)))
             db.session.commit()
             
             # 获取更新后的用户信息
-            updated_user_query = text("SELECT id, username, email, role, status, created_at FROM users WHERE id = :user_id")
-            updated_user = db.session.execute(updated_user_query, {'user_id': user_id}).fetchone()
-            
-            user_data = {
-                'id': updated_user[0],
-                'username': updated_user[1],
-                'email': updated_user[2],
-                'role': updated_user[3],
-                'status': updated_user[4],
-                'created_at': updated_user[5].strftime('%Y-%m-%d %H:%M:%S') if updated_user[5] else None
-            }
+            user_data = USER_BY_ID.first(db.session, {'user_id': user_id})
             
             return make_response(user_data, '更新用户状态成功')
     except Exception as e:
@@ -571,7 +1056,7 @@ def register():
             if existing_email:
                 return make_response(None, '邮箱已被注册', 400)
 
-            # 插入新用户（默认角色为user）
+            # 插入新用户（默认角色为user），同一事务中更新用户计数器
             insert_query = text("""
                 INSERT INTO users (username, email, password, role, status, created_at)
                 VALUES (:username, :email, :password, 'user', 'active', NOW())
@@ -581,130 +1066,283 @@ def register():
                 'email': email,
                 'password': password  # 注意：实际应用中应该加密存储密码
             })
+            add_counter_deltas(counter_deltas('users', None, ('active',)))
             db.session.commit()
 
             # 获取新创建的用户信息
-            new_user_query = text("""
-                SELECT id, username, email, role, status, created_at
-                FROM users
-                WHERE username = :username
-            """)
-            new_user = db.session.execute(new_user_query, {'username': username}).fetchone()
-
-            user_data = {
-                'id': new_user[0],
-                'username': new_user[1],
-                'email': new_user[2],
-                'role': new_user[3],
-                'status': new_user[4],
-                'created_at': new_user[5].strftime('%Y-%m-%d %H:%M:%S') if new_user[5] else None
-            }
+            user_data = USER_BY_USERNAME.first(db.session, {'username': username})
 
             return make_response(user_data, '注册成功')
     except Exception as e:
         db.session.rollback()
         return make_response(None, f'注册失败: {str(e)}', 500)
 
+# 图书列表分页配置（游标分页，按 created_at DESC, id DESC 排序）
+BOOKS_PAGE_DEFAULT_LIMIT = int(os.getenv('BOOKS_PAGE_DEFAULT_LIMIT', '20'))
+BOOKS_PAGE_MAX_LIMIT = int(os.getenv('BOOKS_PAGE_MAX_LIMIT', '100'))
+
+# 编码分页游标：将最后一行的 (created_at, id) 编码为不透明字符串
+def encode_keyset_cursor(created_at, row_id):
+    payload = json.dumps({
+        'c': created_at.strftime('%Y-%m-%d %H:%M:%S') if created_at else None,
+        'i': row_id
+    }, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+# 解码分页游标，格式不合法时抛出ValueError
+def decode_keyset_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        created_at = datetime.strptime(payload['c'], '%Y-%m-%d %H:%M:%S')
+        return created_at, int(payload['i'])
+    except Exception:
+        raise ValueError('无效的分页游标')
+
+# 解析 limit 参数，超出范围时截断到 [1, max_limit]
+def parse_page_limit(value, default_limit, max_limit):
+    try:
+        limit = int(value) if value not in (None, '') else default_limit
+    except (TypeError, ValueError):
+        raise ValueError('limit参数必须为整数')
+    return max(1, min(limit, max_limit))
+
+# ============================================
+# 图书目录缓存
+# ============================================
+
+# 缓存最长使用时间（秒），多进程部署时其他进程的写入最多延迟这么久可见，0表示禁用缓存
+CATALOG_CACHE_MAX_STALENESS = int(os.getenv('CATALOG_CACHE_MAX_STALENESS', '30'))
+# 最多缓存的图书记录数（超过后按LRU淘汰，完整列表超过该数量时不缓存）
+CATALOG_CACHE_MAX_BOOKS = int(os.getenv('CATALOG_CACHE_MAX_BOOKS', '50000'))
+
+catalog_cache = CatalogCache(CATALOG_CACHE_MAX_STALENESS, CATALOG_CACHE_MAX_BOOKS)
+
+# 图书详情字段（图书列表、图书详情、批量获取和数据导出共用），fields 参数按此校验
+BOOK_DETAIL_FIELDS = {
+    'id': ('b.id', None),
+    'title': ('b.title', None),
+    'author': ('b.author', None),
+    'category': ('c.name', None),
+    'category_id': ('b.category_id', None),
+    'description': ('b.description', None),
+    'price': ('b.price', None),
+    'stock': ('b.stock', None),
+    'rating': ('b.rating', zero_if_null),
+    'image': ('b.image', None),
+    'status': ('b.status', None),
+    'isbn': ('b.isbn', None),
+    'created_at': ('b.created_at', None),
+    'updated_at': ('b.updated_at', None)
+}
+
+BOOK_DETAIL_FROM = """
+    FROM books b
+    LEFT JOIN categories c ON b.category_id = c.id
+"""
+
+# 图书详情查询（直接使用表连接查询，避免依赖视图）
+BOOK_DETAIL = SelectQuery(BOOK_DETAIL_FIELDS, BOOK_DETAIL_FROM)
+book_detail_row_to_dict = BOOK_DETAIL.row_to_dict
+
+ALL_BOOKS = BOOK_DETAIL.where(" ORDER BY b.created_at DESC")
+BOOK_BY_ID = BOOK_DETAIL.where(" WHERE b.id = :book_id")
+BOOKS_BY_IDS = BOOK_DETAIL.where(" WHERE b.id IN :book_ids", expanding=['book_ids'])
+
+# 新增、更新图书后返回的字段（取值与图书详情一致）
+BOOK_CREATED_FIELDS = ['id', 'title', 'author', 'isbn', 'price', 'stock', 'status']
+BOOK_UPDATED_FIELDS = ['id', 'title', 'author', 'price', 'stock']
+
+# 游标分页：第一页，以及从游标位置之后继续读取（展开的行比较写法，可以直接使用 (created_at, id) 复合索引）
+BOOKS_FIRST_PAGE = BOOK_DETAIL.where(" ORDER BY b.created_at DESC, b.id DESC LIMIT :limit")
+BOOKS_NEXT_PAGE = BOOK_DETAIL.where("""
+    WHERE b.created_at < :cursor_created_at
+       OR (b.created_at = :cursor_created_at AND b.id < :cursor_id)
+    ORDER BY b.created_at DESC, b.id DESC LIMIT :limit
+""")
+
+# 按字段筛选后的完整图书列表快照：缓存键 -> (原快照, 筛选结果)
+# 原快照不变时返回同一个对象，条件请求可以复用已编码的响应
+_projected_book_lists = {}
+PROJECTED_BOOK_LISTS_MAX = 32
+
+def project_book_list(data, fields):
+    cache_key = 'book_list?fields=' + ','.join(fields)
+    entry = _projected_book_lists.get(cache_key)
+    if entry is None or entry[0] is not data:
+        if len(_projected_book_lists) >= PROJECTED_BOOK_LISTS_MAX:
+            _projected_book_lists.clear()
+        entry = (data, {'books': project_fields(data['books'], fields)})
+        _projected_book_lists[cache_key] = entry
+    return cache_key, entry[1]
+
+# 从数据库加载完整图书列表
+def load_all_books():
+    return ALL_BOOKS.all(db.session)
+
+# 从数据库加载单本图书，不存在时返回None
+def load_book_detail(book_id):
+    return BOOK_BY_ID.first(db.session, {'book_id': book_id})
+
+# 从数据库批量加载图书（一次 IN 查询），返回 {图书ID: 图书数据}
+def load_book_details(book_ids):
+    return {book['id']: book for book in BOOKS_BY_IDS.all(db.session, {'book_ids': list(book_ids)})}
+
+# 从数据库加载分类列表
+def load_all_categories():
+    result = db.session.execute(text("""
+        SELECT id, name, description
+        FROM categories
+        ORDER BY id ASC
+    """))
+    return [{'id': row[0], 'name': row[1], 'description': row[2]} for row in result]
+
+# 图书列表的最后修改时间：最近更新的图书时间，以及本进程最近一次写操作（删除图书不会留下 updated_at）的时间
+def book_list_last_modified(data):
+    latest = max((book['updated_at'] for book in data['books'] if book['updated_at']), default=None)
+    last_modified = parse_db_timestamp(latest)
+    if catalog_cache.changed_at:
+        changed_at = datetime.fromtimestamp(catalog_cache.changed_at, timezone.utc)
+        if last_modified is None or changed_at > last_modified:
+            last_modified = changed_at
+    return last_modified
+
 # 获取所有图书API
+# 不带参数时返回全部图书（兼容旧客户端，从目录缓存读取）；
+# 带 limit 或 cursor 参数时启用游标分页，每次只读取一页数据
+# fields 参数（如 fields=id,title,author,price,image）只返回指定字段，分页查询时同时缩减 SELECT 的列
 @app.route('/api/books', methods=['GET'])
 def get_all_books():
     try:
+        from flask import request
+
+        paginated = 'limit' in request.args or 'cursor' in request.args
+        limit = None
+        cursor = None
+
+        try:
+            fields = parse_fields_param(request.args.get('fields'), list(BOOK_DETAIL_FIELDS))
+        except ValueError as e:
+            return make_response(None, str(e), 400)
+
+        if paginated:
+            try:
+                limit = parse_page_limit(request.args.get('limit'), BOOKS_PAGE_DEFAULT_LIMIT, BOOKS_PAGE_MAX_LIMIT)
+                cursor_str = request.args.get('cursor', '').strip()
+                if cursor_str:
+                    cursor = decode_keyset_cursor(cursor_str)
+            except ValueError as e:
+                return make_response(None, str(e), 400)
+
         with app.app_context():
-            # 直接使用表连接查询，避免依赖视图
-            result = db.session.execute(text("""
-                SELECT
-                    b.id,
-                    b.title,
-                    b.author,
-                    c.name AS category,
-                    b.category_id,
-                    b.description,
-                    b.price,
-                    b.stock,
-                    b.rating,
-                    b.image,
-                    b.status,
-                    b.isbn,
-                    b.created_at,
-                    b.updated_at
-                FROM books b
-                LEFT JOIN categories c ON b.category_id = c.id
-                ORDER BY b.created_at DESC
-            """))
-            books = []
-            for row in result:
-                books.append({
-                    'id': row[0],
-                    'title': row[1],
-                    'author': row[2],
-                    'category': row[3],
-                    'category_id': row[4],
-                    'description': row[5],
-                    'price': float(row[6]),
-                    'stock': row[7],
-                    'rating': float(row[8]) if row[8] else 0.0,
-                    'image': row[9],
-                    'status': row[10],
-                    'isbn': row[11],
-                    'created_at': row[12].strftime('%Y-%m-%d %H:%M:%S') if row[12] else None,
-                    'updated_at': row[13].strftime('%Y-%m-%d %H:%M:%S') if row[13] else None
-                })
-            return make_response({'books': books}, '获取图书列表成功')
+            if not paginated:
+                data = catalog_cache.get_snapshot(
+                    'book_list',
+                    lambda: {'books': load_all_books()},
+                    size_of=lambda snapshot: len(snapshot['books'])
+                )
+                if fields is not None:
+                    # 完整列表已在目录缓存中，直接从快照挑选字段；最后修改时间仍按完整快照计算
+                    cache_key, projected = project_book_list(data, fields)
+                    return make_conditional_response(projected, '获取图书列表成功',
+                                                     last_modified=lambda _: book_list_last_modified(data),
+                                                     cache_key=cache_key)
+                return make_conditional_response(data, '获取图书列表成功',
+                                                 last_modified=book_list_last_modified, cache_key='book_list')
+
+            # 多取一行用于判断是否还有下一页
+            params = {'limit': limit + 1}
+            if cursor:
+                params['cursor_created_at'] = cursor[0]
+                params['cursor_id'] = cursor[1]
+
+            # 游标需要 created_at，按字段筛选且未请求时额外查询但不返回
+            names = fields
+            if fields is not None and 'created_at' not in fields:
+                names = fields + ['created_at']
+
+            page_query = BOOKS_NEXT_PAGE if cursor else BOOKS_FIRST_PAGE
+            books = page_query.all(db.session, params, names)
+            has_more = len(books) > limit
+            if has_more:
+                books = books[:limit]
+
+            next_cursor = encode_keyset_cursor(books[-1]['created_at'], books[-1]['id']) if has_more else None
+            if names is not fields:
+                for book in books:
+                    del book['created_at']
+            return make_response({
+                'books': books,
+                'limit': limit,
+                'has_more': has_more,
+                'next_cursor': next_cursor
+            }, '获取图书列表成功')
     except Exception as e:
         return make_response(None, f'获取图书列表失败: {str(e)}', 500)
 
+# 批量获取图书的最大数量
+BOOKS_BATCH_MAX_SIZE = int(os.getenv('BOOKS_BATCH_MAX_SIZE', '100'))
+
+# 解析批量查询的图书ID列表（去重并保持顺序）
+def parse_book_ids(values):
+    book_ids = []
+    for value in values:
+        value = str(value).strip()
+        if not value:
+            continue
+        try:
+            book_ids.append(int(value))
+        except ValueError:
+            raise ValueError(f'无效的图书ID: {value}')
+    book_ids = list(dict.fromkeys(book_ids))
+    if not book_ids:
+        raise ValueError('缺少图书ID')
+    if len(book_ids) > BOOKS_BATCH_MAX_SIZE:
+        raise ValueError(f'一次最多查询{BOOKS_BATCH_MAX_SIZE}本图书')
+    return book_ids
+
+# 批量获取图书API（购物车、结算、订单详情使用）
+# GET /api/books/batch?ids=1,2,3，ID较多时可用 POST，请求体 {"ids": [1, 2, 3]}
+# 返回以图书ID为键的结果，不存在的图书值为 null 并列入 not_found
+@app.route('/api/books/batch', methods=['GET', 'POST'])
+def get_books_batch():
+    try:
+        from flask import request
+        try:
+            if request.method == 'POST':
+                data = request.get_json(silent=True) or {}
+                ids = data.get('ids')
+                if not isinstance(ids, list):
+                    raise ValueError('ids必须是数组')
+            else:
+                ids = request.args.get('ids', '').split(',')
+            book_ids = parse_book_ids(ids)
+        except ValueError as e:
+            return make_response(None, str(e), 400)
+
+        with app.app_context():
+            found = catalog_cache.get_books(book_ids, load_book_details)
+            return make_response({
+                'books': {str(book_id): found.get(book_id) for book_id in book_ids},
+                'not_found': [book_id for book_id in book_ids if book_id not in found]
+            }, '批量获取图书成功')
+    except Exception as e:
+        return make_response(None, f'批量获取图书失败: {str(e)}', 500)
+
 # 获取单个图书详情API
 @app.route('/api/books/<int:book_id>', methods=['GET'])
 def get_book_by_id(book_id):
     try:
         with app.app_context():
-            # 查询指定ID的图书，关联分类表获取分类名称
-            result = db.session.execute(text("""
-                SELECT
-                    b.id,
-                    b.isbn,
-                    b.title,
-                    b.author,
-                    c.name AS category,
-                    b.category_id,
-                    b.description,
-                    b.price,
-                    b.stock,
-                    b.rating,
-                    b.image,
-                    b.status,
-                    b.created_at,
-                    b.updated_at
-                FROM books b
-                LEFT JOIN categories c ON b.category_id = c.id
-                WHERE b.id = :book_id
-            """), {'book_id': book_id})
-
-            book_row = result.fetchone()
+            # 查询指定ID的图书（优先从目录缓存读取），关联分类表获取分类名称
+            book_data = catalog_cache.get_book(book_id, load_book_detail)
 
             # 如果图书不存在，返回404
-            if not book_row:
+            if not book_data:
                 return make_response(None, '图书不存在', 404)
 
-            # 构建图书详情数据
-            book_data = {
-                'id': book_row[0],
-                'isbn': book_row[1],
-                'title': book_row[2],
-                'author': book_row[3],
-                'category': book_row[4],
-                'category_id': book_row[5],
-                'description': book_row[6],
-                'price': float(book_row[7]),
-                'stock': book_row[8],
-                'rating': float(book_row[9]) if book_row[9] else 0.0,
-                'image': book_row[10],
-                'status': book_row[11],
-                'created_at': book_row[12].strftime('%Y-%m-%d %H:%M:%S') if book_row[12] else None,
-                'updated_at': book_row[13].strftime('%Y-%m-%d %H:%M:%S') if book_row[13] else None
-            }
-
-            return make_response(book_data, '获取图书详情成功')
+            return make_conditional_response(book_data, '获取图书详情成功',
+                                             last_modified=parse_db_timestamp(book_data['updated_at']))
     except Exception as e:
         return make_response(None, f'获取图书详情失败: {str(e)}', 500)
 
@@ -713,22 +1351,46 @@ def get_book_by_id(book_id):
 def get_all_categories():
     try:
         with app.app_context():
-            result = db.session.execute(text("""
-                SELECT id, name, description
-                FROM categories
-                ORDER BY id ASC
-            """))
-            categories = []
-            for row in result:
-                categories.append({
-                    'id': row[0],
-                    'name': row[1],
-                    'description': row[2]
-                })
-            return make_response({'categories': categories}, '获取分类列表成功')
+            data = catalog_cache.get_snapshot(
+                'categories',
+                lambda: {'categories': load_all_categories()},
+                size_of=lambda snapshot: len(snapshot['categories'])
+            )
+            return make_conditional_response(data, '获取分类列表成功', cache_key='categories')
     except Exception as e:
         return make_response(None, f'获取分类列表失败: {str(e)}', 500)
 
+# 目录缓存统计API（命中/未命中次数、当前版本号）
+@app.route('/api/catalog/cache-stats', methods=['GET'])
+def get_catalog_cache_stats():
+    return make_response(catalog_cache.get_stats(), '获取目录缓存统计成功')
+
+# ============================================
+# 图书ID分配
+# ============================================
+
+# 空闲ID列表的全量重建间隔（秒），用于同步其他进程删除图书留下的空缺，0表示只在启动后首次使用时构建
+BOOK_ID_ALLOCATOR_TTL = int(os.getenv('BOOK_ID_ALLOCATOR_TTL', '300'))
+# 分配的ID已被占用（其他进程抢先写入）时的最大重试次数
+BOOK_ID_MAX_RETRIES = 3
+
+book_id_allocator = IdAllocator()
+
+# 确保ID分配器已构建（首次使用或超过重建间隔时从数据库加载已用ID）
+def ensure_book_id_allocator():
+    built_at = book_id_allocator.built_at
+    if built_at is None or (BOOK_ID_ALLOCATOR_TTL > 0 and time.time() - built_at > BOOK_ID_ALLOCATOR_TTL):
+        result = db.session.execute(text("SELECT id FROM books ORDER BY id"))
+        book_id_allocator.rebuild(row[0] for row in result)
+    return book_id_allocator
+
+# 判断是否为主键冲突（区别于ISBN等唯一键冲突）
+def is_primary_key_conflict(error):
+    return 'PRIMARY' in str(getattr(error, 'orig', error))
+
+# books.rating 由评论聚合（book_rating_stats）得出，添加和更新图书时不能直接设置
+RATING_READ_ONLY_MESSAGE = '评分由用户评论计算得出，不能直接设置'
+
 # 添加图书API
 @app.route('/api/books', methods=['POST'])
 def add_book():
@@ -741,30 +1403,16 @@ def add_book():
         for field in required_fields:
             if field not in data:
                 return make_response(None, f'缺少必填字段: {field}', 400)
+        if 'rating' in data:
+            return make_response(None, RATING_READ_ONLY_MESSAGE, 400)
         
         with app.app_context():
-            # 查找最小的可用ID（填补删除后留下的空缺）
-            find_min_available_id_query = text("""
-                SELECT MIN(t1.id + 1)
-                FROM books t1
-                LEFT JOIN books t2 ON t1.id + 1 = t2.id
-                WHERE t2.id IS NULL AND t1.id + 1 > 0
-            """)
-            min_available_id = db.session.execute(find_min_available_id_query).scalar()
-            
-            # 如果没有空缺的ID，则获取当前最大ID加1
-            if not min_available_id:
-                max_id_query = text("SELECT MAX(id) FROM books")
-                max_id = db.session.execute(max_id_query).scalar()
-                min_available_id = 1 if max_id is None else max_id + 1
-            
-            # 插入新图书（指定ID）
+            # 插入新图书（指定ID）；评分由评论聚合得出，新书为默认值0
             insert_query = text("""
-                INSERT INTO books (id, title, author, isbn, category_id, description, price, stock, rating, image, status)
-                VALUES (:id, :title, :author, :isbn, :category_id, :description, :price, :stock, :rating, :image, :status)
+                INSERT INTO books (id, title, author, isbn, category_id, description, price, stock, image, status)
+                VALUES (:id, :title, :author, :isbn, :category_id, :description, :price, :stock, :image, :status)
             """)
-            db.session.execute(insert_query, {
-                'id': min_available_id,
+            insert_params = {
                 'title': data['title'],
                 'author': data['author'],
                 'isbn': data.get('isbn'),
@@ -772,28 +1420,38 @@ def add_book():
                 'description': data.get('description'),
                 'price': data['price'],
                 'stock': data['stock'],
-                'rating': data.get('rating', 0.0),
                 'image': data.get('image'),
                 'status': data.get('status', 'available')
-            })
-            db.session.commit()
+            }
+
+            # 从ID分配器取最小的可用ID（填补删除后留下的空缺）
+            # 其他进程可能已经占用了该ID，主键冲突时重建空闲列表后重试
+            for attempt in range(BOOK_ID_MAX_RETRIES):
+                min_available_id = ensure_book_id_allocator().allocate()
+                try:
+                    db.session.execute(insert_query, dict(insert_params, id=min_available_id))
+                    add_counter_deltas(counter_deltas(
+                        'books', None, (insert_params['status'], insert_params['stock'])
+                    ))
+                    db.session.commit()
+                    break
+                except IntegrityError as e:
+                    db.session.rollback()
+                    if not is_primary_key_conflict(e) or attempt == BOOK_ID_MAX_RETRIES - 1:
+                        book_id_allocator.release(min_available_id)
+                        raise
+                    book_id_allocator.built_at = None
+                except Exception:
+                    book_id_allocator.release(min_available_id)
+                    raise
+            sync_books_to_indexes([min_available_id])
+            refresh_book_similarity(min_available_id)
             
             # 获取新创建的图书信息
-            new_book_query = text("SELECT id, title, author, isbn, price, stock, status FROM books WHERE id = :id")
-            new_book = db.session.execute(new_book_query, {'id': min_available_id}).fetchone()
+            book_data = BOOK_BY_ID.first(db.session, {'book_id': min_available_id}, BOOK_CREATED_FIELDS)
 
-            if not new_book:
+            if not book_data:
                 return make_response(None, '添加图书成功，但无法获取新图书信息', 201)
-
-            book_data = {
-                'id': new_book[0],
-                'title': new_book[1],
-                'author': new_book[2],
-                'isbn': new_book[3],
-                'price': float(new_book[4]),
-                'stock': new_book[5],
-                'status': new_book[6]
-            }
             
             return make_response(book_data, '添加图书成功')
     except Exception as e:
@@ -806,10 +1464,12 @@ def update_book(book_id):
     try:
         from flask import request
         data = request.get_json()
+        if 'rating' in data:
+            return make_response(None, RATING_READ_ONLY_MESSAGE, 400)
         
         with app.app_context():
-            # 检查图书是否存在
-            check_query = text("SELECT id FROM books WHERE id = :book_id")
+            # 检查图书是否存在（锁定该行，修改前的状态和库存用于更新图书计数器）
+            check_query = text("SELECT id, status, stock FROM books WHERE id = :book_id FOR UPDATE")
             check_result = db.session.execute(check_query, {'book_id': book_id}).fetchone()
             
             if not check_result:
@@ -843,10 +1503,6 @@ def update_book(book_id):
                 update_fields.append("stock = :stock")
                 update_params['stock'] = data['stock']
             
-            if 'rating' in data:
-                update_fields.append("rating = :rating")
-                update_params['rating'] = data['rating']
-            
             if 'image' in data:
                 update_fields.append("image = :image")
                 update_params['image'] = data['image']
@@ -860,19 +1516,17 @@ def update_book(book_id):
             
             update_query = text(f"UPDATE books SET {', '.join(update_fields)} WHERE id = :book_id")
             db.session.execute(update_query, update_params)
+            add_counter_deltas(counter_deltas(
+                'books', (check_result[1], check_result[2]),
+                (data.get('status', check_result[1]), data.get('stock', check_result[2]))
+            ))
             db.session.commit()
+            sync_books_to_indexes([book_id])
+            if SIMILARITY_FIELDS & set(data):
+                refresh_book_similarity(book_id)
             
             # 获取更新后的图书信息
-            updated_book_query = text("SELECT id, title, author, price, stock FROM books WHERE id = :book_id")
-            updated_book = db.session.execute(updated_book_query, {'book_id': book_id}).fetchone()
-            
-            book_data = {
-                'id': updated_book[0],
-                'title': updated_book[1],
-                'author': updated_book[2],
-                'price': float(updated_book[3]),
-                'stock': updated_book[4]
-            }
+            book_data = BOOK_BY_ID.first(db.session, {'book_id': book_id}, BOOK_UPDATED_FIELDS)
             
             return make_response(book_data, '更新图书成功')
     except Exception as e:
@@ -884,28 +1538,275 @@ def update_book(book_id):
 def delete_book(book_id):
     try:
         with app.app_context():
-            # 检查图书是否存在
-            check_query = text("SELECT id FROM books WHERE id = :book_id")
+            # 检查图书是否存在（锁定该行，状态和库存用于更新图书计数器）
+            check_query = text("SELECT id, status, stock FROM books WHERE id = :book_id FOR UPDATE")
             check_result = db.session.execute(check_query, {'book_id': book_id}).fetchone()
             
             if not check_result:
                 return make_response(None, '图书不存在', 404)
             
-            # 删除图书
+            # 删除图书，同一事务中更新图书计数器
             delete_query = text("DELETE FROM books WHERE id = :book_id")
             db.session.execute(delete_query, {'book_id': book_id})
+            add_counter_deltas(counter_deltas('books', (check_result[1], check_result[2]), None))
             db.session.commit()
+            book_id_allocator.release(book_id)
+            sync_books_to_indexes([book_id])
+            refresh_book_similarity(book_id)
             
             return make_response(None, '删除图书成功')
     except Exception as e:
         db.session.rollback()
         return make_response(None, f'删除图书失败: {str(e)}', 500)
 
+# ============================================
+# 图书批量导入
+# ============================================
+
+# 每批写入的图书数量（每批一个事务、一条多行 INSERT ... ON DUPLICATE KEY UPDATE）
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '500'))
+IMPORT_MAX_BATCH_SIZE = 5000
+
+# 导入字段（isbn 为去重键）；可选字段未提供时，新书使用默认值，已有图书保留原值
+# 评分由评论聚合得出，导入数据中的 rating 字段被忽略
+IMPORT_COLUMNS = ['isbn', 'title', 'author', 'category_id', 'description', 'price', 'stock', 'image', 'status']
+IMPORT_OPTIONAL_COLUMNS = ['category_id', 'description', 'image', 'status']
+IMPORT_DEFAULTS = {'status': 'available'}
+
+# 解析导入文件内容：JSON 数组（或 {"books": [...]}）或带表头的CSV
+def parse_import_content(content, import_format):
+    if import_format == 'csv':
+        return [dict(row) for row in csv.DictReader(io.StringIO(content.lstrip('\ufeff')))]
+    data = json.loads(content)
+    if isinstance(data, dict):
+        data = data.get('books')
+    if not isinstance(data, list):
+        raise ValueError('JSON内容必须是图书数组或 {"books": [...]}')
+    return data
+
+# 校验并规范化一行导入数据，返回 (写入参数, 错误信息)
+def validate_import_row(row, category_ids):
+    if not isinstance(row, dict):
+        return None, '数据格式错误'
+
+    def value_of(field):
+        value = row.get(field)
+        if isinstance(value, str):
+            value = value.strip()
+        return None if value == '' else value
+
+    params = {}
+    for field in ['isbn', 'title', 'author', 'price', 'stock']:
+        params[field] = value_of(field)
+        if params[field] is None:
+            return None, f'缺少必填字段: {field}'
+    params['isbn'] = str(params['isbn'])
+    if len(params['isbn']) > 20:
+        return None, 'ISBN长度不能超过20个字符'
+    if len(str(params['title'])) > 100 or len(str(params['author'])) > 100:
+        return None, '书名和作者长度不能超过100个字符'
+
+    try:
+        params['price'] = round(float(params['price']), 2)
+        params['stock'] = int(params['stock'])
+    except (TypeError, ValueError):
+        return None, '价格或库存格式错误'
+    if params['price'] < 0 or params['stock'] < 0:
+        return None, '价格和库存不能为负数'
+
+    # 分类可以用 category_id，也可以用分类名称 category（CSV中更方便）
+    category_id = value_of('category_id')
+    category_name = value_of('category')
+    if category_id is not None:
+        try:
+            category_id = int(category_id)
+        except (TypeError, ValueError):
+            return None, '分类ID格式错误'
+        if category_id not in category_ids.values():
+            return None, f'分类不存在: {category_id}'
+    elif category_name is not None:
+        category_id = category_ids.get(category_name)
+        if category_id is None:
+            return None, f'分类不存在: {category_name}'
+    params['category_id'] = category_id
+
+    status = value_of('status')
+    if status is not None and status not in ('available', 'unavailable'):
+        return None, '状态只能是available或unavailable'
+    params['status'] = status
+
+    params['description'] = value_of('description')
+    params['image'] = value_of('image')
+    return params, None
+
+# 写入一批图书，返回 (新增数量, 更新数量, 图书ID列表)
+def upsert_book_batch(batch):
+    isbn_param = bindparam('isbns', expanding=True)
+    isbns = [params['isbn'] for _, params in batch]
+    # 加锁读取已有图书（同时锁住不存在的ISBN所在的间隙），并发导入相同ISBN时等待本批提交；
+    # 已有图书的状态和库存用于计算图书计数器的增量
+    existing = {row[0]: (row[1], row[2]) for row in db.session.execute(
+        text("SELECT isbn, status, stock FROM books WHERE isbn IN :isbns FOR UPDATE").bindparams(isbn_param),
+        {'isbns': isbns}
+    )}
+
+    values = []
+    statement_params = {}
+    for i, (_, params) in enumerate(batch):
+        values.append('(' + ', '.join(f':{column}_{i}' for column in IMPORT_COLUMNS) + ')')
+        for column in IMPORT_COLUMNS:
+            value = params[column]
+            if value is None and params['isbn'] not in existing:
+                value = IMPORT_DEFAULTS.get(column)
+            statement_params[f'{column}_{i}'] = value
+
+    # 可选字段为 NULL 时保留已有值
+    updates = ', '.join(
+        f'{column} = COALESCE(VALUES({column}), {column})' if column in IMPORT_OPTIONAL_COLUMNS
+        else f'{column} = VALUES({column})'
+        for column in IMPORT_COLUMNS if column != 'isbn'
+    )
+    db.session.execute(text(
+        f"INSERT INTO books ({', '.join(IMPORT_COLUMNS)}) VALUES {', '.join(values)} "
+        f"ON DUPLICATE KEY UPDATE {updates}"
+    ), statement_params)
+    book_deltas = {}
+    for _, params in batch:
+        before = existing.get(params['isbn'])
+        status = params['status'] or (before[0] if before else IMPORT_DEFAULTS['status'])
+        for name, delta in counter_deltas('books', before, (status, params['stock'])).items():
+            book_deltas[name] = book_deltas.get(name, 0) + delta
+    add_counter_deltas(book_deltas)
+    db.session.commit()
+
+    book_ids = [row[0] for row in db.session.execute(
+        text("SELECT id FROM books WHERE isbn IN :isbns").bindparams(isbn_param), {'isbns': isbns}
+    )]
+    book_id_allocator.mark_used(book_ids)
+    sync_books_to_indexes(book_ids)
+    created = sum(1 for isbn in isbns if isbn not in existing)
+    return created, len(isbns) - created, book_ids
+
+# 批量导入图书：先校验全部数据，再按ISBN分批upsert，每批单独提交
+# 返回导入报告，errors 中的 row 为数据行号（从1开始，不含CSV表头）
+def import_books(rows, batch_size=IMPORT_BATCH_SIZE, dry_run=False):
+    category_ids = {row[1]: row[0] for row in db.session.execute(text("SELECT id, name FROM categories"))}
+
+    valid = []
+    errors = []
+    seen_isbns = {}
+    for row_number, row in enumerate(rows, start=1):
+        params, error = validate_import_row(row, category_ids)
+        if params and params['isbn'] in seen_isbns:
+            error = f"ISBN与第{seen_isbns[params['isbn']]}行重复"
+        if error:
+            isbn = row.get('isbn') if isinstance(row, dict) else None
+            errors.append({'row': row_number, 'isbn': isbn, 'error': error})
+            continue
+        seen_isbns[params['isbn']] = row_number
+        valid.append((row_number, params))
+
+    report = {
+        'total': len(rows),
+        'valid': len(valid),
+        'created': 0,
+        'updated': 0,
+        'failed': len(errors),
+        'batches': 0,
+        'dry_run': dry_run,
+        'errors': errors
+    }
+    if dry_run:
+        return report
+
+    imported_ids = []
+    for start in range(0, len(valid), batch_size):
+        batch = valid[start:start + batch_size]
+        try:
+            created, updated, book_ids = upsert_book_batch(batch)
+            report['created'] += created
+            report['updated'] += updated
+            imported_ids.extend(book_ids)
+        except Exception as e:
+            # 整批回滚，其余批次继续导入
+            db.session.rollback()
+            report['failed'] += len(batch)
+            errors.extend({'row': row_number, 'isbn': params['isbn'], 'error': f'写入失败: {str(e)}'}
+                          for row_number, params in batch)
+        report['batches'] += 1
+
+    # 全部批次提交后更新导入图书的相似图书
+    refresh_books_similarity(imported_ids)
+    errors.sort(key=lambda item: item['row'])
+    return report
+
+# 批量导入图书API
+# 支持 JSON 请求体、CSV 请求体（Content-Type: text/csv）或上传文件（字段名 file，.csv/.json）
+# 参数：batch_size 每批数量，dry_run=1 只校验不写入
+@app.route('/api/books/import', methods=['POST'])
+def import_books_api():
+    try:
+        from flask import request
+        try:
+            batch_size = parse_page_limit(request.args.get('batch_size'), IMPORT_BATCH_SIZE, IMPORT_MAX_BATCH_SIZE)
+        except ValueError:
+            return make_response(None, 'batch_size参数必须为整数', 400)
+        dry_run = request.args.get('dry_run') in ('1', 'true')
+
+        try:
+            upload = request.files.get('file')
+            if upload:
+                import_format = 'csv' if upload.filename.lower().endswith('.csv') else 'json'
+                rows = parse_import_content(upload.read().decode('utf-8'), import_format)
+            elif request.mimetype == 'text/csv':
+                rows = parse_import_content(request.get_data(as_text=True), 'csv')
+            else:
+                rows = parse_import_content(request.get_data(as_text=True), 'json')
+        except (ValueError, UnicodeDecodeError) as e:
+            return make_response(None, f'导入数据格式错误: {str(e)}', 400)
+
+        if not rows:
+            return make_response(None, '没有需要导入的图书', 400)
+
+        with app.app_context():
+            report = import_books(rows, batch_size, dry_run)
+            return make_response(report, '图书导入完成' if not dry_run else '图书数据校验完成')
+    except Exception as e:
+        db.session.rollback()
+        return make_response(None, f'导入图书失败: {str(e)}', 500)
+
+# 命令行批量导入：flask --app app import-books books.csv --batch-size 1000
+@app.cli.command('import-books')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True, help='每批写入的图书数量')
+@click.option('--dry-run', is_flag=True, help='只校验数据，不写入数据库')
+def import_books_command(path, batch_size, dry_run):
+    """从JSON或CSV文件批量导入图书（按ISBN新增或更新）"""
+    with open(path, encoding='utf-8') as f:
+        rows = parse_import_content(f.read(), 'csv' if path.lower().endswith('.csv') else 'json')
+    with app.app_context():
+        start = time.time()
+        report = import_books(rows, batch_size, dry_run)
+    print(f"共 {report['total']} 行，校验通过 {report['valid']} 行，新增 {report['created']}，"
+          f"更新 {report['updated']}，失败 {report['failed']}，耗时 {time.time() - start:.2f}s")
+    for error in report['errors'][:50]:
+        print(f"  第{error['row']}行 (ISBN: {error['isbn']}): {error['error']}")
+    if len(report['errors']) > 50:
+        print(f"  ... 另有 {len(report['errors']) - 50} 条错误未显示")
+
 # 获取图书总数API
 @app.route('/api/books/count', methods=['GET'])
 def get_books_count():
     try:
         with app.app_context():
+            # 优先读取计数器
+            counters = read_counters(['books_available', 'books_available_stock'])
+            if counters is not None:
+                return make_response({
+                    'total': counters['books_available'],
+                    'totalStock': counters['books_available_stock']
+                }, '获取图书统计数据成功')
+
             # 查询图书总数和总库存（仅计算可用状态的图书）
             result = db.session.execute(text("""
                 SELECT 
@@ -923,124 +1824,953 @@ def get_books_count():
     except Exception as e:
         return make_response(None, f'获取图书统计数据失败: {str(e)}', 500)
 
-# 实时库存预警API
+# ============================================
+# 低库存图书
+# ============================================
+
+# 低库存阈值：状态为available且库存低于该值的图书视为低库存
+LOW_STOCK_THRESHOLD = int(os.getenv('LOW_STOCK_THRESHOLD', '20'))
+# 低库存集合的全量重建间隔（秒），多进程部署时用于感知其他进程的库存变化，0表示不过期
+LOW_STOCK_TTL = int(os.getenv('LOW_STOCK_TTL', '60'))
+# SSE连接的心跳间隔（秒）
+LOW_STOCK_HEARTBEAT = int(os.getenv('LOW_STOCK_HEARTBEAT', '15'))
+# SSE同时连接数上限：每个连接在整个订阅期间占用一个工作线程（线程型服务器）或进程，
+# 达到上限后新的订阅返回503，避免订阅者占满工作线程；0表示不限制
+LOW_STOCK_STREAM_MAX_SUBSCRIBERS = int(os.getenv('LOW_STOCK_STREAM_MAX_SUBSCRIBERS', '50'))
+
+low_stock_tracker = LowStockTracker(LOW_STOCK_THRESHOLD)
+_low_stock_stream_state = {'subscribers': 0}
+_low_stock_stream_lock = threading.Lock()
+# 心跳时的集合重建：同一时间只有一个连接执行，其他连接跳过
+_low_stock_refresh_lock = threading.Lock()
+
+LOW_STOCK = SelectQuery({
+    'id': ('b.id', None),
+    'title': ('b.title', None),
+    'author': ('b.author', None),
+    'category': ('c.name', None),
+    'stock': ('b.stock', None),
+    'status': ('b.status', None)
+}, """
+    FROM books b
+    LEFT JOIN categories c ON b.category_id = c.id
+""")
+LOW_STOCK_BELOW_THRESHOLD = LOW_STOCK.where(" WHERE b.status = 'available' AND b.stock < :threshold")
+LOW_STOCK_BY_IDS = LOW_STOCK.where(" WHERE b.id IN :book_ids", expanding=['book_ids'])
+
+def low_stock_tracker_stale():
+    built_at = low_stock_tracker.built_at
+    return built_at is None or (LOW_STOCK_TTL > 0 and time.time() - built_at > LOW_STOCK_TTL)
+
+# 获取低库存集合，首次使用或超过TTL时从数据库加载（只读取低库存的图书）
+def ensure_low_stock_tracker():
+    if low_stock_tracker_stale():
+        result, row_to_dict = LOW_STOCK_BELOW_THRESHOLD.execute(db.session, {'threshold': low_stock_tracker.threshold})
+        low_stock_tracker.rebuild(row_to_dict(row) for row in result)
+    return low_stock_tracker
+
+# 格式化一条SSE消息
+def format_sse(event_type, data, event_id=None):
+    message = f'event: {event_type}\n'
+    if event_id is not None:
+        message += f'id: {event_id}\n'
+    return message + f'data: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+# 获取低库存图书API
+# mode=demand（或 LOW_STOCK_MODE=demand）时按销售速度判断：返回补货预测中可售天数不超过补货周期的图书
 @app.route('/api/books/low-stock', methods=['GET'])
 def get_low_stock_books():
     try:
+        from flask import request
+
+        mode = request.args.get('mode', LOW_STOCK_MODE)
+        if mode not in ('threshold', 'demand'):
+            return make_response(None, 'mode只能是threshold或demand', 400)
+
         with app.app_context():
-            # 查询库存低于10本且状态为available的图书
-            result = db.session.execute(text("""
-                SELECT
-                    b.id,
-                    b.title,
-                    b.author,
-                    c.name AS category,
-                    b.stock
-                FROM books b
-                LEFT JOIN categories c ON b.category_id = c.id
-                WHERE b.status = 'available' AND b.stock < 20
-                ORDER BY b.stock ASC
-            """))
-            low_stock_books = []
-            for row in result:
-                low_stock_books.append({
-                    'id': row[0],
-                    'title': row[1],
-                    'author': row[2],
-                    'category': row[3],
-                    'stock': row[4]
-                })
+            if mode == 'demand':
+                forecast = get_restock_forecast()
+                if forecast['error']:
+                    return make_response(None, forecast['error'], 503)
+                low_stock_books = [book for book in forecast['books'] if book['needs_restock']]
+                return make_response({
+                    'books': low_stock_books,
+                    'total': len(low_stock_books),
+                    'mode': mode,
+                    'lead_time_days': RESTOCK_LEAD_TIME_DAYS,
+                    'generated_at': forecast['generated_at']
+                }, '获取低库存图书成功')
+
+            # 从内存中的低库存集合读取（库存低于LOW_STOCK_THRESHOLD且状态为available的图书）
+            low_stock_books = ensure_low_stock_tracker().list_books()
 
             return make_response({
                 'books': low_stock_books,
-                'total': len(low_stock_books)
+                'total': len(low_stock_books),
+                'threshold': low_stock_tracker.threshold
             }, '获取低库存图书成功')
     except Exception as e:
         return make_response(None, f'获取低库存图书失败: {str(e)}', 500)
 
-# 搜索图书API
-@app.route('/api/books/search', methods=['GET'])
-def search_books():
+# 心跳时调用：集合过期时重建（重建时会推送其他进程造成的变化），其他连接正在重建时跳过
+def refresh_stale_low_stock_tracker():
+    if not low_stock_tracker_stale() or not _low_stock_refresh_lock.acquire(blocking=False):
+        return
+    try:
+        with app.app_context():
+            ensure_low_stock_tracker()
+    except Exception as e:
+        app.logger.warning(f'刷新低库存集合失败: {str(e)}')
+    finally:
+        _low_stock_refresh_lock.release()
+
+# 低库存提醒事件流（text/event-stream）
+# 连接后先推送一次 snapshot（当前全部低库存图书），之后图书进入低库存推送 low_stock，
+# 低库存图书库存变化推送 stock_update，补货或下架后推送 restocked，删除后推送 removed
+# 每个连接在订阅期间一直占用一个工作线程，同时连接数受 LOW_STOCK_STREAM_MAX_SUBSCRIBERS 限制
+@app.route('/api/books/low-stock/stream', methods=['GET'])
+def stream_low_stock_books():
+    with _low_stock_stream_lock:
+        if 0 < LOW_STOCK_STREAM_MAX_SUBSCRIBERS <= _low_stock_stream_state['subscribers']:
+            return make_response(None, '低库存提醒订阅数已达上限，请稍后重试', 503)
+        _low_stock_stream_state['subscribers'] += 1
+
+    events = None
+    released = []
+
+    # 连接关闭时（包括响应尚未开始发送就断开）释放订阅
+    def release():
+        with _low_stock_stream_lock:
+            if released:
+                return
+            released.append(True)
+            _low_stock_stream_state['subscribers'] -= 1
+        if events is not None:
+            low_stock_tracker.unsubscribe(events)
+
+    try:
+        with app.app_context():
+            tracker = ensure_low_stock_tracker()
+            events = tracker.subscribe()
+            books = tracker.list_books()
+            snapshot = {'books': books, 'total': len(books), 'threshold': tracker.threshold}
+
+        def generate():
+            try:
+                yield 'retry: 5000\n\n'
+                yield format_sse('snapshot', snapshot)
+                while True:
+                    try:
+                        event = events.get(timeout=LOW_STOCK_HEARTBEAT)
+                    except queue.Empty:
+                        yield ': keepalive\n\n'
+                        refresh_stale_low_stock_tracker()
+                        continue
+                    yield format_sse(event['type'], event, event['id'])
+            finally:
+                # 客户端断开连接
+                release()
+
+        response = Response(generate(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+        response.call_on_close(release)
+        return response
+    except Exception as e:
+        release()
+        return make_response(None, f'订阅低库存提醒失败: {str(e)}', 500)
+
+# ============================================
+# 补货预测
+# ============================================
+
+# 低库存列表的默认判断方式：threshold（库存低于阈值）或 demand（按销售速度预测的可售天数）
+LOW_STOCK_MODE = os.getenv('LOW_STOCK_MODE', 'threshold')
+# 参与预测的历史天数
+RESTOCK_HISTORY_DAYS = int(os.getenv('RESTOCK_HISTORY_DAYS', '90'))
+# 移动平均的天数
+RESTOCK_MOVING_AVERAGE_DAYS = int(os.getenv('RESTOCK_MOVING_AVERAGE_DAYS', '14'))
+# 指数平滑系数（越大越偏重最近的销量）
+RESTOCK_SMOOTHING = float(os.getenv('RESTOCK_SMOOTHING', '0.3'))
+# 补货周期（天）：可售天数不超过该值时需要补货
+RESTOCK_LEAD_TIME_DAYS = int(os.getenv('RESTOCK_LEAD_TIME_DAYS', '7'))
+# 补货后希望额外覆盖的天数
+RESTOCK_TARGET_DAYS = int(os.getenv('RESTOCK_TARGET_DAYS', '30'))
+# 预测结果缓存时间（秒）
+RESTOCK_FORECAST_TTL = int(os.getenv('RESTOCK_FORECAST_TTL', '300'))
+RESTOCK_DEFAULT_LIMIT = 50
+RESTOCK_MAX_LIMIT = 500
+
+RESTOCK_BOOKS = LOW_STOCK.where(" WHERE b.status = 'available'")
+# 每本图书的日销量读取销售汇总表（sales_rollups）的按天图书维度，不扫描订单明细
+RESTOCK_DAILY_SALES_STATEMENT = text("""
+    SELECT dimension_id, period_start, units
+    FROM sales_rollups
+    WHERE granularity = 'day' AND dimension = 'book'
+      AND period_start >= :start AND period_start < :end AND units > 0
+""")
+# 检查销售汇总是否已回填：窗口内最早的有效订单和最早的按天汇总
+RESTOCK_FIRST_ORDER_STATEMENT = text("""
+    SELECT MIN(created_at) FROM orders
+    WHERE created_at >= :start AND created_at < :end AND status != 'cancelled'
+""")
+RESTOCK_FIRST_ROLLUP_STATEMENT = text("""
+    SELECT MIN(period_start) FROM sales_rollups
+    WHERE granularity = 'day' AND dimension = 'all'
+      AND period_start >= :start AND period_start < :end
+""")
+RESTOCK_ROLLUPS_NOT_BACKFILLED_MESSAGE = ('销售汇总尚未回填：预测窗口内有早于汇总数据的订单，'
+                                          '请先执行 flask --app app backfill-sales-rollups')
+
+_restock_forecast_cache = {'data': None, 'built_at': 0.0}
+_restock_forecast_lock = threading.Lock()
+
+# 检查预测窗口内的销售汇总是否可用，不可用时返回错误信息
+# 汇总表未创建，或窗口内最早的有效订单早于最早的按天汇总（表创建后尚未回填）时，预测会把需求算成0，不能据此判断无需补货
+def restock_sales_error(start, end):
+    if not sales_rollups_available():
+        return SALES_ROLLUPS_MISSING_MESSAGE
+    params = {'start': start, 'end': end}
+    first_order = db.session.execute(RESTOCK_FIRST_ORDER_STATEMENT, params).scalar()
+    if first_order is None:
+        return None
+    first_rollup = db.session.execute(RESTOCK_FIRST_ROLLUP_STATEMENT, params).scalar()
+    if first_rollup is None or first_rollup > first_order:
+        return RESTOCK_ROLLUPS_NOT_BACKFILLED_MESSAGE
+    return None
+
+# 计算全部在售图书的需求预测和补货建议，按可售天数升序（没有销量的图书排在最后）
+# 窗口截止到昨天：今天还没有结束，计入当天的部分销量会拉低移动平均
+# 销售汇总不可用时 error 为错误信息，不计算预测
+def build_restock_forecast():
+    end = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=RESTOCK_HISTORY_DAYS)
+    error = restock_sales_error(start, end)
+    if error:
+        return {'error': error}
+    books = RESTOCK_BOOKS.all(db.session)
+    sales = (
+        (book_id, (period_start - start).days, units)
+        for book_id, period_start, units in db.session.execute(RESTOCK_DAILY_SALES_STATEMENT, {'start': start, 'end': end})
+    )
+    demand = forecast_demand([book['id'] for book in books], sales, RESTOCK_HISTORY_DAYS,
+                             RESTOCK_MOVING_AVERAGE_DAYS, RESTOCK_SMOOTHING)
+    plans = [
+        restock_plan(book, *demand[book['id']], RESTOCK_LEAD_TIME_DAYS, RESTOCK_TARGET_DAYS)
+        for book in books
+    ]
+    plans.sort(key=lambda plan: (plan['days_of_cover'] is None, plan['days_of_cover'] or 0, plan['id']))
+    return {
+        'books': plans,
+        'error': None,
+        'history_days': RESTOCK_HISTORY_DAYS,
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+def get_restock_forecast():
+    if time.time() - _restock_forecast_cache['built_at'] > RESTOCK_FORECAST_TTL:
+        with _restock_forecast_lock:
+            if time.time() - _restock_forecast_cache['built_at'] > RESTOCK_FORECAST_TTL:
+                forecast = build_restock_forecast()
+                if forecast['error']:
+                    # 不缓存错误，建表或回填后立即生效
+                    return forecast
+                _restock_forecast_cache['data'] = forecast
+                _restock_forecast_cache['built_at'] = time.time()
+    return _restock_forecast_cache['data']
+
+# 补货建议API：按销售速度需要补货的图书及建议补货量（all=1 时返回全部在售图书的预测）
+@app.route('/api/books/restock-suggestions', methods=['GET'])
+def get_restock_suggestions():
     try:
         from flask import request
 
-        # 获取搜索参数
-        query = request.args.get('q', '').strip()
-        category = request.args.get('category', '').strip()
+        try:
+            limit = parse_page_limit(request.args.get('limit'), RESTOCK_DEFAULT_LIMIT, RESTOCK_MAX_LIMIT)
+        except ValueError as e:
+            return make_response(None, str(e), 400)
+        include_all = request.args.get('all', '').lower() in ('1', 'true', 'yes')
 
-        if not query and not category:
-            return make_response(None, '请提供搜索关键词或分类', 400)
+        with app.app_context():
+            forecast = get_restock_forecast()
+            if forecast['error']:
+                return make_response(None, forecast['error'], 503)
+            books = forecast['books'] if include_all else [book for book in forecast['books'] if book['needs_restock']]
+            return make_response({
+                'books': books[:limit],
+                'total': len(books),
+                'lead_time_days': RESTOCK_LEAD_TIME_DAYS,
+                'target_days': RESTOCK_TARGET_DAYS,
+                'history_days': forecast['history_days'],
+                'generated_at': forecast['generated_at']
+            }, '获取补货建议成功')
+    except Exception as e:
+        return make_response(None, f'获取补货建议失败: {str(e)}', 500)
+
+# 输出补货建议（命令行：flask --app app restock-forecast，可由定时任务执行）
+@app.cli.command('restock-forecast')
+@click.option('--limit', default=RESTOCK_DEFAULT_LIMIT, show_default=True, help='输出的图书数量')
+def restock_forecast_command(limit):
+    """按近期销量预测需求，输出需要补货的图书"""
+    with app.app_context():
+        forecast = build_restock_forecast()
+        if forecast['error']:
+            raise click.ClickException(forecast['error'])
+        books = [book for book in forecast['books'] if book['needs_restock']]
+        print(f'需要补货的图书：{len(books)}本（补货周期{RESTOCK_LEAD_TIME_DAYS}天）')
+        for book in books[:limit]:
+            print(f"  [{book['id']}] {book['title']}：库存{book['stock']}，日需求{book['daily_demand']}，"
+                  f"可售{book['days_of_cover']}天，建议补货{book['suggested_quantity']}")
+
+# ============================================
+# 管理后台首页统计
+# ============================================
 
+# 统计结果缓存时间（秒），多个管理员同时打开首页时共享同一份结果，0表示不缓存
+DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', '10'))
+# 首页展示的低库存图书数量
+DASHBOARD_LOW_STOCK_LIMIT = 10
+
+_dashboard_cache = {'data': None, 'built_at': 0.0}
+_dashboard_lock = threading.Lock()
+
+# 汇总首页统计：用户、图书、低库存、订单，每类数据一次查询
+def build_dashboard():
+    users = count_users_by_status()
+
+    sql, names = COUNTER_AGGREGATE_QUERIES['books']
+    book_counters = read_counters(names)
+    if book_counters is None:
+        book_row = db.session.execute(text(sql)).fetchone()
+        book_counters = {name: int(value or 0) for name, value in zip(names, book_row)}
+    books = {
+        'total': book_counters['books_available'],
+        'totalStock': book_counters['books_available_stock'],
+        'all': book_counters['books_total'],
+        'allStock': book_counters['books_stock'],
+        'unavailable': book_counters['books_total'] - book_counters['books_available']
+    }
+
+    # 低库存图书直接读取内存集合
+    low_stock_books = ensure_low_stock_tracker().list_books()
+
+    orders = {'total': 0, 'amount': 0.0, 'by_status': {}}
+    for status, count, amount in db.session.execute(text("""
+        SELECT status, COUNT(*), SUM(total_amount) FROM orders GROUP BY status
+    """)):
+        orders['total'] += count
+        orders['by_status'][status] = count
+        if status != 'cancelled':
+            orders['amount'] += float(amount or 0)
+    orders['amount'] = round(orders['amount'], 2)
+
+    return {
+        'users': users,
+        'books': books,
+        'low_stock': {
+            'total': len(low_stock_books),
+            'threshold': low_stock_tracker.threshold,
+            'books': low_stock_books[:DASHBOARD_LOW_STOCK_LIMIT]
+        },
+        'orders': orders,
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+# 管理后台首页统计API（一次请求获取首页全部数据）
+@app.route('/api/admin/dashboard', methods=['GET'])
+def get_admin_dashboard():
+    try:
         with app.app_context():
-            # 构建基础查询
-            sql_query = """
-                SELECT
-                    b.id,
-                    b.title,
-                    b.author,
-                    c.name AS category,
-                    b.description,
-                    b.price,
-                    b.stock,
-                    b.rating,
-                    b.image,
-                    b.status
-                FROM books b
-                LEFT JOIN categories c ON b.category_id = c.id
-                WHERE 1=1
-            """
-            params = {}
-
-            # 如果有搜索关键词,进行多字段模糊搜索
-            if query:
-                sql_query += """
-                    AND (
-                        b.title LIKE :query
-                        OR b.author LIKE :query
-                        OR b.description LIKE :query
-                        OR c.name LIKE :query
-                    )
-                """
-                params['query'] = f'%{query}%'
-
-            # 如果指定了分类且不是"全部"
-            if category and category != '全部':
-                sql_query += " AND c.name = :category"
-                params['category'] = category
-
-            # 按评分和标题排序
-            sql_query += " ORDER BY b.rating DESC, b.title ASC"
-
-            # 执行查询
-            result = db.session.execute(text(sql_query), params)
-            books = []
-            for row in result:
-                books.append({
-                    'id': row[0],
-                    'title': row[1],
-                    'author': row[2],
-                    'category': row[3],
-                    'description': row[4],
-                    'price': float(row[5]),
-                    'stock': row[6],
-                    'rating': float(row[7]) if row[7] else 0.0,
-                    'image': row[8],
-                    'status': row[9]
-                })
+            if time.time() - _dashboard_cache['built_at'] > DASHBOARD_CACHE_TTL:
+                # 加锁避免缓存过期时多个请求同时重新统计
+                with _dashboard_lock:
+                    if time.time() - _dashboard_cache['built_at'] > DASHBOARD_CACHE_TTL:
+                        _dashboard_cache['data'] = build_dashboard()
+                        _dashboard_cache['built_at'] = time.time()
+            return make_response(_dashboard_cache['data'], '获取首页统计成功')
+    except Exception as e:
+        return make_response(None, f'获取首页统计失败: {str(e)}', 500)
+
+# ============================================
+# 图书内存索引
+# ============================================
+
+# 索引最长使用时间（秒），超时后下次搜索时全量重建；多进程部署时用于同步其他进程的写入，0表示不过期
+SEARCH_INDEX_TTL = int(os.getenv('SEARCH_INDEX_TTL', '300'))
+
+book_search_index = BookSearchIndex()
+
+# 内存索引保存的图书字段（与搜索接口的返回字段一致），fields 参数按此校验
+BOOK_INDEX_FIELDS = {
+    'id': ('b.id', None),
+    'title': ('b.title', None),
+    'author': ('b.author', None),
+    'category': ('c.name', None),
+    'description': ('b.description', None),
+    'price': ('b.price', float),
+    'stock': ('b.stock', None),
+    'rating': ('b.rating', float_or_zero),
+    'image': ('b.image', None),
+    'status': ('b.status', None)
+}
+BOOK_INDEX_FROM = """
+    FROM books b
+    LEFT JOIN categories c ON b.category_id = c.id
+"""
+
+# 内存索引使用的图书查询
+BOOK_INDEX = SelectQuery(BOOK_INDEX_FIELDS, BOOK_INDEX_FROM)
+BOOK_INDEX_BY_IDS = BOOK_INDEX.where(" WHERE b.id IN :book_ids", expanding=['book_ids'])
+book_index_row_to_dict = BOOK_INDEX.row_to_dict
+
+# 获取搜索索引，首次使用或超过TTL时从数据库全量加载
+def ensure_search_index():
+    built_at = book_search_index.built_at
+    if built_at is None or (SEARCH_INDEX_TTL > 0 and time.time() - built_at > SEARCH_INDEX_TTL):
+        result, row_to_dict = BOOK_INDEX.execute(db.session)
+        book_search_index.rebuild(row_to_dict(row) for row in result)
+    return book_search_index
+
+# 搜索建议索引使用的图书查询，热度 = 评分 + log(1 + 有效订单销量)
+SUGGEST_INDEX_QUERY = """
+    SELECT b.id, b.title, b.author, c.name AS category, b.rating, COALESCE(s.units, 0) AS units
+    FROM books b
+    LEFT JOIN categories c ON b.category_id = c.id
+    LEFT JOIN (
+        SELECT oi.book_id, SUM(oi.quantity) AS units
+        FROM order_items oi
+        JOIN orders o ON oi.order_id = o.id
+        WHERE o.status != 'cancelled'{book_filter}
+        GROUP BY oi.book_id
+    ) s ON s.book_id = b.id
+"""
+SUGGEST_INDEX_STATEMENT = text(SUGGEST_INDEX_QUERY.format(book_filter=''))
+SUGGEST_INDEX_BY_IDS_STATEMENT = text(
+    SUGGEST_INDEX_QUERY.format(book_filter=' AND oi.book_id IN :book_ids') + " WHERE b.id IN :book_ids"
+).bindparams(bindparam('book_ids', expanding=True))
+
+book_suggest_index = SuggestIndex()
+
+def suggest_row_to_dict(row):
+    return {
+        'id': row[0],
+        'title': row[1],
+        'author': row[2],
+        'category': row[3],
+        'popularity': (float(row[4]) if row[4] else 0.0) + math.log1p(float(row[5] or 0))
+    }
+
+# 获取搜索建议索引，首次使用或超过TTL时从数据库全量加载
+def ensure_suggest_index():
+    built_at = book_suggest_index.built_at
+    if built_at is None or (SEARCH_INDEX_TTL > 0 and time.time() - built_at > SEARCH_INDEX_TTL):
+        result = db.session.execute(SUGGEST_INDEX_STATEMENT)
+        book_suggest_index.rebuild(suggest_row_to_dict(row) for row in result)
+    return book_suggest_index
+
+# 用查询结果增量更新内存索引：查到的图书更新，查不到的（已删除）移除
+def apply_book_rows_to_index(index, statement, book_ids, row_to_dict, index_name, params=None):
+    if index.built_at is None:
+        # 索引尚未构建，首次使用时会全量加载
+        return
+    try:
+        found_ids = set()
+        for row in db.session.execute(statement, {'book_ids': book_ids, **(params or {})}):
+            index.upsert(row_to_dict(row))
+            found_ids.add(row[0])
+        for book_id in book_ids:
+            if book_id not in found_ids:
+                index.remove(book_id)
+    except Exception as e:
+        # 同步失败不影响已提交的写操作，标记索引过期，下次使用时全量重建
+        db.session.rollback()
+        index.built_at = None
+        app.logger.warning(f'同步{index_name}失败: {str(e)}')
+
+# 图书数据变更（增删改、下单、取消订单）提交后调用，递增目录缓存版本并将指定图书的最新数据同步到内存索引
+def sync_books_to_indexes(book_ids):
+    book_ids = list({int(book_id) for book_id in book_ids})
+    if not book_ids:
+        return
+    catalog_cache.bump_version(book_ids)
+    apply_book_rows_to_index(
+        book_search_index,
+        BOOK_INDEX_BY_IDS.statement, book_ids, BOOK_INDEX_BY_IDS.row_to_dict, '图书搜索索引'
+    )
+    apply_book_rows_to_index(
+        book_suggest_index,
+        SUGGEST_INDEX_BY_IDS_STATEMENT, book_ids, suggest_row_to_dict, '搜索建议索引'
+    )
+    apply_book_rows_to_index(
+        low_stock_tracker,
+        LOW_STOCK_BY_IDS.statement, book_ids, LOW_STOCK_BY_IDS.row_to_dict, '低库存集合'
+    )
+    apply_book_rows_to_index(
+        popular_books_leaderboard,
+        POPULAR_BOOKS_BY_IDS.statement, book_ids, POPULAR_BOOKS_BY_IDS.row_to_dict, '热门图书排行榜',
+        {'sales_since': popular_sales_since()}
+    )
+
+# ============================================
+# 热门图书排行榜API
+# ============================================
+
+# 近期销量的统计天数
+POPULAR_SALES_DAYS = int(os.getenv('POPULAR_SALES_DAYS', '30'))
+# 排行榜全量重建间隔（秒），由后台线程执行，近期销量窗口随重建向前滚动（0或负数表示只在启动时构建）
+POPULAR_BOOKS_TTL = int(os.getenv('POPULAR_BOOKS_TTL', '300'))
+# 构建失败后的重试间隔（秒）
+POPULAR_BOOKS_RETRY_SECONDS = 60
+# 进程启动后第一次请求等待首次构建的最长时间（秒）
+POPULAR_BOOKS_WARMUP_TIMEOUT = 30
+POPULAR_DEFAULT_LIMIT = 10
+POPULAR_MAX_LIMIT = 50
+
+# 排行榜使用的图书数据：评论数读取评分聚合表（book_rating_stats），近期销量为统计天数内有效订单的销量
+POPULAR_BOOKS_FIELDS = {
+    'id': ('b.id', None),
+    'title': ('b.title', None),
+    'author': ('b.author', None),
+    'category': ('c.name', None),
+    'price': ('b.price', None),
+    'image': ('b.image', None),
+    'status': ('b.status', None),
+    'rating': ('b.rating', float_or_zero),
+    'review_count': ('COALESCE(rs.review_count, 0)', None),
+    'recent_sales': ('COALESCE(s.units, 0)', None)
+}
+POPULAR_BOOKS_FROM = """
+    FROM books b
+    LEFT JOIN categories c ON b.category_id = c.id
+    LEFT JOIN book_rating_stats rs ON rs.book_id = b.id
+    LEFT JOIN (
+        SELECT oi.book_id, SUM(oi.quantity) AS units
+        FROM order_items oi
+        JOIN orders o ON oi.order_id = o.id
+        WHERE o.status != 'cancelled' AND o.created_at >= :sales_since{book_filter}
+        GROUP BY oi.book_id
+    ) s ON s.book_id = b.id
+"""
+POPULAR_BOOKS = SelectQuery(POPULAR_BOOKS_FIELDS, POPULAR_BOOKS_FROM.format(book_filter=''), " WHERE b.status = 'available'")
+POPULAR_BOOKS_BY_IDS = SelectQuery(
+    POPULAR_BOOKS_FIELDS, POPULAR_BOOKS_FROM.format(book_filter=' AND oi.book_id IN :book_ids'),
+    " WHERE b.id IN :book_ids", expanding=['book_ids']
+)
+
+popular_books_leaderboard = PopularBooksLeaderboard(POPULAR_MAX_LIMIT)
+
+def popular_sales_since():
+    return datetime.now() - timedelta(days=POPULAR_SALES_DAYS)
+
+# 大批量修改图书数据后调用（如重建评分聚合）：清空目录缓存，已构建的内存索引直接全量重建，
+# 不再把全部图书ID传给 sync_books_to_indexes 逐个同步
+def rebuild_book_indexes():
+    catalog_cache.bump_version()
+    rebuilds = [
+        (book_search_index, ensure_search_index, '图书搜索索引'),
+        (book_suggest_index, ensure_suggest_index, '搜索建议索引'),
+        (low_stock_tracker, ensure_low_stock_tracker, '低库存集合'),
+        (popular_books_leaderboard, rebuild_popular_books_leaderboard, '热门图书排行榜')
+    ]
+    for index, rebuild, index_name in rebuilds:
+        if index.built_at is None:
+            # 索引尚未构建，首次使用时会全量加载
+            continue
+        index.built_at = None
+        try:
+            rebuild()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.warning(f'重建{index_name}失败: {str(e)}')
+
+_popular_books_refresher = {'thread': None}
+_popular_books_lock = threading.Lock()
+_popular_books_ready = threading.Event()
+
+# 从数据库全量重建排行榜（需要对订单明细 GROUP BY，只在后台线程中执行）
+def rebuild_popular_books_leaderboard():
+    result, row_to_dict = POPULAR_BOOKS.execute(db.session, {'sales_since': popular_sales_since()})
+    popular_books_leaderboard.rebuild(row_to_dict(row) for row in result)
+
+# 后台线程：启动后立即构建一次，之后每隔 POPULAR_BOOKS_TTL 秒全量重建；
+# 构建失败或增量同步失败（built_at 被置为 None）时按 POPULAR_BOOKS_RETRY_SECONDS 重试
+def refresh_popular_books_leaderboard():
+    while True:
+        with app.app_context():
+            try:
+                rebuild_popular_books_leaderboard()
+            except Exception as e:
+                app.logger.warning(f'重建热门图书排行榜失败: {str(e)}')
+            finally:
+                db.session.remove()
+        _popular_books_ready.set()
+        if popular_books_leaderboard.built_at is None:
+            time.sleep(POPULAR_BOOKS_RETRY_SECONDS)
+        elif POPULAR_BOOKS_TTL > 0:
+            time.sleep(POPULAR_BOOKS_TTL)
+        else:
+            return
+
+# 获取热门图书排行榜：首次使用时启动后台重建线程，请求线程只读取内存中的排行榜
+# 只有进程启动后的第一次请求会等待首次构建完成
+def ensure_popular_books_leaderboard():
+    if _popular_books_refresher['thread'] is None:
+        with _popular_books_lock:
+            if _popular_books_refresher['thread'] is None:
+                thread = threading.Thread(target=refresh_popular_books_leaderboard,
+                                          name='popular-books-refresher', daemon=True)
+                thread.start()
+                _popular_books_refresher['thread'] = thread
+    _popular_books_ready.wait(POPULAR_BOOKS_WARMUP_TIMEOUT)
+    return popular_books_leaderboard
+
+# 热门图书API（全站或指定分类），从内存排行榜读取，不查询评论和订单表
+@app.route('/api/books/popular', methods=['GET'])
+def get_popular_books():
+    try:
+        from flask import request
+
+        category = request.args.get('category', '').strip()
+        if category == '全部':
+            category = ''
+        try:
+            limit = parse_page_limit(request.args.get('limit'), POPULAR_DEFAULT_LIMIT, POPULAR_MAX_LIMIT)
+        except ValueError as e:
+            return make_response(None, str(e), 400)
 
+        with app.app_context():
+            books = ensure_popular_books_leaderboard().top(category or None, limit)
             return make_response({
                 'books': books,
-                'total': len(books),
-                'query': query,
-                'category': category
-            }, f'搜索成功，找到{len(books)}本图书')
+                'category': category or None,
+                'sales_days': POPULAR_SALES_DAYS
+            }, '获取热门图书成功')
     except Exception as e:
-        return make_response(None, f'搜索图书失败: {str(e)}', 500)
+        return make_response(None, f'获取热门图书失败: {str(e)}', 500)
+
+# ============================================
+# 共同购买推荐API
+# ============================================
+
+# 每本图书保存的邻居数量
+CO_PURCHASE_TOP_K = int(os.getenv('CO_PURCHASE_TOP_K', '20'))
+# 图书对至少在多少个订单中同时出现才参与推荐
+CO_PURCHASE_MIN_SUPPORT = int(os.getenv('CO_PURCHASE_MIN_SUPPORT', '2'))
+# 相似度：cosine 或 lift
+CO_PURCHASE_SCORE = os.getenv('CO_PURCHASE_SCORE', 'cosine')
+CO_PURCHASE_DEFAULT_LIMIT = 10
+# 读取订单图书和写入推荐表时每批的行数
+CO_PURCHASE_BATCH_SIZE = int(os.getenv('CO_PURCHASE_BATCH_SIZE', '1000'))
+
+# 按订单顺序读取有效订单的图书，同一订单的行相邻
+CO_PURCHASE_ITEMS_STATEMENT = text("""
+    SELECT oi.order_id, oi.book_id
+    FROM order_items oi
+    JOIN orders o ON oi.order_id = o.id
+    WHERE o.status != 'cancelled'
+    ORDER BY oi.order_id
+""")
+CO_PURCHASE_INSERT_STATEMENT = text("""
+    INSERT INTO book_co_purchases (book_id, position, neighbour_id, co_count, score)
+    VALUES (:book_id, :position, :neighbour_id, :co_count, :score)
+""")
+
+# 推荐读取：按 (book_id, position) 主键范围读取前 limit 个邻居，只返回在售图书
+ALSO_BOUGHT = SelectQuery({
+    'id': ('b.id', None),
+    'title': ('b.title', None),
+    'author': ('b.author', None),
+    'price': ('b.price', None),
+    'image': ('b.image', None),
+    'rating': ('b.rating', zero_if_null),
+    'co_count': ('cp.co_count', None),
+    'score': ('cp.score', None)
+}, """
+    FROM book_co_purchases cp
+    JOIN books b ON cp.neighbour_id = b.id
+""", """
+    WHERE cp.book_id = :book_id AND b.status = 'available'
+    ORDER BY cp.position
+    LIMIT :limit
+""")
+
+# 流式读取订单图书，逐个订单累加共现次数
+def count_co_purchases(engine):
+    counter = CoPurchaseCounter()
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=CO_PURCHASE_BATCH_SIZE).execute(CO_PURCHASE_ITEMS_STATEMENT)
+        for _, rows in itertools.groupby(result, key=lambda row: row[0]):
+            counter.add_basket(row[1] for row in rows)
+    return counter
+
+# 重新计算共同购买推荐并整体替换 book_co_purchases 表（同一事务，读取方不会看到半成品）
+def rebuild_co_purchases(top_k=CO_PURCHASE_TOP_K, min_support=CO_PURCHASE_MIN_SUPPORT, score=CO_PURCHASE_SCORE):
+    counter = count_co_purchases(db.engine)
+    rows = counter.neighbours(top_k, min_support, score)
+    try:
+        db.session.execute(text("DELETE FROM book_co_purchases"))
+        for start in range(0, len(rows), CO_PURCHASE_BATCH_SIZE):
+            db.session.execute(CO_PURCHASE_INSERT_STATEMENT, [
+                {'book_id': book_id, 'position': position, 'neighbour_id': neighbour_id,
+                 'co_count': co_count, 'score': round(value, 6)}
+                for book_id, neighbour_id, position, co_count, value in rows[start:start + CO_PURCHASE_BATCH_SIZE]
+            ])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return {
+        'orders': counter.order_count,
+        'books': len(counter),
+        'recommended_books': len({row[0] for row in rows}),
+        'rows': len(rows),
+        'backend': counter.backend
+    }
+
+# 计算共同购买推荐（命令行：flask --app app build-co-purchases，可由定时任务周期执行）
+@app.cli.command('build-co-purchases')
+@click.option('--top-k', default=CO_PURCHASE_TOP_K, show_default=True, help='每本图书保存的邻居数量')
+@click.option('--min-support', default=CO_PURCHASE_MIN_SUPPORT, show_default=True, help='图书对最少共同出现的订单数')
+@click.option('--score', type=click.Choice(SCORE_METHODS), default=CO_PURCHASE_SCORE, show_default=True, help='相似度计算方式')
+def build_co_purchases_command(top_k, min_support, score):
+    """统计订单中的共同购买关系，写入 book_co_purchases 表"""
+    with app.app_context():
+        started = time.time()
+        report = rebuild_co_purchases(top_k, min_support, score)
+        print(f"共同购买推荐计算完成（{report['backend']}）：{report['orders']}个订单，{report['books']}本图书，"
+              f"{report['recommended_books']}本图书有推荐，写入{report['rows']}行，耗时{time.time() - started:.1f}秒")
+
+# 获取"买了这本书的人还买了"推荐
+@app.route('/api/books/<int:book_id>/also-bought', methods=['GET'])
+def get_also_bought_books(book_id):
+    try:
+        from flask import request
+
+        try:
+            limit = parse_page_limit(request.args.get('limit'), CO_PURCHASE_DEFAULT_LIMIT, CO_PURCHASE_TOP_K)
+        except ValueError as e:
+            return make_response(None, str(e), 400)
+
+        with app.app_context():
+            books = ALSO_BOUGHT.all(db.session, {'book_id': book_id, 'limit': limit})
+            return make_response({'book_id': book_id, 'books': books}, '获取推荐图书成功')
+    except Exception as e:
+        return make_response(None, f'获取推荐图书失败: {str(e)}', 500)
+
+# ============================================
+# 相似图书API
+# ============================================
+
+# 每本图书保存的相似图书数量
+SIMILAR_BOOKS_TOP_K = int(os.getenv('SIMILAR_BOOKS_TOP_K', '20'))
+# 批量计算时单块最多的元素数（内存占用约为其8倍字节）
+SIMILARITY_BLOCK_ELEMENTS = int(os.getenv('SIMILARITY_BLOCK_ELEMENTS', '4000000'))
+# 读取图书和写入向量/相似图书时每批的行数
+SIMILARITY_BATCH_SIZE = int(os.getenv('SIMILARITY_BATCH_SIZE', '1000'))
+SIMILAR_BOOKS_DEFAULT_LIMIT = 10
+# 影响相似度的图书字段，更新这些字段时增量更新相似图书
+SIMILARITY_FIELDS = {'title', 'author', 'category_id', 'description'}
+# 批量导入的图书不超过该数量时逐本增量更新相似图书，超过时整体重算
+SIMILARITY_INCREMENTAL_LIMIT = int(os.getenv('SIMILARITY_INCREMENTAL_LIMIT', '200'))
+
+# 相似图书读取：按 (book_id, position) 主键范围读取前 limit 个，只返回在售图书
+SIMILAR_BOOKS = SelectQuery({
+    'id': ('b.id', None),
+    'title': ('b.title', None),
+    'author': ('b.author', None),
+    'category': ('c.name', None),
+    'price': ('b.price', None),
+    'image': ('b.image', None),
+    'rating': ('b.rating', zero_if_null),
+    'score': ('bs.score', None)
+}, """
+    FROM book_similarities bs
+    JOIN books b ON bs.neighbour_id = b.id
+    LEFT JOIN categories c ON b.category_id = c.id
+""", """
+    WHERE bs.book_id = :book_id AND b.status = 'available'
+    ORDER BY bs.position
+    LIMIT :limit
+""")
+
+SIMILARITY_TERMS_STATEMENT = text(
+    "SELECT term, idf FROM book_similarity_terms WHERE term IN :terms"
+).bindparams(bindparam('terms', expanding=True))
+# 批量计算之后新出现的词按只出现在一本图书中处理（即最大的 idf）
+SIMILARITY_DEFAULT_IDF_STATEMENT = text("SELECT MAX(idf) FROM book_similarity_terms")
+SIMILARITY_POSTINGS_STATEMENT = text("""
+    SELECT book_id, term, weight FROM book_tfidf_vectors
+    WHERE term IN :terms AND book_id != :book_id
+""").bindparams(bindparam('terms', expanding=True))
+SIMILARITY_LISTS_STATEMENT = text("""
+    SELECT book_id, neighbour_id, score FROM book_similarities
+    WHERE book_id IN :book_ids
+    ORDER BY book_id, position
+""").bindparams(bindparam('book_ids', expanding=True))
+SIMILARITY_DELETE_LISTS_STATEMENT = text(
+    "DELETE FROM book_similarities WHERE book_id IN :book_ids"
+).bindparams(bindparam('book_ids', expanding=True))
+SIMILARITY_INSERT_TERM_STATEMENT = text("INSERT INTO book_similarity_terms (term, idf) VALUES (:term, :idf)")
+SIMILARITY_INSERT_VECTOR_STATEMENT = text(
+    "INSERT INTO book_tfidf_vectors (book_id, term, weight) VALUES (:book_id, :term, :weight)"
+)
+SIMILARITY_INSERT_LIST_STATEMENT = text("""
+    INSERT INTO book_similarities (book_id, position, neighbour_id, score)
+    VALUES (:book_id, :position, :neighbour_id, :score)
+""")
+
+def insert_in_batches(statement, rows):
+    for start in range(0, len(rows), SIMILARITY_BATCH_SIZE):
+        db.session.execute(statement, rows[start:start + SIMILARITY_BATCH_SIZE])
+
+def vector_rows(book_id, vector):
+    return [{'book_id': book_id, 'term': term, 'weight': weight} for term, weight in vector.items()]
+
+def neighbour_rows(book_id, neighbours):
+    return [
+        {'book_id': book_id, 'position': position, 'neighbour_id': neighbour_id, 'score': round(score, 6)}
+        for position, (neighbour_id, score) in enumerate(neighbours, 1)
+    ]
+
+# 重新计算全部图书的 TF-IDF 向量和相似图书，整体替换三张表（同一事务）
+def rebuild_book_similarities(top_k=SIMILAR_BOOKS_TOP_K):
+    with db.engine.connect() as conn:
+        result, row_to_dict = BOOK_INDEX.execute(conn.execution_options(stream_results=True, yield_per=SIMILARITY_BATCH_SIZE))
+        book_ids, vectors, idf = build_vectors(row_to_dict(row) for row in result)
+    rows = top_k_neighbours(book_ids, vectors, top_k, SIMILARITY_BLOCK_ELEMENTS)
+    try:
+        for table in ('book_similarities', 'book_tfidf_vectors', 'book_similarity_terms'):
+            db.session.execute(text(f"DELETE FROM {table}"))
+        insert_in_batches(SIMILARITY_INSERT_TERM_STATEMENT, [{'term': term, 'idf': value} for term, value in idf.items()])
+        insert_in_batches(SIMILARITY_INSERT_VECTOR_STATEMENT, [
+            row for book_id, vector in zip(book_ids, vectors) for row in vector_rows(book_id, vector)
+        ])
+        insert_in_batches(SIMILARITY_INSERT_LIST_STATEMENT, [
+            {'book_id': book_id, 'position': position, 'neighbour_id': neighbour_id, 'score': round(score, 6)}
+            for book_id, neighbour_id, position, score in rows
+        ])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return {'books': len(book_ids), 'terms': len(idf), 'rows': len(rows)}
+
+# 单本图书新增、删除或书名/作者/分类/描述变化后增量更新：重新计算该书的向量和相似图书，并把新相似度合并进其他图书的列表
+# 图书已删除时清除其向量和相似图书，并把它从其他图书的列表中移除（图书ID会被重新分配，不能留下旧数据）
+# idf 沿用批量计算的结果；某本书因此被移出其他图书的列表时，空出的位置在下次批量计算时补齐
+def refresh_book_similarity(book_id, top_k=SIMILAR_BOOKS_TOP_K):
+    try:
+        default_idf = db.session.execute(SIMILARITY_DEFAULT_IDF_STATEMENT).scalar()
+        if default_idf is None:
+            # 尚未执行批量计算
+            return
+
+        book = BOOK_INDEX_BY_IDS.first(db.session, {'book_ids': [book_id]})
+        terms = document_terms(book) if book else {}
+        idf = {}
+        if terms:
+            idf = dict(db.session.execute(SIMILARITY_TERMS_STATEMENT, {'terms': list(terms)}).fetchall())
+        vector = term_vector(terms, idf, default_idf)
+
+        scores = {}
+        if vector:
+            postings = db.session.execute(SIMILARITY_POSTINGS_STATEMENT, {'terms': list(vector), 'book_id': book_id})
+            scores = score_against(vector, postings)
+
+        # 受影响的图书：与该书有相似度的，以及列表中原本包含该书的
+        affected = set(scores)
+        affected.update(row[0] for row in db.session.execute(
+            text("SELECT book_id FROM book_similarities WHERE neighbour_id = :book_id"), {'book_id': book_id}
+        ))
+        lists = {}
+        if affected:
+            for other_id, neighbour_id, score in db.session.execute(SIMILARITY_LISTS_STATEMENT, {'book_ids': list(affected)}):
+                lists.setdefault(other_id, []).append((neighbour_id, score))
+
+        new_lists = {book_id: best_neighbours(scores.items(), top_k)}
+        for other_id in affected:
+            current = lists.get(other_id, [])
+            merged = merge_neighbour(current, book_id, scores.get(other_id, 0.0), top_k)
+            if merged != current:
+                new_lists[other_id] = merged
+
+        db.session.execute(text("DELETE FROM book_tfidf_vectors WHERE book_id = :book_id"), {'book_id': book_id})
+        insert_in_batches(SIMILARITY_INSERT_VECTOR_STATEMENT, vector_rows(book_id, vector))
+        db.session.execute(SIMILARITY_DELETE_LISTS_STATEMENT, {'book_ids': list(new_lists)})
+        insert_in_batches(SIMILARITY_INSERT_LIST_STATEMENT, [
+            row for other_id, neighbours in new_lists.items() for row in neighbour_rows(other_id, neighbours)
+        ])
+        db.session.commit()
+    except Exception as e:
+        # 增量更新失败不影响已提交的图书修改，下次批量计算时修正
+        db.session.rollback()
+        app.logger.warning(f'更新相似图书失败: {str(e)}')
+
+# 多本图书变化后（如批量导入）更新相似图书：数量较少时逐本增量更新，较多时整体重算（尚未执行过批量计算时跳过）
+def refresh_books_similarity(book_ids):
+    book_ids = list(dict.fromkeys(book_ids))
+    if len(book_ids) <= SIMILARITY_INCREMENTAL_LIMIT:
+        for book_id in book_ids:
+            refresh_book_similarity(book_id)
+        return
+    try:
+        if db.session.execute(SIMILARITY_DEFAULT_IDF_STATEMENT).scalar() is None:
+            return
+        rebuild_book_similarities()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.warning(f'重新计算相似图书失败: {str(e)}')
+
+# 计算相似图书（命令行：flask --app app build-book-similarities，图书数据大量变化后或定期执行）
+@app.cli.command('build-book-similarities')
+@click.option('--top-k', default=SIMILAR_BOOKS_TOP_K, show_default=True, help='每本图书保存的相似图书数量')
+def build_book_similarities_command(top_k):
+    """按书名、作者、分类和描述的 TF-IDF 向量计算相似图书，写入 book_similarities 表"""
+    with app.app_context():
+        started = time.time()
+        report = rebuild_book_similarities(top_k)
+        print(f"相似图书计算完成：{report['books']}本图书，{report['terms']}个词，写入{report['rows']}行，"
+              f"耗时{time.time() - started:.1f}秒")
+
+# 获取内容相似的图书（适用于没有购买记录的图书）
+@app.route('/api/books/<int:book_id>/similar', methods=['GET'])
+def get_similar_books(book_id):
+    try:
+        from flask import request
+
+        try:
+            limit = parse_page_limit(request.args.get('limit'), SIMILAR_BOOKS_DEFAULT_LIMIT, SIMILAR_BOOKS_TOP_K)
+        except ValueError as e:
+            return make_response(None, str(e), 400)
+
+        with app.app_context():
+            books = SIMILAR_BOOKS.all(db.session, {'book_id': book_id, 'limit': limit})
+            return make_response({'book_id': book_id, 'books': books}, '获取相似图书成功')
+    except Exception as e:
+        return make_response(None, f'获取相似图书失败: {str(e)}', 500)
 
 # ============================================
 # 购物车API
 # ============================================
 
+# 用户购物车查询（关联图书信息）
+USER_CART_ITEMS = SelectQuery({
+    'id': ('sc.id', None),
+    'book_id': ('sc.book_id', None),
+    'title': ('b.title', None),
+    'author': ('b.author', None),
+    'price': ('b.price', None),
+    'image': ('b.image', None),
+    'quantity': ('sc.quantity', None),
+    'stock': ('b.stock', None)
+}, """
+    FROM shopping_cart sc
+    JOIN books b ON sc.book_id = b.id
+    WHERE sc.user_id = :user_id
+    ORDER BY sc.created_at DESC
+""")
+
 # 获取用户购物车
 @app.route('/api/cart', methods=['GET'])
 def get_cart():
@@ -1053,43 +2783,57 @@ def get_cart():
 
         with app.app_context():
             # 查询用户购物车
-            result = db.session.execute(text("""
-                SELECT
-                    sc.id,
-                    sc.book_id,
-                    b.title,
-                    b.author,
-                    b.price,
-                    b.image,
-                    sc.quantity,
-                    b.stock
-                FROM shopping_cart sc
-                JOIN books b ON sc.book_id = b.id
-                WHERE sc.user_id = :user_id
-                ORDER BY sc.created_at DESC
-            """), {'user_id': user_id})
-
-            cart_items = []
-            for row in result:
-                cart_items.append({
-                    'id': row[0],
-                    'book_id': row[1],
-                    'title': row[2],
-                    'author': row[3],
-                    'price': float(row[4]),
-                    'image': row[5],
-                    'quantity': row[6],
-                    'stock': row[7]
-                })
+            cart_items = USER_CART_ITEMS.all(db.session, {'user_id': user_id})
 
-            return make_response({
+            return make_conditional_response({
                 'items': cart_items,
                 'total': len(cart_items)
-            }, '获取购物车成功')
+            }, '获取购物车成功', private=True)
     except Exception as e:
         return make_response(None, f'获取购物车失败: {str(e)}', 500)
 
-# 添加商品到购物车
+# 购物车写操作语句（shopping_cart 上有 (user_id, book_id) 唯一键 unique_user_book）
+# 加入购物车：库存检查和新增/累加数量在一条语句中完成，图书不存在或库存不足时不写入（影响行数为0）
+CART_UPSERT_STATEMENT = text("""
+    INSERT INTO shopping_cart (user_id, book_id, quantity)
+    SELECT :user_id, b.id, :quantity FROM books b
+    WHERE b.id = :book_id AND b.stock >= :quantity
+    ON DUPLICATE KEY UPDATE quantity = quantity + VALUES(quantity), updated_at = NOW()
+""")
+# 修改数量：只修改该用户的购物车项，库存不足时不修改
+CART_SET_QUANTITY_STATEMENTS = {
+    key: text(f"""
+        UPDATE shopping_cart
+        SET quantity = :quantity, updated_at = NOW()
+        WHERE user_id = :user_id AND {column} = :{key}
+          AND :quantity <= (SELECT stock FROM books WHERE books.id = shopping_cart.book_id)
+    """)
+    for key, column in (('book_id', 'book_id'), ('cart_id', 'id'))
+}
+CART_REMOVE_STATEMENTS = {
+    key: text(f"DELETE FROM shopping_cart WHERE user_id = :user_id AND {column} = :{key}")
+    for key, column in (('book_id', 'book_id'), ('cart_id', 'id'))
+}
+# 批量修改购物车时单次最多的操作数
+CART_BATCH_MAX_OPERATIONS = int(os.getenv('CART_BATCH_MAX_OPERATIONS', '100'))
+
+# 加入购物车或修改数量未生效时，查明原因（只在失败时多查询一次）
+def cart_write_error(user_id, quantity, book_id=None, cart_id=None):
+    if book_id is None:
+        row = db.session.execute(text("""
+            SELECT sc.book_id FROM shopping_cart sc WHERE sc.id = :cart_id AND sc.user_id = :user_id
+        """), {'cart_id': cart_id, 'user_id': user_id}).fetchone()
+        if not row:
+            return '购物车项不存在', 404
+        book_id = row[0]
+    book = db.session.execute(text("SELECT stock FROM books WHERE id = :book_id"), {'book_id': book_id}).fetchone()
+    if not book:
+        return '图书不存在', 404
+    if book[0] < quantity:
+        return f'库存不足，当前库存：{book[0]}', 400
+    return '购物车项不存在', 404
+
+# 添加商品到购物车（已在购物车中时累加数量）
 @app.route('/api/cart/add', methods=['POST'])
 def add_to_cart():
     try:
@@ -1105,37 +2849,13 @@ def add_to_cart():
         quantity = data.get('quantity', 1)
 
         with app.app_context():
-            # 检查图书是否存在且有库存
-            book_check = db.session.execute(text("""
-                SELECT stock FROM books WHERE id = :book_id
-            """), {'book_id': book_id}).fetchone()
-
-            if not book_check:
-                return make_response(None, '图书不存在', 404)
-
-            if book_check[0] < quantity:
-                return make_response(None, f'库存不足，当前库存：{book_check[0]}', 400)
-
-            # 检查购物车中是否已有该商品
-            existing = db.session.execute(text("""
-                SELECT id, quantity FROM shopping_cart
-                WHERE user_id = :user_id AND book_id = :book_id
-            """), {'user_id': user_id, 'book_id': book_id}).fetchone()
-
-            if existing:
-                # 更新数量
-                new_quantity = existing[1] + quantity
-                db.session.execute(text("""
-                    UPDATE shopping_cart
-                    SET quantity = :quantity, updated_at = NOW()
-                    WHERE id = :id
-                """), {'quantity': new_quantity, 'id': existing[0]})
-            else:
-                # 添加新记录
-                db.session.execute(text("""
-                    INSERT INTO shopping_cart (user_id, book_id, quantity)
-                    VALUES (:user_id, :book_id, :quantity)
-                """), {'user_id': user_id, 'book_id': book_id, 'quantity': quantity})
+            result = db.session.execute(CART_UPSERT_STATEMENT, {
+                'user_id': user_id, 'book_id': book_id, 'quantity': quantity
+            })
+            if result.rowcount == 0:
+                db.session.rollback()
+                message, status = cart_write_error(user_id, quantity, book_id=book_id)
+                return make_response(None, message, status)
 
             db.session.commit()
             return make_response(None, '添加到购物车成功')
@@ -1207,6 +2927,64 @@ def remove_from_cart():
         db.session.rollback()
         return make_response(None, f'删除失败: {str(e)}', 500)
 
+# 批量修改购物车：operations 为 [{"op": "add"|"update"|"remove", "book_id"或"cart_id", "quantity"}]
+# 全部操作在一个事务中按顺序执行，任一操作失败时全部回滚；成功时返回修改后的购物车
+@app.route('/api/cart/batch', methods=['POST'])
+def batch_update_cart():
+    try:
+        from flask import request
+        data = request.get_json()
+
+        if not data or 'user_id' not in data or not isinstance(data.get('operations'), list):
+            return make_response(None, '缺少必填字段', 400)
+
+        user_id = data['user_id']
+        operations = data['operations']
+        if not operations:
+            return make_response(None, '操作列表不能为空', 400)
+        if len(operations) > CART_BATCH_MAX_OPERATIONS:
+            return make_response(None, f'单次最多{CART_BATCH_MAX_OPERATIONS}个操作', 400)
+
+        # 先校验全部操作，再写入
+        for index, operation in enumerate(operations):
+            op = operation.get('op') if isinstance(operation, dict) else None
+            if op not in ('add', 'update', 'remove'):
+                return make_response(None, f'第{index + 1}个操作无效，op只能是add、update或remove', 400)
+            if op == 'add' and 'book_id' not in operation:
+                return make_response(None, f'第{index + 1}个操作缺少book_id', 400)
+            if op != 'add' and 'book_id' not in operation and 'cart_id' not in operation:
+                return make_response(None, f'第{index + 1}个操作缺少book_id或cart_id', 400)
+            if op != 'remove':
+                quantity = operation.get('quantity', 1)
+                if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity < 1:
+                    return make_response(None, f'第{index + 1}个操作的数量必须是大于0的整数', 400)
+
+        with app.app_context():
+            for index, operation in enumerate(operations):
+                op = operation['op']
+                key = 'book_id' if 'book_id' in operation else 'cart_id'
+                params = {'user_id': user_id, key: operation[key]}
+                if op == 'remove':
+                    db.session.execute(CART_REMOVE_STATEMENTS[key], params)
+                    continue
+
+                params['quantity'] = operation.get('quantity', 1)
+                statement = CART_UPSERT_STATEMENT if op == 'add' else CART_SET_QUANTITY_STATEMENTS[key]
+                if db.session.execute(statement, params).rowcount == 0:
+                    message, status = cart_write_error(user_id, params['quantity'], **{key: operation[key]})
+                    db.session.rollback()
+                    return make_response({'index': index}, f'第{index + 1}个操作失败：{message}', status)
+
+            db.session.commit()
+            cart_items = USER_CART_ITEMS.all(db.session, {'user_id': user_id})
+            return make_response({
+                'items': cart_items,
+                'total': len(cart_items)
+            }, '购物车更新成功')
+    except Exception as e:
+        db.session.rollback()
+        return make_response(None, f'批量更新购物车失败: {str(e)}', 500)
+
 # 清空购物车
 @app.route('/api/cart/clear', methods=['DELETE'])
 def clear_cart():
@@ -1232,6 +3010,18 @@ def clear_cart():
 # 订单API
 # ============================================
 
+# 订单明细写入语句，键为 order_items.category_id 列是否存在（performance_database.sql 第11节）
+ORDER_ITEM_INSERT_STATEMENTS = {
+    True: text("""
+        INSERT INTO order_items (order_id, book_id, category_id, quantity, subtotal)
+        VALUES (:order_id, :book_id, :category_id, :quantity, :subtotal)
+    """),
+    False: text("""
+        INSERT INTO order_items (order_id, book_id, quantity, subtotal)
+        VALUES (:order_id, :book_id, :quantity, :subtotal)
+    """)
+}
+
 # 创建订单
 @app.route('/api/orders/create', methods=['POST'])
 def create_order():
@@ -1264,10 +3054,10 @@ def create_order():
                 book_id = item['book_id']
                 quantity = item['quantity']
 
-                # 查询图书信息
+                # 查询图书信息（锁定该行，随后扣减库存；状态用于更新图书计数器）
                 book = db.session.execute(text("""
-                    SELECT id, title, author, isbn, price, stock, image
-                    FROM books WHERE id = :book_id
+                    SELECT id, title, author, isbn, price, stock, image, category_id, status
+                    FROM books WHERE id = :book_id FOR UPDATE
                 """), {'book_id': book_id}).fetchone()
 
                 if not book:
@@ -1286,6 +3076,8 @@ def create_order():
                     'book_author': book[2],
                     'book_isbn': book[3],
                     'book_image': book[6],
+                    'category_id': book[7],
+                    'status': book[8],
                     'quantity': quantity,
                     'unit_price': unit_price,
                     'subtotal': subtotal
@@ -1308,14 +3100,13 @@ def create_order():
                 SELECT id FROM orders WHERE order_number = :order_number
             """), {'order_number': order_number}).fetchone()[0]
 
-            # 插入订单明细
+            # 插入订单明细（记录下单时图书所属分类，销售汇总按该分类统计；未添加该列时不记录）
+            order_item_statement = ORDER_ITEM_INSERT_STATEMENTS[schema_object_available('order_items', 'category_id')]
             for item_data in order_items_data:
-                db.session.execute(text("""
-                    INSERT INTO order_items (order_id, book_id, quantity, subtotal)
-                    VALUES (:order_id, :book_id, :quantity, :subtotal)
-                """), {
+                db.session.execute(order_item_statement, {
                     'order_id': order_id,
                     'book_id': item_data['book_id'],
+                    'category_id': item_data['category_id'],
                     'quantity': item_data['quantity'],
                     'subtotal': item_data['subtotal']
                 })
@@ -1334,7 +3125,14 @@ def create_order():
                 DELETE FROM shopping_cart WHERE user_id = :user_id
             """), {'user_id': user_id})
 
+            # 同一事务中更新订单计数器和库存计数器
+            apply_order_counter_change(user_id, None, ('pending', total_amount))
+            add_counter_deltas(stock_counter_deltas(
+                (item_data['status'], -item_data['quantity']) for item_data in order_items_data
+            ))
+            apply_order_to_sales_rollups(order_id, 1)
             db.session.commit()
+            sync_books_to_indexes(item_data['book_id'] for item_data in order_items_data)
 
             return make_response({
                 'order_id': order_id,
@@ -1345,87 +3143,91 @@ def create_order():
         db.session.rollback()
         return make_response(None, f'创建订单失败: {str(e)}', 500)
 
+# 订单列表字段：管理员订单列表，以及用户订单列表（items、total_items 需要额外查询订单商品）
+ADMIN_ORDER_FIELDS = {
+    'id': ('o.id', None),
+    'order_number': ('o.order_number', None),
+    'user_id': ('o.user_id', None),
+    'username': ('u.username', None),
+    'total_amount': ('o.total_amount', None),
+    'status': ('o.status', None),
+    'created_at': ('o.created_at', None)
+}
+USER_ORDER_FIELDS = {
+    'id': ('id', None),
+    'order_number': ('order_number', None),
+    'total_amount': ('total_amount', None),
+    'status': ('status', None),
+    'created_at': ('created_at', None)
+}
+USER_ORDER_ITEM_FIELDS = ['items', 'total_items']
+
+# 管理员订单查询（订单列表和数据导出共用）
+ADMIN_ORDER = SelectQuery(ADMIN_ORDER_FIELDS, """
+    FROM orders o
+    LEFT JOIN users u ON o.user_id = u.id
+""")
+ADMIN_ORDER_LIST = ADMIN_ORDER.where(" ORDER BY o.created_at DESC")
+
+USER_ORDER_LIST = SelectQuery(USER_ORDER_FIELDS, """
+    FROM orders
+    WHERE user_id = :user_id
+    ORDER BY created_at DESC
+""")
+
+# 订单商品预览（仅获取前3个商品）
+ORDER_ITEM_PREVIEW = SelectQuery({
+    'book_id': ('oi.book_id', None),
+    'book_title': ('b.title', None),
+    'book_author': ('b.author', None),
+    'book_image': ('b.image', None),
+    'quantity': ('oi.quantity', None),
+    'unit_price': ('b.price', None),
+    'subtotal': ('oi.subtotal', None)
+}, """
+    FROM order_items oi
+    JOIN books b ON oi.book_id = b.id
+    WHERE oi.order_id = :order_id
+    LIMIT 3
+""")
+ORDER_ITEM_COUNT_STATEMENT = text("SELECT COUNT(*) FROM order_items WHERE order_id = :order_id")
+
 # 获取用户订单列表
+# fields 参数只查询并返回指定字段；用户订单列表不请求 items、total_items 时不再逐个订单查询订单商品
 @app.route('/api/orders', methods=['GET'])
 def get_orders():
     try:
         from flask import request
         user_id = request.args.get('user_id')
 
+        try:
+            if user_id:
+                fields = parse_fields_param(request.args.get('fields'), list(USER_ORDER_FIELDS) + USER_ORDER_ITEM_FIELDS)
+            else:
+                fields = parse_fields_param(request.args.get('fields'), list(ADMIN_ORDER_FIELDS))
+        except ValueError as e:
+            return make_response(None, str(e), 400)
+
         with app.app_context():
             # 如果提供了user_id，查询该用户的订单；否则查询所有订单（管理员）
             if user_id:
                 # 用户订单
-                result = db.session.execute(text("""
-                    SELECT id, order_number, total_amount, status, created_at
-                    FROM orders
-                    WHERE user_id = :user_id
-                    ORDER BY created_at DESC
-                """), {'user_id': user_id})
-            else:
-                # 所有订单（管理员用）- 关联users表获取用户名
-                result = db.session.execute(text("""
-                    SELECT o.id, o.order_number, o.user_id, u.username,
-                           o.total_amount, o.status, o.created_at
-                    FROM orders o
-                    LEFT JOIN users u ON o.user_id = u.id
-                    ORDER BY o.created_at DESC
-                """))
-
-            orders = []
-            for row in result:
-                if user_id:
-                    # 用户订单格式
-                    order_id = row[0]
-                    order_data = {
-                        'id': order_id,
-                        'order_number': row[1],
-                        'total_amount': float(row[2]),
-                        'status': row[3],
-                        'created_at': row[4].strftime('%Y-%m-%d %H:%M:%S') if row[4] else None
-                    }
+                order_fields = None if fields is None else [name for name in fields if name in USER_ORDER_FIELDS]
+                with_items = fields is None or 'items' in fields
+                with_total_items = fields is None or 'total_items' in fields
+                orders = USER_ORDER_LIST.all(db.session, {'user_id': user_id}, order_fields)
 
+                for order_data in orders:
+                    order_params = {'order_id': order_data['id']}
                     # 查询订单商品信息（仅获取前3个商品用于预览）
-                    items_result = db.session.execute(text("""
-                        SELECT oi.book_id, b.title, b.author, b.image, oi.quantity, b.price, oi.subtotal
-                        FROM order_items oi
-                        JOIN books b ON oi.book_id = b.id
-                        WHERE oi.order_id = :order_id
-                        LIMIT 3
-                    """), {'order_id': order_id})
-
-                    items = []
-                    for item_row in items_result:
-                        items.append({
-                            'book_id': item_row[0],
-                            'book_title': item_row[1],
-                            'book_author': item_row[2],
-                            'book_image': item_row[3],
-                            'quantity': item_row[4],
-                            'unit_price': float(item_row[5]),
-                            'subtotal': float(item_row[6])
-                        })
-
+                    if with_items:
+                        order_data['items'] = ORDER_ITEM_PREVIEW.all(db.session, order_params)
                     # 查询订单商品总数
-                    total_items_result = db.session.execute(text("""
-                        SELECT COUNT(*) FROM order_items WHERE order_id = :order_id
-                    """), {'order_id': order_id})
-                    total_items = total_items_result.scalar() or 0
-
-                    order_data['items'] = items
-                    order_data['total_items'] = total_items
-                    orders.append(order_data)
-                else:
-                    # 管理员订单格式
-                    orders.append({
-                        'id': row[0],
-                        'order_number': row[1],
-                        'user_id': row[2],
-                        'username': row[3],
-                        'total_amount': float(row[4]),
-                        'status': row[5],
-                        'created_at': row[6].strftime('%Y-%m-%d %H:%M:%S') if row[6] else None
-                    })
+                    if with_total_items:
+                        order_data['total_items'] = db.session.execute(ORDER_ITEM_COUNT_STATEMENT, order_params).scalar() or 0
+            else:
+                # 所有订单（管理员用）- 关联users表获取用户名
+                orders = ADMIN_ORDER_LIST.all(db.session, names=fields)
 
             return make_response({
                 'orders': orders,
@@ -1434,70 +3236,52 @@ def get_orders():
     except Exception as e:
         return make_response(None, f'获取订单列表失败: {str(e)}', 500)
 
+# 订单详情：订单基本信息（关联users表获取用户名，关联地址表获取配送信息），字段取值与订单列表一致
+ORDER_DETAIL = SelectQuery(dict(ADMIN_ORDER_FIELDS, **{
+    'receiver_name': ('sa.receiver_name', None),
+    'receiver_phone': ('sa.receiver_phone', None),
+    'province': ('sa.province', None),
+    'city': ('sa.city', None),
+    'district': ('sa.district', None),
+    'detail_address': ('sa.detail_address', None),
+    'postal_code': ('sa.postal_code', None)
+}), """
+    FROM orders o
+    LEFT JOIN users u ON o.user_id = u.id
+    LEFT JOIN shipping_addresses sa ON o.shipping_address_id = sa.id
+    WHERE o.id = :order_id
+""")
+
+# 订单明细（关联books表获取图书信息）
+ORDER_DETAIL_ITEMS = SelectQuery({
+    'book_id': ('oi.book_id', None),
+    'book_title': ('b.title', None),
+    'book_author': ('b.author', None),
+    'book_isbn': ('b.isbn', None),
+    'book_image': ('b.image', None),
+    'quantity': ('oi.quantity', None),
+    'unit_price': ('b.price', None),
+    'subtotal': ('oi.subtotal', None)
+}, """
+    FROM order_items oi
+    JOIN books b ON oi.book_id = b.id
+    WHERE oi.order_id = :order_id
+""")
+
 # 获取订单详情
 @app.route('/api/orders/<int:order_id>', methods=['GET'])
 def get_order_detail(order_id):
     try:
         with app.app_context():
-            # 获取订单基本信息（关联users表获取用户名，关联地址表获取配送信息）
-            order = db.session.execute(text("""
-                SELECT o.id, o.order_number, o.user_id, o.total_amount, o.status, o.created_at, u.username,
-                       sa.receiver_name, sa.receiver_phone, sa.province, sa.city, sa.district, sa.detail_address, sa.postal_code
-                FROM orders o
-                LEFT JOIN users u ON o.user_id = u.id
-                LEFT JOIN shipping_addresses sa ON o.shipping_address_id = sa.id
-                WHERE o.id = :order_id
-            """), {'order_id': order_id}).fetchone()
+            order_data = ORDER_DETAIL.first(db.session, {'order_id': order_id})
 
-            if not order:
+            if not order_data:
                 return make_response(None, '订单不存在', 404)
 
-            # 获取订单明细（关联books表获取图书信息）
-            items = db.session.execute(text("""
-                SELECT
-                    oi.book_id, b.title, b.author, b.isbn, b.image,
-                    oi.quantity, b.price, oi.subtotal
-                FROM order_items oi
-                JOIN books b ON oi.book_id = b.id
-                WHERE oi.order_id = :order_id
-            """), {'order_id': order_id})
-
-            order_items = []
-            for item in items:
-                order_items.append({
-                    'book_id': item[0],
-                    'book_title': item[1],
-                    'book_author': item[2],
-                    'book_isbn': item[3],
-                    'book_image': item[4],
-                    'quantity': item[5],
-                    'unit_price': float(item[6]),
-                    'subtotal': float(item[7])
-                })
-
             # 构建完整地址
-            full_address = None
-            if order[9] and order[10] and order[11] and order[12]:  # province, city, district, detail_address
-                full_address = f"{order[9]} {order[10]} {order[11]} {order[12]}"
-
-            order_data = {
-                'id': order[0],
-                'order_number': order[1],
-                'user_id': order[2],
-                'username': order[6],  # 用户名
-                'total_amount': float(order[3]),
-                'status': order[4],  # 订单状态
-                'created_at': order[5].strftime('%Y-%m-%d %H:%M:%S') if order[5] else None,
-                'receiver_name': order[7],  # 收货人姓名
-                'receiver_phone': order[8],  # 收货人电话
-                'province': order[9],  # 省份
-                'city': order[10],  # 城市
-                'district': order[11],  # 区/县
-                'detail_address': order[12],  # 详细地址
-                'postal_code': order[13],  # 邮政编码
-                'full_address': full_address,  # 完整地址
-                'items': order_items
-            }
+            address_parts = [order_data[name] for name in ('province', 'city', 'district', 'detail_address')]
+            order_data['full_address'] = ' '.join(address_parts) if all(address_parts) else None
+            order_data['items'] = ORDER_DETAIL_ITEMS.all(db.session, {'order_id': order_id})
 
             return make_response(order_data, '获取订单详情成功')
     except Exception as e:
@@ -1508,9 +3292,9 @@ def get_order_detail(order_id):
 def cancel_order(order_id):
     try:
         with app.app_context():
-            # 检查订单是否存在
+            # 检查订单是否存在（锁定订单行，并发的取消或状态修改不会重复调整销售汇总）
             order = db.session.execute(text("""
-                SELECT id, status FROM orders WHERE id = :order_id
+                SELECT id, status, user_id, total_amount FROM orders WHERE id = :order_id FOR UPDATE
             """), {'order_id': order_id}).fetchone()
 
             if not order:
@@ -1520,6 +3304,18 @@ def cancel_order(order_id):
             if order[1] not in ['pending', 'processing']:
                 return make_response(None, f'订单状态为{order[1]}，无法取消', 400)
 
+            # 订单涉及的图书（取消后同步库存到内存索引），数量和图书状态用于更新库存计数器
+            order_lines = db.session.execute(text("""
+                SELECT oi.book_id, oi.quantity, b.status
+                FROM order_items oi
+                LEFT JOIN books b ON oi.book_id = b.id
+                WHERE oi.order_id = :order_id
+            """), {'order_id': order_id}).fetchall()
+            order_book_ids = [line[0] for line in order_lines]
+
+            # 从销售汇总中扣除该订单
+            apply_order_to_sales_rollups(order_id, -1)
+
             # 恢复库存
             db.session.execute(text("""
                 UPDATE books b
@@ -1533,7 +3329,13 @@ def cancel_order(order_id):
                 UPDATE orders SET status = 'cancelled' WHERE id = :order_id
             """), {'order_id': order_id})
 
+            # 同一事务中更新订单计数器和库存计数器（已删除的图书不再计入）
+            apply_order_counter_change(order[2], (order[1], order[3]), ('cancelled', order[3]))
+            add_counter_deltas(stock_counter_deltas(
+                (status, quantity) for book_id, quantity, status in order_lines if status is not None
+            ))
             db.session.commit()
+            sync_books_to_indexes(order_book_ids)
             return make_response(None, '订单已取消')
     except Exception as e:
         db.session.rollback()
@@ -1558,20 +3360,29 @@ def update_order_status(order_id):
             return make_response(None, f'无效的状态值，只能是: {", ".join(valid_statuses)}', 400)
 
         with app.app_context():
-            # 检查订单是否存在
+            # 检查订单是否存在（锁定订单行，旧状态决定是否调整销售汇总）
             order = db.session.execute(text("""
-                SELECT id, status FROM orders WHERE id = :order_id
+                SELECT id, status, user_id, total_amount FROM orders WHERE id = :order_id FOR UPDATE
             """), {'order_id': order_id}).fetchone()
 
             if not order:
                 return make_response(None, '订单不存在', 404)
 
-            # 更新订单状态
+            # 更新订单状态，同一事务中更新订单统计
             db.session.execute(text("""
                 UPDATE orders SET status = :status WHERE id = :order_id
             """), {'status': status, 'order_id': order_id})
+            apply_order_counter_change(order[2], (order[1], order[3]), (status, order[3]))
+            # 改为取消或从取消恢复时调整销售汇总，提交后同步订单图书的近期销量（热门图书排行榜、搜索建议）
+            order_book_ids = []
+            if (order[1] == 'cancelled') != (status == 'cancelled'):
+                apply_order_to_sales_rollups(order_id, 1 if order[1] == 'cancelled' else -1)
+                order_book_ids = [row[0] for row in db.session.execute(text("""
+                    SELECT book_id FROM order_items WHERE order_id = :order_id
+                """), {'order_id': order_id})]
 
             db.session.commit()
+            sync_books_to_indexes(order_book_ids)
 
             return make_response({
                 'id': order_id,
@@ -1586,9 +3397,9 @@ def update_order_status(order_id):
 def delete_order(order_id):
     try:
         with app.app_context():
-            # 检查订单是否存在并获取状态
+            # 检查订单是否存在并获取状态（锁定订单行，与取消和状态修改互斥）
             order = db.session.execute(text("""
-                SELECT id, status FROM orders WHERE id = :order_id
+                SELECT id, status, user_id, total_amount FROM orders WHERE id = :order_id FOR UPDATE
             """), {'order_id': order_id}).fetchone()
 
             if not order:
@@ -1598,6 +3409,14 @@ def delete_order(order_id):
             if order[1] not in ['cancelled', 'delivered']:
                 return make_response(None, f'只能删除已取消或已完成的订单，当前状态为：{order[1]}', 400)
 
+            # 已完成的订单计入了销售汇总，删除前扣除（已取消的订单已经扣除过），提交后同步订单图书的近期销量
+            order_book_ids = []
+            if order[1] != 'cancelled':
+                apply_order_to_sales_rollups(order_id, -1)
+                order_book_ids = [row[0] for row in db.session.execute(text("""
+                    SELECT book_id FROM order_items WHERE order_id = :order_id
+                """), {'order_id': order_id})]
+
             # 删除订单明细
             db.session.execute(text("""
                 DELETE FROM order_items WHERE order_id = :order_id
@@ -1608,62 +3427,126 @@ def delete_order(order_id):
                 DELETE FROM orders WHERE id = :order_id
             """), {'order_id': order_id})
 
+            apply_order_counter_change(order[2], (order[1], order[3]), None)
             db.session.commit()
+            sync_books_to_indexes(order_book_ids)
             return make_response(None, '订单已删除')
     except Exception as e:
         db.session.rollback()
         return make_response(None, f'删除订单失败: {str(e)}', 500)
 
+# ============================================
+# 销售汇总
+# ============================================
+
+# 销售汇总表（sales_rollups）按天和按小时、分别以图书、分类和全部订单为维度保存销售额、销量和订单数，
+# 下单、取消订单、恢复订单和删除订单时在同一事务中增量更新，报表只读取汇总行
+# 分类维度使用订单明细中记录的下单时分类（order_items.category_id），图书之后改分类时扣减仍落在原分类上
+SALES_GRANULARITIES = ('day', 'hour')
+SALES_ROLLUPS_MISSING_MESSAGE = ('销售汇总未启用：请先执行 performance_database.sql 第10、11节，'
+                                 '再执行 flask --app app backfill-sales-rollups')
+
+# 销售汇总需要 sales_rollups 表（第10节）和 order_items.category_id 列（第11节）；
+# 未创建时下单、取消等写操作跳过汇总更新，报表和回填返回提示
+def sales_rollups_available():
+    return schema_object_available('sales_rollups') and schema_object_available('order_items', 'category_id')
+
+ORDER_SALES_LINES_STATEMENT = text("""
+    SELECT o.created_at, oi.book_id, COALESCE(oi.category_id, b.category_id), oi.quantity, oi.subtotal
+    FROM order_items oi
+    JOIN orders o ON oi.order_id = o.id
+    LEFT JOIN books b ON oi.book_id = b.id
+    WHERE oi.order_id = :order_id
+""")
+SALES_ROLLUP_UPSERT_STATEMENT = text("""
+    INSERT INTO sales_rollups (granularity, period_start, dimension, dimension_id, revenue, units, order_count)
+    VALUES (:granularity, :period_start, :dimension, :dimension_id, :revenue, :units, :order_count)
+    ON DUPLICATE KEY UPDATE
+        revenue = revenue + VALUES(revenue),
+        units = units + VALUES(units),
+        order_count = order_count + VALUES(order_count)
+""")
+
+def sales_period_start(created_at, granularity):
+    if granularity == 'hour':
+        return created_at.replace(minute=0, second=0, microsecond=0)
+    return created_at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+# 把一个订单计入（sign=1）或移出（sign=-1）销售汇总，在调用方的事务中执行；销售汇总未启用时不做任何事
+def apply_order_to_sales_rollups(order_id, sign):
+    if not sales_rollups_available():
+        return
+    totals = {}
+    for created_at, book_id, category_id, quantity, subtotal in db.session.execute(
+            ORDER_SALES_LINES_STATEMENT, {'order_id': order_id}):
+        for granularity in SALES_GRANULARITIES:
+            period_start = sales_period_start(created_at, granularity)
+            # 明细未记录分类（旧订单）且图书已删除时分类记为0
+            for dimension, dimension_id in (('book', book_id), ('category', category_id or 0), ('all', 0)):
+                entry = totals.setdefault((granularity, period_start, dimension, dimension_id), [0, 0])
+                entry[0] += subtotal
+                entry[1] += quantity
+    if not totals:
+        return
+    db.session.execute(SALES_ROLLUP_UPSERT_STATEMENT, [{
+        'granularity': granularity,
+        'period_start': period_start,
+        'dimension': dimension,
+        'dimension_id': dimension_id,
+        'revenue': sign * revenue,
+        'units': sign * units,
+        'order_count': sign
+    } for (granularity, period_start, dimension, dimension_id), (revenue, units) in totals.items()])
+
 # ============================================
 # 用户资料管理API
 # ============================================
 
+# 用户资料字段（birthday 为日期，序列化为 YYYY-MM-DD）
+USER_PROFILE = SelectQuery({
+    'id': ('id', None),
+    'username': ('username', None),
+    'nickname': ('nickname', None),
+    'email': ('email', None),
+    'phone': ('phone', None),
+    'avatar': ('avatar', None),
+    'gender': ('gender', None),
+    'birthday': ('birthday', None),
+    'role': ('role', None),
+    'status': ('status', None),
+    'created_at': ('created_at', None)
+}, ' FROM users WHERE id = :user_id')
+
 # 获取用户完整资料
 @app.route('/api/user/profile/<int:user_id>', methods=['GET'])
 def get_user_profile(user_id):
     try:
         with app.app_context():
             # 查询用户基本信息
-            user_query = text("""
-                SELECT id, username, nickname, email, phone, avatar, gender, birthday,
-                       role, status, created_at
-                FROM users
-                WHERE id = :user_id
-            """)
-            user = db.session.execute(user_query, {'user_id': user_id}).fetchone()
+            user_data = USER_PROFILE.first(db.session, {'user_id': user_id})
 
-            if not user:
+            if not user_data:
                 return make_response(None, '用户不存在', 404)
 
-            # 查询交易统计
-            stats_query = text("""
-                SELECT
-                    COUNT(DISTINCT o.id) as total_orders,
-                    COUNT(DISTINCT CASE WHEN o.status = 'delivered' THEN o.id END) as completed_orders,
-                    COALESCE(SUM(CASE WHEN o.status != 'cancelled' THEN o.total_amount ELSE 0 END), 0) as total_spent
-                FROM orders o
-                WHERE o.user_id = :user_id
-            """)
-            stats = db.session.execute(stats_query, {'user_id': user_id}).fetchone()
-
-            user_data = {
-                'id': user[0],
-                'username': user[1],
-                'nickname': user[2],
-                'email': user[3],
-                'phone': user[4],
-                'avatar': user[5],
-                'gender': user[6],
-                'birthday': user[7].strftime('%Y-%m-%d') if user[7] else None,
-                'role': user[8],
-                'status': user[9],
-                'created_at': user[10].strftime('%Y-%m-%d %H:%M:%S') if user[10] else None,
-                'stats': {
+            # 查询交易统计（优先读取增量维护的用户订单统计）
+            order_stats = read_user_order_stats(user_id)
+            if order_stats is None:
+                stats_query = text("""
+                    SELECT
+                        COUNT(DISTINCT o.id) as total_orders,
+                        COUNT(DISTINCT CASE WHEN o.status = 'delivered' THEN o.id END) as completed_orders,
+                        COALESCE(SUM(CASE WHEN o.status != 'cancelled' THEN o.total_amount ELSE 0 END), 0) as total_spent
+                    FROM orders o
+                    WHERE o.user_id = :user_id
+                """)
+                stats = db.session.execute(stats_query, {'user_id': user_id}).fetchone()
+                order_stats = {
                     'total_orders': stats[0] if stats else 0,
                     'completed_orders': stats[1] if stats else 0,
                     'total_spent': float(stats[2]) if stats else 0.0
                 }
-            }
+
+            user_data['stats'] = order_stats
 
             return make_response(user_data, '获取用户资料成功')
     except Exception as e:
@@ -1744,6 +3627,24 @@ def change_password(user_id):
 # 收货地址管理API
 # ============================================
 
+# 用户收货地址查询，默认地址在前
+USER_ADDRESSES = SelectQuery({
+    'id': ('id', None),
+    'receiver_name': ('receiver_name', None),
+    'receiver_phone': ('receiver_phone', None),
+    'province': ('province', None),
+    'city': ('city', None),
+    'district': ('district', None),
+    'detail_address': ('detail_address', None),
+    'postal_code': ('postal_code', None),
+    'is_default': ('is_default', bool),
+    'created_at': ('created_at', None)
+}, """
+    FROM shipping_addresses
+    WHERE user_id = :user_id
+    ORDER BY is_default DESC, created_at DESC
+""")
+
 # 获取用户所有收货地址
 @app.route('/api/addresses', methods=['GET'])
 def get_addresses():
@@ -1755,31 +3656,11 @@ def get_addresses():
             return make_response(None, '缺少用户ID', 400)
 
         with app.app_context():
-            result = db.session.execute(text("""
-                SELECT id, receiver_name, receiver_phone, province, city, district,
-                       detail_address, postal_code, is_default, created_at
-                FROM shipping_addresses
-                WHERE user_id = :user_id
-                ORDER BY is_default DESC, created_at DESC
-            """), {'user_id': user_id})
-
-            addresses = []
-            for row in result:
-                addresses.append({
-                    'id': row[0],
-                    'receiver_name': row[1],
-                    'receiver_phone': row[2],
-                    'province': row[3],
-                    'city': row[4],
-                    'district': row[5],
-                    'detail_address': row[6],
-                    'postal_code': row[7],
-                    'is_default': bool(row[8]),
-                    'created_at': row[9].strftime('%Y-%m-%d %H:%M:%S') if row[9] else None,
-                    'full_address': f"{row[3]}{row[4]}{row[5]}{row[6]}"
-                })
+            addresses = USER_ADDRESSES.all(db.session, {'user_id': user_id})
+            for address in addresses:
+                address['full_address'] = f"{address['province']}{address['city']}{address['district']}{address['detail_address']}"
 
-            return make_response({'addresses': addresses}, '获取地址列表成功')
+            return make_conditional_response({'addresses': addresses}, '获取地址列表成功', private=True)
     except Exception as e:
         return make_response(None, f'获取地址列表失败: {str(e)}', 500)
 
@@ -1929,6 +3810,15 @@ def set_default_address(address_id):
         db.session.rollback()
         return make_response(None, f'设置默认地址失败: {str(e)}', 500)
 
+# ============================================
+# 路由模块：搜索、销售分析、图书评论和数据导出接口分别放在各自模块中，导入时向 app 注册路由和命令
+# ============================================
+
+import search_routes
+import analytics_routes
+import review_routes
+import export_routes
+
 
 # 运行应用
 if __name__ == '__main__':
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+响应编码性能对比脚本
+用生成的图书数据构造 /api/books 完整列表响应，对比原 jsonify（逐行 float()/strftime + \\uXXXX 转义）、
+标准库 json 后端和 orjson 后端的响应体大小、编码耗时，以及 gzip/brotli 压缩后的大小和耗时
+
+用法: python benchmark_response.py --books 10000 --repeat 20
+不需要连接数据库
+"""
+
+import argparse
+import datetime
+import decimal
+import random
+import statistics
+import time
+
+from flask.json.provider import DefaultJSONProvider
+
+import app as backend
+from benchmark_search import AUTHORS, CATEGORIES, random_text
+from response_encoding import JSON_BACKENDS, available_encodings, compress
+
+
+def generate_rows(book_count, seed=42):
+    """生成与 BOOK_DETAIL_QUERY 列顺序一致的数据库行（价格、评分为 Decimal，时间为 datetime）"""
+    rng = random.Random(seed)
+    base_time = datetime.datetime(2024, 1, 1)
+    rows = []
+    for i in range(1, book_count + 1):
+        category_id = rng.randint(1, len(CATEGORIES))
+        created_at = base_time + datetime.timedelta(minutes=i)
+        rows.append((
+            i,
+            random_text(rng, rng.randint(2, 4))[:100],
+            rng.choice(AUTHORS),
+            CATEGORIES[category_id - 1],
+            category_id,
+            random_text(rng, rng.randint(10, 30)),
+            decimal.Decimal(f'{rng.uniform(10, 200):.2f}'),
+            rng.randint(0, 200),
+            decimal.Decimal(f'{rng.uniform(3, 5):.2f}'),
+            f'/images/books/{i}.jpg',
+            'available',
+            f'978-{i:010d}',
+            created_at,
+            created_at
+        ))
+    return rows
+
+
+def legacy_row_to_dict(row):
+    """原来的行转换：逐行 float() 和 strftime"""
+    return {
+        'id': row[0],
+        'title': row[1],
+        'author': row[2],
+        'category': row[3],
+        'category_id': row[4],
+        'description': row[5],
+        'price': float(row[6]),
+        'stock': row[7],
+        'rating': float(row[8]) if row[8] else 0.0,
+        'image': row[9],
+        'status': row[10],
+        'isbn': row[11],
+        'created_at': row[12].strftime('%Y-%m-%d %H:%M:%S') if row[12] else None,
+        'updated_at': row[13].strftime('%Y-%m-%d %H:%M:%S') if row[13] else None
+    }
+
+
+def time_call(func, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.mean(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='响应编码性能对比')
+    parser.add_argument('--books', type=int, default=10000, help='生成的图书数量')
+    parser.add_argument('--repeat', type=int, default=20, help='每项测试的重复次数')
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"/api/books 响应编码对比（图书数量: {args.books}，重复次数: {args.repeat}）")
+    print("=" * 72)
+
+    rows = generate_rows(args.books)
+    legacy_provider = DefaultJSONProvider(backend.app)
+
+    def encode_legacy():
+        books = [legacy_row_to_dict(row) for row in rows]
+        return legacy_provider.dumps({'code': 200, 'message': '获取图书列表成功', 'data': {'books': books}}).encode('utf-8')
+
+    encoders = [('jsonify', encode_legacy)]
+    for name, dumps_bytes in JSON_BACKENDS.items():
+        def encode(dumps_bytes=dumps_bytes):
+            books = [backend.book_detail_row_to_dict(row) for row in rows]
+            return dumps_bytes({'code': 200, 'message': '获取图书列表成功', 'data': {'books': books}})
+        encoders.append((name, encode))
+
+    print(f"\n{'编码器':<10}{'行转换+编码':>14}{'响应体':>14}")
+    bodies = {}
+    for name, encode in encoders:
+        elapsed, body = time_call(encode, args.repeat)
+        bodies[name] = body
+        print(f"{name:<10}{elapsed:>12.2f}ms{len(body) / 1024:>12.1f}KB")
+
+    body = bodies[list(JSON_BACKENDS)[-1]]
+    print(f"\n压缩（{list(JSON_BACKENDS)[-1]} 响应体，{len(body) / 1024:.1f}KB）")
+    print(f"{'编码':<10}{'压缩耗时':>14}{'压缩后':>14}{'压缩率':>10}")
+    for encoding in reversed(available_encodings()):
+        elapsed, compressed = time_call(
+            lambda: compress(body, encoding, backend.COMPRESSION_GZIP_LEVEL, backend.COMPRESSION_BROTLI_QUALITY),
+            args.repeat
+        )
+        print(f"{encoding:<10}{elapsed:>12.2f}ms{len(compressed) / 1024:>12.1f}KB{len(compressed) / len(body):>10.1%}")
+
+    if 'br' not in available_encodings():
+        print("\n💡 提示：安装 brotli（pip install brotli）后可对比 br 压缩")
+    print("💡 提示：完整图书列表的编码和压缩结果在目录缓存命中期间会被复用，只在数据变化后重新计算")
+
+
+if __name__ == '__main__':
+    main()
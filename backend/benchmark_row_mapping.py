@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+行转换和语句构造性能对比脚本
+1. 行转换 + JSON 编码：原手写转换函数（逐行 float()/strftime）与数据访问层生成的转换函数，
+   后者把 Decimal/datetime 的转换推迟到序列化时，因此按"转换 + 编码"端到端比较每行开销
+2. 语句构造：每次请求新建 text() 与导入时预先创建的语句，在内存 SQLite 中执行单本图书查询的每次开销
+   （两种方式使用相同的转换函数和编码，差异只来自语句构造）
+
+用法: python benchmark_row_mapping.py --rows 100000 --queries 10000
+不需要连接 MySQL
+"""
+
+import argparse
+import sqlite3
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+
+import app as backend
+from benchmark_response import generate_rows, legacy_row_to_dict
+from benchmark_search import CATEGORIES
+from response_encoding import get_json_backend
+
+
+def time_per_item(func, count, repeat):
+    """重复执行 repeat 次，返回平均每项耗时（微秒）"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) / count * 1e6)
+    return statistics.mean(timings)
+
+
+def create_sqlite_catalog(rows):
+    # 与 MySQL 驱动一样把 TIMESTAMP 列读为 datetime
+    engine = create_engine('sqlite://', connect_args={'detect_types': sqlite3.PARSE_DECLTYPES})
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE categories (id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(text("""
+            CREATE TABLE books (id INTEGER PRIMARY KEY, title TEXT, author TEXT, category_id INT, description TEXT,
+                                price NUMERIC, stock INT, rating NUMERIC, image TEXT, status TEXT, isbn TEXT,
+                                created_at TIMESTAMP, updated_at TIMESTAMP)
+        """))
+        conn.execute(text("INSERT INTO categories (id, name) VALUES (:id, :name)"),
+                     [{'id': i, 'name': name} for i, name in enumerate(CATEGORIES, 1)])
+        conn.execute(text("""
+            INSERT INTO books VALUES (:id, :title, :author, :category_id, :description, :price, :stock, :rating,
+                                      :image, :status, :isbn, :created_at, :updated_at)
+        """), [{
+            'id': row[0], 'title': row[1], 'author': row[2], 'category_id': row[4], 'description': row[5],
+            'price': float(row[6]), 'stock': row[7], 'rating': float(row[8]), 'image': row[9], 'status': row[10],
+            'isbn': row[11], 'created_at': row[12], 'updated_at': row[13]
+        } for row in rows])
+    return engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description='行转换和语句构造性能对比')
+    parser.add_argument('--rows', type=int, default=100000, help='行转换测试的行数')
+    parser.add_argument('--queries', type=int, default=10000, help='语句构造测试的查询次数')
+    parser.add_argument('--repeat', type=int, default=5, help='每项测试的重复次数')
+    args = parser.parse_args()
+
+    print("=" * 64)
+    print(f"行转换与语句构造对比（{args.rows} 行，{args.queries} 次查询）")
+    print("=" * 64)
+
+    rows = generate_rows(args.rows)
+    generated = backend.BOOK_DETAIL.row_to_dict
+    backend_name, dumps = get_json_backend()
+    legacy_map_us = time_per_item(lambda: [legacy_row_to_dict(row) for row in rows], args.rows, args.repeat)
+    generated_map_us = time_per_item(lambda: [generated(row) for row in rows], args.rows, args.repeat)
+    legacy_us = time_per_item(lambda: dumps([legacy_row_to_dict(row) for row in rows]), args.rows, args.repeat)
+    generated_us = time_per_item(lambda: dumps([generated(row) for row in rows]), args.rows, args.repeat)
+    print(f"\n行转换 + JSON 编码（每行，{backend_name}）")
+    print(f"  {'':14}{'仅转换':>10}{'转换+编码':>12}")
+    print(f"  手写转换函数  {legacy_map_us:8.3f}µs {legacy_us:9.3f}µs")
+    print(f"  生成的转换函数{generated_map_us:8.3f}µs {generated_us:9.3f}µs   （端到端 {legacy_us / generated_us:.2f}x）")
+
+    engine = create_sqlite_catalog(rows[:1000])
+    sql = backend.BOOK_BY_ID.sql()
+    statement = backend.BOOK_BY_ID.statement
+    book_ids = [i % 1000 + 1 for i in range(args.queries)]
+    with engine.connect() as conn:
+        def per_call():
+            for book_id in book_ids:
+                dumps(generated(conn.execute(text(sql), {'book_id': book_id}).fetchone()))
+
+        def precompiled():
+            for book_id in book_ids:
+                dumps(generated(conn.execute(statement, {'book_id': book_id}).fetchone()))
+
+        per_call_us = time_per_item(per_call, args.queries, args.repeat)
+        precompiled_us = time_per_item(precompiled, args.queries, args.repeat)
+    print("\n单本图书查询（每次，含 SQLite 执行、行转换和 JSON 编码）")
+    print(f"  每次新建 text()  {per_call_us:8.2f}µs")
+    print(f"  预先创建语句     {precompiled_us:8.2f}µs   （节省 {per_call_us - precompiled_us:.2f}µs）")
+
+    print("\n💡 提示：生成的转换函数不再逐行 float()/strftime，这部分工作移到了 JSON 编码器中，"
+          "\"仅转换\"一列的差距不代表响应的实际提升，以\"转换+编码\"为准")
+
+
+if __name__ == '__main__':
+    main()
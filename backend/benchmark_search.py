@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+搜索后端性能对比脚本
+在单独的基准测试数据库中生成图书数据，对比 LIKE、MySQL 全文索引和进程内倒排索引三种搜索后端
+
+用法: python benchmark_search.py --books 100000 --queries 200
+注意: 会在 BENCH_DB_NAME（默认 bookstore_search_benchmark）中重建 categories/books 表
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+load_dotenv()
+
+BENCH_DB_NAME = os.getenv('BENCH_DB_NAME', 'bookstore_search_benchmark')
+
+# 生成图书用的词库
+CN_WORDS = ['红楼', '梦境', '历史', '简史', '宇宙', '哲学', '经济', '管理', '心理', '艺术', '设计', '算法',
+            '编程', '数据', '系统', '文学', '小说', '诗歌', '科学', '原理', '世界', '中国', '人类', '时间',
+            '生活', '思考', '习惯', '领导', '理论', '实践', '入门', '精通', '故事', '传记', '战争', '和平']
+EN_WORDS = ['python', 'vue', 'react', 'java', 'design', 'pattern', 'system', 'data', 'science', 'history',
+            'world', 'guide', 'deep', 'learning', 'network', 'cloud', 'database', 'algorithm', 'theory', 'art']
+AUTHORS = ['余华', '路遥', '钱钟书', '曹雪芹', '吕思勉', 'Eric Matthes', 'Jon Bentley', 'Dan Abramov',
+           'Thomas H. Cormen', 'Randal E. Bryant', '史蒂芬·霍金', '尤瓦尔·赫拉利']
+CATEGORIES = ['技术', '文学', '历史', '科学', '艺术', '哲学', '心理学', '经济', '管理', '生活']
+
+
+def server_uri(db_name=''):
+    return (f"mysql+pymysql://{os.getenv('DB_USERNAME', 'root')}:{os.getenv('DB_PASSWORD', 'password')}"
+            f"@{os.getenv('DB_HOST', 'localhost')}:{os.getenv('DB_PORT', '3306')}/{db_name}?charset=utf8mb4")
+
+
+def random_text(rng, word_count):
+    words = []
+    for _ in range(word_count):
+        words.append(rng.choice(CN_WORDS) if rng.random() < 0.7 else rng.choice(EN_WORDS))
+    return ''.join(w if not w.isascii() else f' {w} ' for w in words).strip()
+
+
+def generate_catalog(book_count, seed=42):
+    """生成测试数据并建立全文索引"""
+    rng = random.Random(seed)
+    engine = create_engine(server_uri())
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE DATABASE IF NOT EXISTS {BENCH_DB_NAME} DEFAULT CHARSET utf8mb4"))
+
+    engine = create_engine(server_uri(BENCH_DB_NAME))
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS books"))
+        conn.execute(text("DROP TABLE IF EXISTS categories"))
+        conn.execute(text("""
+            CREATE TABLE categories (
+              id INT PRIMARY KEY AUTO_INCREMENT,
+              name VARCHAR(50) NOT NULL UNIQUE,
+              description VARCHAR(255)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """))
+        conn.execute(text("""
+            CREATE TABLE books (
+              id INT PRIMARY KEY AUTO_INCREMENT,
+              isbn VARCHAR(20) UNIQUE,
+              title VARCHAR(100) NOT NULL,
+              author VARCHAR(100) NOT NULL,
+              category_id INT,
+              description TEXT,
+              price DECIMAL(10,2) NOT NULL DEFAULT 0.00,
+              stock INT NOT NULL DEFAULT 0,
+              rating DECIMAL(3,2) DEFAULT 0.00,
+              image VARCHAR(255),
+              status ENUM('available', 'unavailable') NOT NULL DEFAULT 'available',
+              created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+              updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+              INDEX idx_category_id (category_id)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """))
+        conn.execute(text("INSERT INTO categories (name) VALUES (:name)"), [{'name': n} for n in CATEGORIES])
+
+        batch = []
+        for i in range(1, book_count + 1):
+            batch.append({
+                'isbn': f'978-{i:010d}',
+                'title': random_text(rng, rng.randint(2, 4))[:100],
+                'author': rng.choice(AUTHORS),
+                'category_id': rng.randint(1, len(CATEGORIES)),
+                'description': random_text(rng, rng.randint(10, 30)),
+                'price': round(rng.uniform(10, 200), 2),
+                'stock': rng.randint(0, 200),
+                'rating': round(rng.uniform(3, 5), 1)
+            })
+            if len(batch) == 1000 or i == book_count:
+                conn.execute(text("""
+                    INSERT INTO books (isbn, title, author, category_id, description, price, stock, rating)
+                    VALUES (:isbn, :title, :author, :category_id, :description, :price, :stock, :rating)
+                """), batch)
+                batch = []
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(text(
+            "ALTER TABLE books ADD FULLTEXT INDEX ft_books_text (title, author, description) WITH PARSER ngram"
+        ))
+    print(f"🔧 全文索引创建耗时: {time.perf_counter() - start:.2f}s")
+
+
+def build_queries(query_count, seed=7):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(query_count):
+        roll = rng.random()
+        if roll < 0.5:
+            queries.append(rng.choice(CN_WORDS))
+        elif roll < 0.8:
+            queries.append(rng.choice(EN_WORDS)[:rng.randint(3, 6)])
+        else:
+            queries.append(f'{rng.choice(CN_WORDS)} {rng.choice(EN_WORDS)}')
+    return queries
+
+
+def time_backend(name, search, queries):
+    timings = []
+    hits = 0
+    for query in queries:
+        start = time.perf_counter()
+        total, _ = search(query)
+        timings.append((time.perf_counter() - start) * 1000)
+        hits += total
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) > 1 else timings[0]
+    print(f"{name:<10} 平均 {statistics.mean(timings):8.2f}ms   P95 {p95:8.2f}ms   平均命中 {hits / len(queries):8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='搜索后端性能对比')
+    parser.add_argument('--books', type=int, default=100000, help='生成的图书数量')
+    parser.add_argument('--queries', type=int, default=200, help='查询次数')
+    parser.add_argument('--limit', type=int, default=20, help='每次查询返回的数量')
+    parser.add_argument('--skip-generate', action='store_true', help='复用已生成的测试数据')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"搜索后端性能对比（图书数量: {args.books}，查询次数: {args.queries}）")
+    print("=" * 60)
+
+    if not args.skip_generate:
+        print(f"\n📦 正在生成测试数据到数据库 {BENCH_DB_NAME} ...")
+        generate_catalog(args.books)
+
+    # 让应用连接到基准测试数据库，直接调用应用中的搜索实现
+    os.environ['DB_NAME'] = BENCH_DB_NAME
+    import app as backend
+
+    queries = build_queries(args.queries)
+    with backend.app.app_context():
+        start = time.perf_counter()
+        index = backend.ensure_search_index()
+        print(f"🔧 内存索引构建耗时: {time.perf_counter() - start:.2f}s（{len(index)} 本图书）\n")
+
+        time_backend('like', lambda q: backend.search_books_with_like(q, '', args.limit), queries)
+        time_backend('fulltext', lambda q: backend.search_books_with_fulltext(q, '', args.limit)
+                     or backend.search_books_with_like(q, '', args.limit), queries)
+        time_backend('index', lambda q: index.search(q, '', args.limit), queries)
+
+    print("\n💡 提示：fulltext 对单字关键词会回退到 LIKE 查询，命中数与 like 不同属于正常现象（ngram 按词组匹配）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+# 图书目录缓存
+# 进程内缓存已序列化的图书记录（按ID索引）、完整图书列表和分类列表
+# 每次写操作递增目录版本号，版本变化后列表快照失效；单本图书只在自身被修改时失效
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class CatalogCache:
+    """图书目录快照缓存，支持最大过期时间和内存上限，并统计命中率"""
+
+    def __init__(self, max_staleness=30, max_books=50000):
+        self.max_staleness = max_staleness   # 缓存最长使用时间（秒），用于感知其他进程的写入，<=0 表示禁用缓存
+        self.max_books = max_books           # 最多缓存的图书记录数
+        self.version = 0                     # 目录版本号，只增不减
+        self.changed_at = None               # 本进程最近一次写操作的时间（用于 Last-Modified，能反映删除操作）
+        self._lock = threading.Lock()
+        self._books = OrderedDict()          # 图书ID -> (加载时间, 图书数据)，按LRU淘汰
+        self._snapshots = {}                 # 快照名 -> (版本号, 加载时间, 数据)
+        self._stats = {}                     # 类型 -> {'hits': 命中次数, 'misses': 未命中次数}
+
+    @property
+    def enabled(self):
+        return self.max_staleness > 0
+
+    def bump_version(self, book_ids=None):
+        """写操作提交后调用：递增版本号，并丢弃被修改图书的缓存（不传则清空全部图书缓存）"""
+        with self._lock:
+            self.version += 1
+            self.changed_at = time.time()
+            if book_ids is None:
+                self._books.clear()
+            else:
+                for book_id in book_ids:
+                    self._books.pop(book_id, None)
+            return self.version
+
+    def _count(self, kind, hit):
+        stats = self._stats.setdefault(kind, {'hits': 0, 'misses': 0})
+        stats['hits' if hit else 'misses'] += 1
+
+    def _fresh(self, loaded_at):
+        return time.time() - loaded_at <= self.max_staleness
+
+    def get_book(self, book_id, loader):
+        """获取单本图书，未命中时调用 loader(book_id) 从数据库加载"""
+        if not self.enabled:
+            return loader(book_id)
+        with self._lock:
+            entry = self._books.get(book_id)
+            if entry is not None and self._fresh(entry[0]):
+                self._books.move_to_end(book_id)
+                self._count('book', True)
+                return entry[1]
+            self._count('book', False)
+            version = self.version
+
+        data = loader(book_id)
+        if data is not None:
+            with self._lock:
+                # 加载期间如果发生了写操作，不缓存可能过期的数据
+                if self.version == version:
+                    self._books[book_id] = (time.time(), data)
+                    self._books.move_to_end(book_id)
+                    while len(self._books) > self.max_books:
+                        self._books.popitem(last=False)
+        return data
+
+    def get_books(self, book_ids, loader):
+        """批量获取图书，未命中的ID一次性调用 loader(ids) 加载（返回 {图书ID: 图书数据}）"""
+        if not self.enabled:
+            return loader(list(book_ids))
+        found = {}
+        missing = []
+        with self._lock:
+            for book_id in book_ids:
+                entry = self._books.get(book_id)
+                if entry is not None and self._fresh(entry[0]):
+                    self._books.move_to_end(book_id)
+                    found[book_id] = entry[1]
+                    self._count('book', True)
+                else:
+                    missing.append(book_id)
+                    self._count('book', False)
+            version = self.version
+
+        if missing:
+            loaded = loader(missing)
+            found.update(loaded)
+            with self._lock:
+                if self.version == version:
+                    now = time.time()
+                    for book_id, data in loaded.items():
+                        self._books[book_id] = (now, data)
+                        self._books.move_to_end(book_id)
+                    while len(self._books) > self.max_books:
+                        self._books.popitem(last=False)
+        return found
+
+    def get_snapshot(self, name, loader, size_of=len):
+        """获取整体快照（如完整图书列表、分类列表），版本号变化或超时后重新加载"""
+        if not self.enabled:
+            return loader()
+        with self._lock:
+            entry = self._snapshots.get(name)
+            if entry is not None and entry[0] == self.version and self._fresh(entry[1]):
+                self._count(name, True)
+                return entry[2]
+            self._count(name, False)
+            version = self.version
+
+        data = loader()
+        with self._lock:
+            # 超过内存上限的快照不缓存
+            if self.version == version and size_of(data) <= self.max_books:
+                self._snapshots[name] = (version, time.time(), data)
+            else:
+                self._snapshots.pop(name, None)
+        return data
+
+    def get_stats(self):
+        with self._lock:
+            stats = {}
+            for kind, counts in self._stats.items():
+                total = counts['hits'] + counts['misses']
+                stats[kind] = dict(counts, hit_rate=round(counts['hits'] / total, 4) if total else 0.0)
+            return {
+                'enabled': self.enabled,
+                'version': self.version,
+                'max_staleness': self.max_staleness,
+                'max_books': self.max_books,
+                'cached_books': len(self._books),
+                'snapshots': sorted(self._snapshots),
+                'stats': stats
+            }
@@ -0,0 +1,151 @@
+# 共同购买推荐（"买了这本书的人还买了"）
+# 按订单逐个累加篮子内图书两两共现的次数，计算相似度后为每本图书保留前 K 个邻居
+# 共现对先追加到整数数组缓冲区，攒满一批后用 NumPy 合并计数（未安装 NumPy 时用 Counter 合并）
+
+import heapq
+import math
+from array import array
+from collections import Counter
+from itertools import combinations
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 单个订单最多参与统计的不同图书数（共现对数量随篮子大小平方增长，超大订单通常是批量采购）
+MAX_BASKET_SIZE = 50
+# 缓冲区中积累多少个共现对后合并一次
+DEFAULT_CHUNK_SIZE = 1000000
+
+SCORE_METHODS = ('cosine', 'lift')
+
+
+class CoPurchaseCounter:
+    """共现计数器：add_basket 逐个订单累加，neighbours 计算每本图书的前 K 个邻居
+
+    图书ID映射为连续下标，共现对编码为 (较小下标 << 32) | 较大下标 的 64 位整数
+    """
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.order_count = 0
+        self._index = {}            # 图书ID -> 下标
+        self._book_ids = []         # 下标 -> 图书ID
+        self._book_orders = []      # 下标 -> 包含该图书的订单数
+        self._pending = array('q')  # 尚未合并的共现对
+        if np is not None:
+            self._codes = np.empty(0, dtype=np.int64)
+            self._counts = np.empty(0, dtype=np.int64)
+        else:
+            self._pairs = Counter()
+
+    @property
+    def backend(self):
+        return 'numpy' if np is not None else 'python'
+
+    def __len__(self):
+        return len(self._book_ids)
+
+    def _position(self, book_id):
+        position = self._index.get(book_id)
+        if position is None:
+            position = self._index[book_id] = len(self._book_ids)
+            self._book_ids.append(book_id)
+            self._book_orders.append(0)
+        return position
+
+    def add_basket(self, book_ids):
+        """累加一个订单中的图书（重复的图书只算一次）"""
+        positions = sorted({self._position(book_id) for book_id in book_ids})
+        if not positions:
+            return
+        self.order_count += 1
+        for position in positions:
+            self._book_orders[position] += 1
+        if len(positions) > MAX_BASKET_SIZE:
+            return
+        self._pending.extend((a << 32) | b for a, b in combinations(positions, 2))
+        if len(self._pending) >= self.chunk_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        if np is not None:
+            codes = np.concatenate((self._codes, np.frombuffer(self._pending, dtype=np.int64)))
+            counts = np.concatenate((self._counts, np.ones(len(self._pending), dtype=np.int64)))
+            self._codes, inverse = np.unique(codes, return_inverse=True)
+            self._counts = np.bincount(inverse.ravel(), weights=counts, minlength=len(self._codes)).astype(np.int64)
+        else:
+            self._pairs.update(self._pending)
+        self._pending = array('q')
+
+    def neighbours(self, top_k=20, min_support=2, score='cosine'):
+        """返回 [(图书ID, 邻居图书ID, 排名, 共现次数, 相似度)]，按图书ID和排名排序
+
+        cosine = 共现次数 / sqrt(订单数A * 订单数B)；lift = 共现次数 * 订单总数 / (订单数A * 订单数B)
+        共现次数低于 min_support 的图书对不参与推荐
+        """
+        if score not in SCORE_METHODS:
+            raise ValueError(f'不支持的相似度: {score}')
+        self._flush()
+        if np is not None:
+            return self._neighbours_numpy(top_k, min_support, score)
+        return self._neighbours_python(top_k, min_support, score)
+
+    def _score(self, co_count, orders_a, orders_b, score):
+        if score == 'lift':
+            return co_count * self.order_count / (orders_a * orders_b)
+        return co_count / math.sqrt(orders_a * orders_b)
+
+    def _neighbours_numpy(self, top_k, min_support, score):
+        keep = self._counts >= min_support
+        codes, counts = self._codes[keep], self._counts[keep]
+        if not len(codes):
+            return []
+        low, high = codes >> 32, codes & 0xFFFFFFFF
+        book_orders = np.asarray(self._book_orders, dtype=np.float64)
+        if score == 'lift':
+            scores = counts * self.order_count / (book_orders[low] * book_orders[high])
+        else:
+            scores = counts / np.sqrt(book_orders[low] * book_orders[high])
+
+        # 每个图书对分别作为两本书的邻居
+        book_ids = np.asarray(self._book_ids, dtype=np.int64)
+        sources = book_ids[np.concatenate((low, high))]
+        targets = book_ids[np.concatenate((high, low))]
+        counts = np.concatenate((counts, counts))
+        scores = np.concatenate((scores, scores))
+
+        # 按图书ID分组、组内相似度降序（相同时邻居ID升序），保留每组前 top_k 个
+        order = np.lexsort((targets, -scores, sources))
+        sources, targets, counts, scores = sources[order], targets[order], counts[order], scores[order]
+        group_starts = np.flatnonzero(np.r_[True, sources[1:] != sources[:-1]])
+        group_sizes = np.diff(np.r_[group_starts, len(sources)])
+        ranks = np.arange(len(sources)) - np.repeat(group_starts, group_sizes)
+        keep = ranks < top_k
+        return list(zip(
+            sources[keep].tolist(), targets[keep].tolist(), (ranks[keep] + 1).tolist(),
+            counts[keep].tolist(), scores[keep].tolist()
+        ))
+
+    def _neighbours_python(self, top_k, min_support, score):
+        candidates = {}
+        for code, co_count in self._pairs.items():
+            if co_count < min_support:
+                continue
+            low, high = code >> 32, code & 0xFFFFFFFF
+            value = self._score(co_count, self._book_orders[low], self._book_orders[high], score)
+            low_id, high_id = self._book_ids[low], self._book_ids[high]
+            candidates.setdefault(low_id, []).append((value, high_id, co_count))
+            candidates.setdefault(high_id, []).append((value, low_id, co_count))
+
+        rows = []
+        for book_id in sorted(candidates):
+            best = heapq.nsmallest(top_k, candidates[book_id], key=lambda item: (-item[0], item[1]))
+            rows.extend(
+                (book_id, neighbour_id, rank, co_count, value)
+                for rank, (value, neighbour_id, co_count) in enumerate(best, 1)
+            )
+        return rows
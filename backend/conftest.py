@@ -0,0 +1,2 @@
+# 需要数据库和运行中服务的手动测试脚本（python test_register.py），不作为单元测试收集
+collect_ignore = ['test_db_connection.py', 'test_register.py']
@@ -0,0 +1,197 @@
+# 基于内容的相似图书（"更多类似图书"）
+# 用书名、作者、分类和描述构建 TF-IDF 向量（分词与搜索索引相同：中文二元组、拉丁文单词），按余弦相似度为每本图书保留前 K 个邻居
+# 批量计算时按行分块计算 X_block · Xᵀ，每块的得分矩阵和中间数组都不超过 block_elements 个元素；未安装 NumPy 时用倒排表逐本计算
+
+import heapq
+import math
+from collections import Counter
+
+from search_index import FIELD_WEIGHTS, tokenize
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 每本图书的向量只保留权重最高的若干个词（存储和增量计算的规模都与图书数量成正比）
+MAX_TERMS_PER_BOOK = 100
+# 出现在超过该比例图书中的词不参与计算（类似停用词，对区分相似度没有帮助）
+DEFAULT_MAX_DF_RATIO = 0.5
+# 分块计算时单块最多的元素数（得分矩阵为 块行数 × 图书数）
+DEFAULT_BLOCK_ELEMENTS = 4000000
+# 词的最大长度（与 book_similarity_terms.term 列一致）
+MAX_TERM_LENGTH = 64
+
+
+def document_terms(book):
+    """图书的加权词频：各字段的词按字段权重累加"""
+    terms = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in tokenize(book.get(field), for_query=True):
+            terms[token[:MAX_TERM_LENGTH]] += weight
+    return terms
+
+
+def inverse_document_frequency(document_count, df):
+    return math.log((1 + document_count) / (1 + df)) + 1
+
+
+def term_vector(terms, idf, default_idf):
+    """TF-IDF 向量（词频取对数），只保留权重最高的 MAX_TERMS_PER_BOOK 个词并做 L2 归一化
+
+    idf 中没有的词（批量计算后新出现的词）使用 default_idf；idf 为 None 的词（高频词）被忽略
+    """
+    weights = {}
+    for term, tf in terms.items():
+        term_idf = idf.get(term, default_idf)
+        if term_idf is not None:
+            weights[term] = (1 + math.log(tf)) * term_idf
+    if len(weights) > MAX_TERMS_PER_BOOK:
+        weights = dict(heapq.nlargest(MAX_TERMS_PER_BOOK, weights.items(), key=lambda item: (item[1], item[0])))
+    norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+    return {term: weight / norm for term, weight in weights.items()} if norm else {}
+
+
+def build_vectors(books, max_df_ratio=DEFAULT_MAX_DF_RATIO):
+    """返回 (图书ID列表, 向量列表, idf)；高频词在 idf 中记为 None"""
+    book_ids = []
+    documents = []
+    df = Counter()
+    for book in books:
+        terms = document_terms(book)
+        book_ids.append(book['id'])
+        documents.append(terms)
+        df.update(terms.keys())
+    document_count = len(documents)
+    max_df = max(1, int(document_count * max_df_ratio))
+    idf = {
+        term: inverse_document_frequency(document_count, count) if count <= max_df else None
+        for term, count in df.items()
+    }
+    default_idf = inverse_document_frequency(document_count, 1)
+    return book_ids, [term_vector(terms, idf, default_idf) for terms in documents], idf
+
+
+def best_neighbours(candidates, top_k):
+    """相似度降序、相同时图书ID升序的前 top_k 个 (图书ID, 相似度)"""
+    return heapq.nsmallest(top_k, candidates, key=lambda item: (-item[1], item[0]))
+
+
+def top_k_neighbours(book_ids, vectors, top_k=20, block_elements=DEFAULT_BLOCK_ELEMENTS):
+    """返回 [(图书ID, 邻居图书ID, 排名, 相似度)]，按图书ID和排名排序"""
+    if np is not None:
+        neighbours = _neighbours_numpy(book_ids, vectors, top_k, block_elements)
+    else:
+        neighbours = _neighbours_python(book_ids, vectors, top_k)
+    rows = []
+    for book_id in sorted(neighbours):
+        rows.extend(
+            (book_id, neighbour_id, position, score)
+            for position, (neighbour_id, score) in enumerate(neighbours[book_id], 1)
+        )
+    return rows
+
+
+def _neighbours_python(book_ids, vectors, top_k):
+    postings = {}
+    for row, vector in enumerate(vectors):
+        for term, weight in vector.items():
+            postings.setdefault(term, []).append((row, weight))
+    neighbours = {}
+    for row, vector in enumerate(vectors):
+        scores = {}
+        for term, weight in vector.items():
+            for other, other_weight in postings[term]:
+                if other != row:
+                    scores[other] = scores.get(other, 0.0) + weight * other_weight
+        if scores:
+            neighbours[book_ids[row]] = best_neighbours(((book_ids[other], score) for other, score in scores.items()), top_k)
+    return neighbours
+
+
+def _neighbours_numpy(book_ids, vectors, top_k, block_elements):
+    document_count = len(vectors)
+    # 只出现在一本图书中的词对相似度没有贡献，不进入矩阵
+    term_df = Counter(term for vector in vectors for term in vector)
+    columns = {term: i for i, term in enumerate(term for term, count in term_df.items() if count > 1)}
+    if not columns:
+        return {}
+
+    # 行压缩格式（按图书）
+    entry_rows, entry_cols, entry_weights = [], [], []
+    for row, vector in enumerate(vectors):
+        for term, weight in vector.items():
+            column = columns.get(term)
+            if column is not None:
+                entry_rows.append(row)
+                entry_cols.append(column)
+                entry_weights.append(weight)
+    entry_rows = np.asarray(entry_rows, dtype=np.int64)
+    entry_cols = np.asarray(entry_cols, dtype=np.int64)
+    entry_weights = np.asarray(entry_weights, dtype=np.float64)
+    row_starts = np.searchsorted(entry_rows, np.arange(document_count + 1))
+
+    # 列压缩格式（按词），即 Xᵀ 的行压缩格式
+    order = np.argsort(entry_cols, kind='stable')
+    posting_rows = entry_rows[order]
+    posting_weights = entry_weights[order]
+    posting_starts = np.concatenate(([0], np.cumsum(np.bincount(entry_cols, minlength=len(columns)))))
+
+    ids = np.asarray(book_ids, dtype=np.int64)
+    k = min(top_k, document_count - 1)
+    block_rows = max(1, block_elements // document_count)
+    neighbours = {}
+    for start in range(0, document_count, block_rows):
+        end = min(start + block_rows, document_count)
+        scores = np.zeros((end - start) * document_count, dtype=np.float64)
+        first, last = row_starts[start], row_starts[end]
+        lengths = posting_starts[entry_cols[first:last] + 1] - posting_starts[entry_cols[first:last]]
+        # 展开后的 (块内行, 目标图书) 对分批累加，每批不超过 block_elements 个
+        cumulative = np.cumsum(lengths)
+        batch_first = first
+        while batch_first < last:
+            done = cumulative[batch_first - first - 1] if batch_first > first else 0
+            batch_last = first + int(np.searchsorted(cumulative, done + block_elements, side='right'))
+            batch_last = min(max(batch_last, batch_first + 1), last)
+            batch_lengths = lengths[batch_first - first:batch_last - first]
+            total = int(batch_lengths.sum())
+            if total:
+                offsets = np.repeat(
+                    posting_starts[entry_cols[batch_first:batch_last]] - (np.cumsum(batch_lengths) - batch_lengths),
+                    batch_lengths
+                ) + np.arange(total)
+                sources = np.repeat(entry_rows[batch_first:batch_last] - start, batch_lengths)
+                products = np.repeat(entry_weights[batch_first:batch_last], batch_lengths) * posting_weights[offsets]
+                scores += np.bincount(sources * document_count + posting_rows[offsets], weights=products,
+                                      minlength=len(scores))
+            batch_first = batch_last
+        scores = scores.reshape(end - start, document_count)
+        scores[np.arange(end - start), np.arange(start, end)] = 0.0
+
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k > 0 else np.empty((end - start, 0), np.int64)
+        for local_row, columns_for_row in enumerate(candidates):
+            best = [
+                (int(ids[column]), float(scores[local_row, column]))
+                for column in columns_for_row if scores[local_row, column] > 0
+            ]
+            if best:
+                neighbours[book_ids[start + local_row]] = best_neighbours(best, top_k)
+    return neighbours
+
+
+def score_against(vector, postings):
+    """用倒排表计算一个向量与其他图书的相似度，postings 为 [(图书ID, 词, 权重)]"""
+    scores = {}
+    for book_id, term, weight in postings:
+        query_weight = vector.get(term)
+        if query_weight:
+            scores[book_id] = scores.get(book_id, 0.0) + query_weight * weight
+    return scores
+
+
+def merge_neighbour(neighbours, book_id, score, top_k):
+    """把一本图书的新相似度合并进另一本图书的邻居列表（score 为 0 表示不再相似）"""
+    merged = [(neighbour_id, value) for neighbour_id, value in neighbours if neighbour_id != book_id]
+    if score > 0:
+        merged.append((book_id, score))
+    return best_neighbours(merged, top_k)
@@ -0,0 +1,98 @@
+# 数据访问层
+# 查询在模块导入时声明一次：SQL 文本只构造一次 text() 语句对象，行转换函数按字段定义生成
+# 生成的转换函数是一条字典字面量（{'id': row[0], 'price': _c6(row[6]), ...}），没有逐列循环和字段查找
+
+from sqlalchemy import bindparam, text
+
+# 同一查询最多缓存的字段组合数（fields 参数产生的变体）
+MAX_QUERY_VARIANTS = 64
+
+
+def zero_if_null(value):
+    return value or 0.0
+
+
+def float_or_zero(value):
+    """内存索引保存的数值统一为 float"""
+    return float(value) if value else 0.0
+
+
+def compile_row_mapper(names, converters=None):
+    """按字段名生成行转换函数，converters 为 {字段名: 转换函数}，未列出的字段原样返回
+
+    Decimal 和 datetime 由 JSON 编码器处理，只有需要改变取值的字段（如空评分返回0）才需要转换函数
+    """
+    converters = converters or {}
+    namespace = {}
+    items = []
+    for i, name in enumerate(names):
+        convert = converters.get(name)
+        if convert is None:
+            items.append(f'{name!r}: row[{i}]')
+        else:
+            namespace[f'_c{i}'] = convert
+            items.append(f'{name!r}: _c{i}(row[{i}])')
+    source = f"def row_to_dict(row):\n    return {{{', '.join(items)}}}\n"
+    exec(source, namespace)
+    return namespace['row_to_dict']
+
+
+class SelectQuery:
+    """预先声明的 SELECT 查询
+
+    fields 为 {字段名: (SELECT 表达式, 转换函数或None)}，字段顺序即返回顺序；
+    from_clause 为 FROM/JOIN 部分，suffix 为 WHERE/ORDER BY 等后续子句；
+    默认（全部字段）的语句和转换函数在创建时生成，fields 参数的变体在首次使用时生成并缓存
+    """
+
+    def __init__(self, fields, from_clause, suffix='', expanding=()):
+        self.fields = fields
+        self.from_clause = from_clause
+        self.suffix = suffix
+        self.expanding = tuple(expanding)
+        self.names = list(fields)
+        self._variants = {}
+        self.statement, self.row_to_dict = self.variant(self.names)
+
+    def columns(self, names=None):
+        return ', '.join(f"{self.fields[name][0]} AS {name}" for name in (names or self.names))
+
+    def sql(self, names=None):
+        return f"SELECT {self.columns(names)}{self.from_clause}{self.suffix}"
+
+    def where(self, suffix, expanding=()):
+        """派生字段相同、后续子句不同的查询（同样应在模块级声明）"""
+        return SelectQuery(self.fields, self.from_clause, suffix, self.expanding + tuple(expanding))
+
+    def variant(self, names):
+        """指定字段组合的 (语句, 行转换函数)"""
+        key = tuple(names)
+        entry = self._variants.get(key)
+        if entry is None:
+            statement = text(self.sql(names))
+            if self.expanding:
+                statement = statement.bindparams(*[bindparam(name, expanding=True) for name in self.expanding])
+            converters = {name: self.fields[name][1] for name in names if self.fields[name][1] is not None}
+            entry = (statement, compile_row_mapper(names, converters))
+            if len(self._variants) >= MAX_QUERY_VARIANTS:
+                self._variants.clear()
+            self._variants[key] = entry
+        return entry
+
+    def mapper(self, names=None):
+        """指定字段组合的行转换函数（用于 WHERE 条件动态拼接、不能预先声明的查询）"""
+        return self.variant(names)[1] if names else self.row_to_dict
+
+    def execute(self, session, params=None, names=None):
+        """执行查询，返回 (结果集, 行转换函数)"""
+        statement, row_to_dict = self.variant(names) if names else (self.statement, self.row_to_dict)
+        return session.execute(statement, params or {}), row_to_dict
+
+    def all(self, session, params=None, names=None):
+        result, row_to_dict = self.execute(session, params, names)
+        return [row_to_dict(row) for row in result]
+
+    def first(self, session, params=None, names=None):
+        result, row_to_dict = self.execute(session, params, names)
+        row = result.fetchone()
+        return row_to_dict(row) if row is not None else None
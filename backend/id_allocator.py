@@ -0,0 +1,75 @@
+# 图书ID分配器
+# 在内存中维护空闲ID（删除后留下的空缺），新增图书时 O(log n) 取最小空缺，
+# 替代每次插入前对 books 表做自连接查找空缺ID
+
+import heapq
+import threading
+import time
+
+
+class IdAllocator:
+    """最小空闲ID分配器：空缺ID用最小堆保存，没有空缺时分配当前最大ID + 1"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._free_heap = []     # 空闲ID最小堆（可能包含已被占用的ID，分配时惰性跳过）
+        self._free = set()       # 当前空闲ID集合
+        self._next_id = 1        # 大于所有已用ID的最小ID
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._free)
+
+    def rebuild(self, used_ids):
+        """用按升序排列的已用ID重建空闲列表"""
+        with self._lock:
+            free = []
+            expected = 1
+            for book_id in used_ids:
+                if book_id > expected:
+                    free.extend(range(expected, book_id))
+                expected = max(expected, book_id + 1)
+            self._free_heap = free
+            self._free = set(free)
+            self._next_id = expected
+            self.built_at = time.time()
+
+    def allocate(self):
+        """分配最小的可用ID"""
+        with self._lock:
+            while self._free_heap:
+                book_id = heapq.heappop(self._free_heap)
+                if book_id in self._free:
+                    self._free.discard(book_id)
+                    return book_id
+            book_id = self._next_id
+            self._next_id += 1
+            return book_id
+
+    def release(self, book_id):
+        """图书删除（或分配后插入失败）时归还ID"""
+        with self._lock:
+            if book_id < 1 or book_id >= self._next_id or book_id in self._free:
+                return
+            if book_id == self._next_id - 1:
+                # 归还的是末尾ID时不记录空缺，而是收缩 _next_id，并一并收回紧邻末尾的空缺ID
+                # （堆中对应的项不在空闲集合中，分配时惰性跳过）
+                self._next_id -= 1
+                while self._next_id - 1 in self._free:
+                    self._next_id -= 1
+                    self._free.discard(self._next_id)
+                return
+            self._free.add(book_id)
+            heapq.heappush(self._free_heap, book_id)
+
+    def mark_used(self, book_ids):
+        """登记由其他途径写入的ID（如批量导入使用的自增ID）"""
+        with self._lock:
+            for book_id in book_ids:
+                if book_id >= self._next_id:
+                    for gap_id in range(self._next_id, book_id):
+                        self._free.add(gap_id)
+                        heapq.heappush(self._free_heap, gap_id)
+                    self._next_id = book_id + 1
+                else:
+                    self._free.discard(book_id)
@@ -0,0 +1,120 @@
+# 低库存图书跟踪
+# 在内存中维护低库存图书集合（状态为 available 且库存低于阈值），由写操作增量更新，
+# 图书进入或离开低库存状态时向所有订阅者（SSE 连接）推送事件
+
+import queue
+import threading
+import time
+
+# 每个订阅者最多积压的事件数，超过后丢弃该订阅者的最旧事件
+MAX_PENDING_EVENTS = 100
+
+
+class LowStockTracker:
+    """低库存图书集合，接口与内存索引一致（rebuild/upsert/remove/built_at），可复用同一套同步逻辑"""
+
+    def __init__(self, threshold=20):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._books = {}           # 图书ID -> {id, title, author, category, stock}
+        self._subscribers = set()  # 每个订阅者一个事件队列
+        self._next_event_id = 1
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._books)
+
+    def is_low(self, book):
+        return book.get('status') == 'available' and (book.get('stock') or 0) < self.threshold
+
+    def _entry(self, book):
+        return {
+            'id': book['id'],
+            'title': book.get('title'),
+            'author': book.get('author'),
+            'category': book.get('category'),
+            'stock': book.get('stock')
+        }
+
+    def rebuild(self, books):
+        """全量重建；与旧集合对比，把其他进程造成的状态变化也作为事件推送"""
+        books = {book['id']: self._entry(book) for book in books if self.is_low(book)}
+        with self._lock:
+            events = []
+            if self.built_at is not None:
+                for book_id, book in books.items():
+                    old = self._books.get(book_id)
+                    if old is None:
+                        events.append(('low_stock', book))
+                    elif old['stock'] != book['stock']:
+                        events.append(('stock_update', book))
+                for book_id, old in self._books.items():
+                    if book_id not in books:
+                        events.append(('restocked', old))
+            self._books = books
+            self.built_at = time.time()
+            for event_type, book in events:
+                self._publish(event_type, book)
+
+    def upsert(self, book):
+        """图书数据变化后调用，返回产生的事件类型（没有变化时为 None）"""
+        with self._lock:
+            old = self._books.get(book['id'])
+            if self.is_low(book):
+                entry = self._books[book['id']] = self._entry(book)
+                if old is None:
+                    return self._publish('low_stock', entry)
+                if old['stock'] != entry['stock']:
+                    return self._publish('stock_update', entry)
+                return None
+            if old is not None:
+                del self._books[book['id']]
+                return self._publish('restocked', self._entry(book))
+            return None
+
+    def remove(self, book_id):
+        with self._lock:
+            old = self._books.pop(book_id, None)
+            if old is not None:
+                return self._publish('removed', old)
+            return None
+
+    def list_books(self):
+        """按库存升序返回低库存图书"""
+        with self._lock:
+            books = list(self._books.values())
+        books.sort(key=lambda book: (book['stock'], book['id']))
+        return books
+
+    def subscribe(self):
+        """注册订阅者，返回事件队列"""
+        events = queue.Queue(MAX_PENDING_EVENTS)
+        with self._lock:
+            self._subscribers.add(events)
+        return events
+
+    def unsubscribe(self, events):
+        with self._lock:
+            self._subscribers.discard(events)
+
+    def _publish(self, event_type, book):
+        event = {
+            'id': self._next_event_id,
+            'type': event_type,
+            'book': book,
+            'total': len(self._books),
+            'threshold': self.threshold,
+            'time': time.time()
+        }
+        self._next_event_id += 1
+        for events in self._subscribers:
+            try:
+                events.put_nowait(event)
+            except queue.Full:
+                # 客户端处理过慢，丢弃最旧的事件
+                try:
+                    events.get_nowait()
+                except queue.Empty:
+                    pass
+                events.put_nowait(event)
+        return event_type
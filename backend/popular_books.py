@@ -0,0 +1,120 @@
+# 热门图书排行榜
+# 在内存中维护全部在售图书的热度，按分类和全站各保留一份 Top-N 排名；
+# 图书数据、评论聚合或近期销量变化时增量更新，读取排行榜不访问数据库
+
+import heapq
+import math
+import threading
+import time
+
+# 热度 = 评分 + 评论数权重 * log(1 + 评论数) + 销量权重 * log(1 + 近期销量)
+REVIEW_WEIGHT = 0.5
+SALES_WEIGHT = 1.0
+
+# 全站排行榜的键
+ALL_CATEGORIES = None
+
+
+def popularity_score(rating, review_count, recent_sales):
+    return rating + REVIEW_WEIGHT * math.log1p(review_count) + SALES_WEIGHT * math.log1p(recent_sales)
+
+
+def _rank_key(entry):
+    # 热度相同时评论多的在前，再按图书ID保证顺序稳定
+    return (entry['score'], entry['review_count'], -entry['id'])
+
+
+class PopularBooksLeaderboard:
+    """热门图书排行榜，接口与内存索引一致（rebuild/upsert/remove/built_at），可复用同一套同步逻辑"""
+
+    def __init__(self, max_size=50):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._books = {}        # 图书ID -> 排行榜条目
+        self._categories = {}   # 分类名 -> 图书ID集合
+        self._rankings = {}     # 分类名（全站为 None）-> 按热度降序的前 max_size 个条目
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._books)
+
+    def _entry(self, book):
+        rating = float(book.get('rating') or 0)
+        review_count = int(book.get('review_count') or 0)
+        recent_sales = int(book.get('recent_sales') or 0)
+        return {
+            'id': book['id'],
+            'title': book.get('title'),
+            'author': book.get('author'),
+            'category': book.get('category'),
+            'price': book.get('price'),
+            'image': book.get('image'),
+            'rating': rating,
+            'review_count': review_count,
+            'recent_sales': recent_sales,
+            'score': round(popularity_score(rating, review_count, recent_sales), 4)
+        }
+
+    def rebuild(self, books):
+        """全量重建，图书数据需包含 id/title/author/category/price/image/status/rating/review_count/recent_sales"""
+        entries = {book['id']: self._entry(book) for book in books if book.get('status') == 'available'}
+        categories = {}
+        for book_id, entry in entries.items():
+            categories.setdefault(entry['category'], set()).add(book_id)
+        with self._lock:
+            self._books = entries
+            self._categories = categories
+            self._rankings = {}
+            self.built_at = time.time()
+
+    def upsert(self, book):
+        if book.get('status') != 'available':
+            self.remove(book['id'])
+            return
+        entry = self._entry(book)
+        with self._lock:
+            old = self._books.get(entry['id'])
+            if old is not None and old['category'] != entry['category']:
+                self._discard_category(old)
+            self._books[entry['id']] = entry
+            self._categories.setdefault(entry['category'], set()).add(entry['id'])
+            for key in {ALL_CATEGORIES, entry['category'], old['category'] if old else ALL_CATEGORIES}:
+                self._invalidate(key, entry)
+
+    def remove(self, book_id):
+        with self._lock:
+            old = self._books.pop(book_id, None)
+            if old is None:
+                return
+            self._discard_category(old)
+            for key in (ALL_CATEGORIES, old['category']):
+                self._invalidate(key, old)
+
+    def _discard_category(self, entry):
+        book_ids = self._categories.get(entry['category'])
+        if book_ids is not None:
+            book_ids.discard(entry['id'])
+            if not book_ids:
+                del self._categories[entry['category']]
+
+    def _invalidate(self, key, entry):
+        """只有变化的图书在排名中、或新热度能进入排名时，才需要重新计算该排名"""
+        ranking = self._rankings.get(key)
+        if ranking is None:
+            return
+        if (len(ranking) < self.max_size
+                or _rank_key(entry) > _rank_key(ranking[-1])
+                or any(ranked['id'] == entry['id'] for ranked in ranking)):
+            del self._rankings[key]
+
+    def top(self, category=ALL_CATEGORIES, limit=10):
+        """返回热度最高的 limit 本图书（category 为 None 时为全站排行）"""
+        with self._lock:
+            ranking = self._rankings.get(category)
+            if ranking is None:
+                if category is ALL_CATEGORIES:
+                    candidates = self._books.values()
+                else:
+                    candidates = [self._books[book_id] for book_id in self._categories.get(category, ())]
+                ranking = self._rankings[category] = heapq.nlargest(self.max_size, candidates, key=_rank_key)
+        return ranking[:limit]
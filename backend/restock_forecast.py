@@ -0,0 +1,77 @@
+# 补货预测
+# 把每本图书最近若干天的日销量排成 图书数 × 天数 的矩阵，一次计算全部图书的移动平均、指数平滑需求和可售天数
+# 安装 NumPy 时整列向量运算，未安装时逐本计算（结果相同）
+
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def smoothing_weights(days, alpha):
+    """指数平滑 s_t = alpha * x_t + (1 - alpha) * s_{t-1}（s_0 = x_0）展开后各天的权重，最后一天权重最大"""
+    weights = [alpha * (1 - alpha) ** (days - 1 - t) for t in range(days)]
+    weights[0] = (1 - alpha) ** (days - 1)
+    return weights
+
+
+def forecast_demand(book_ids, sales, days, window=14, alpha=0.3):
+    """计算每本图书的日需求
+
+    sales 为 [(图书ID, 距开始日期的天数, 销量)]，天数在 [0, days) 之外的记录忽略；
+    第 days - 1 天应为最近一个完整的日（调用方不传入今天的部分销量，否则会拉低移动平均）；
+    返回 {图书ID: (移动平均, 指数平滑)}，移动平均取最近 window 天
+    """
+    window = max(1, min(window, days))
+    positions = {book_id: i for i, book_id in enumerate(book_ids)}
+    weights = smoothing_weights(days, alpha)
+    if np is not None:
+        units = np.zeros((len(book_ids), days), dtype=np.float64)
+        rows, columns, values = [], [], []
+        for book_id, day, quantity in sales:
+            position = positions.get(book_id)
+            if position is not None and 0 <= day < days:
+                rows.append(position)
+                columns.append(day)
+                values.append(quantity)
+        if rows:
+            np.add.at(units, (np.asarray(rows), np.asarray(columns)), np.asarray(values, dtype=np.float64))
+        moving_average = units[:, days - window:].mean(axis=1)
+        smoothed = units @ np.asarray(weights)
+        return dict(zip(book_ids, zip(moving_average.tolist(), smoothed.tolist())))
+
+    units = [[0.0] * days for _ in book_ids]
+    for book_id, day, quantity in sales:
+        position = positions.get(book_id)
+        if position is not None and 0 <= day < days:
+            units[position][day] += quantity
+    return {
+        book_id: (sum(row[days - window:]) / window, sum(x * w for x, w in zip(row, weights)))
+        for book_id, row in zip(book_ids, units)
+    }
+
+
+def restock_plan(book, moving_average, smoothed, lead_time_days, target_days):
+    """单本图书的补货建议：日需求取移动平均和指数平滑中较大的一个（宁可早补货）
+
+    可售天数 = 库存 / 日需求（没有销量时为 None）；可售天数不超过补货周期时需要补货，
+    建议补货量使补货后的库存覆盖 补货周期 + 目标天数 的需求
+    """
+    stock = book.get('stock') or 0
+    daily_demand = max(moving_average, smoothed)
+    days_of_cover = stock / daily_demand if daily_demand > 0 else None
+    needs_restock = days_of_cover is not None and days_of_cover <= lead_time_days
+    suggested_quantity = 0
+    if needs_restock:
+        suggested_quantity = max(0, math.ceil(daily_demand * (lead_time_days + target_days)) - stock)
+    return {
+        **book,
+        'moving_average': round(moving_average, 3),
+        'smoothed_demand': round(smoothed, 3),
+        'daily_demand': round(daily_demand, 3),
+        'days_of_cover': round(days_of_cover, 1) if days_of_cover is not None else None,
+        'needs_restock': needs_restock,
+        'suggested_quantity': suggested_quantity
+    }
@@ -0,0 +1,238 @@
+# 图书评论API
+# 评论的分页读取、发表和删除，以及由评论增量维护的评分聚合（book_rating_stats）
+# 本模块由 app.py 末尾导入，向 app 注册路由和命令
+
+from sqlalchemy import text
+from data_access import SelectQuery
+from app import (
+    app, db, make_response, parse_page_limit, encode_keyset_cursor, decode_keyset_cursor,
+    schema_object_available, sync_books_to_indexes, rebuild_book_indexes
+)
+
+REVIEWS_PAGE_DEFAULT_LIMIT = 10
+REVIEWS_PAGE_MAX_LIMIT = 50
+REVIEW_COMMENT_MAX_LENGTH = 2000
+REVIEW_STARS = range(1, 6)
+
+REVIEW_FIELDS = {
+    'id': ('r.id', None),
+    'user_id': ('r.user_id', None),
+    'username': ('u.username', None),
+    'rating': ('r.rating', None),
+    'comment': ('r.comment', None),
+    'created_at': ('r.created_at', None)
+}
+REVIEW_FROM = """
+    FROM reviews r
+    LEFT JOIN users u ON r.user_id = u.id
+"""
+
+# 评论列表按 (created_at, id) 倒序游标分页，使用 reviews(book_id, created_at, id) 索引
+BOOK_REVIEWS_FIRST_PAGE = SelectQuery(REVIEW_FIELDS, REVIEW_FROM, """
+    WHERE r.book_id = :book_id
+    ORDER BY r.created_at DESC, r.id DESC LIMIT :limit
+""")
+BOOK_REVIEWS_NEXT_PAGE = SelectQuery(REVIEW_FIELDS, REVIEW_FROM, """
+    WHERE r.book_id = :book_id
+      AND (r.created_at < :cursor_created_at
+           OR (r.created_at = :cursor_created_at AND r.id < :cursor_id))
+    ORDER BY r.created_at DESC, r.id DESC LIMIT :limit
+""")
+
+# 每本图书的评分聚合（book_rating_stats 表）：评论数、评分总和、1-5星数量，由评论写操作在同一事务中增量更新
+RATING_STATS_STATEMENT = text("""
+    SELECT review_count, rating_sum, stars_1, stars_2, stars_3, stars_4, stars_5
+    FROM book_rating_stats
+    WHERE book_id = :book_id
+""")
+RATING_STATS_UPSERT_STATEMENTS = {
+    star: text(f"""
+        INSERT INTO book_rating_stats (book_id, review_count, rating_sum, stars_{star})
+        VALUES (:book_id, :delta, :rating_delta, :delta)
+        ON DUPLICATE KEY UPDATE
+            review_count = review_count + VALUES(review_count),
+            rating_sum = rating_sum + VALUES(rating_sum),
+            stars_{star} = stars_{star} + VALUES(stars_{star})
+    """)
+    for star in REVIEW_STARS
+}
+# books.rating 由聚合得出（没有评论时为0）
+UPDATE_BOOK_RATING_STATEMENT = text("""
+    UPDATE books
+    SET rating = (
+        SELECT CASE WHEN review_count > 0 THEN ROUND(rating_sum / review_count, 2) ELSE 0 END
+        FROM book_rating_stats
+        WHERE book_id = :book_id
+    )
+    WHERE id = :book_id
+""")
+
+def rating_summary_from_row(row):
+    if row is None:
+        return {'count': 0, 'average': 0.0, 'histogram': {str(star): 0 for star in REVIEW_STARS}}
+    count = int(row[0])
+    return {
+        'count': count,
+        'average': round(float(row[1]) / count, 2) if count else 0.0,
+        'histogram': {str(star): int(row[1 + star]) for star in REVIEW_STARS}
+    }
+
+def load_rating_summary(book_id):
+    return rating_summary_from_row(db.session.execute(RATING_STATS_STATEMENT, {'book_id': book_id}).fetchone())
+
+# 在当前事务中调整评分聚合并更新 books.rating，delta 为新增（正数）或删除（负数）的同星级评论数
+def apply_review_to_rating_stats(book_id, rating, delta):
+    db.session.execute(RATING_STATS_UPSERT_STATEMENTS[rating], {
+        'book_id': book_id,
+        'delta': delta,
+        'rating_delta': rating * delta
+    })
+    db.session.execute(UPDATE_BOOK_RATING_STATEMENT, {'book_id': book_id})
+
+# 删除用户前调用：用户的评论会被外键级联删除，先从评分聚合中扣除，返回受影响的图书ID
+# 未创建 book_rating_stats 表时跳过（评分聚合由 rebuild-rating-stats 在建表后按评论表初始化）
+def remove_user_reviews_from_rating_stats(user_id):
+    if not schema_object_available('book_rating_stats'):
+        return set()
+    rows = db.session.execute(text("""
+        SELECT book_id, rating, COUNT(*) FROM reviews
+        WHERE user_id = :user_id
+        GROUP BY book_id, rating
+    """), {'user_id': user_id}).fetchall()
+    for book_id, rating, count in rows:
+        apply_review_to_rating_stats(book_id, rating, -count)
+    return {row[0] for row in rows}
+
+# 按评论表重建全部评分聚合，并重新计算全部图书的评分（没有评论的图书为0；创建 book_rating_stats 表后执行一次）
+def rebuild_rating_stats():
+    db.session.execute(text("DELETE FROM book_rating_stats"))
+    db.session.execute(text(f"""
+        INSERT INTO book_rating_stats (book_id, review_count, rating_sum, {', '.join(f'stars_{star}' for star in REVIEW_STARS)})
+        SELECT book_id, COUNT(*), SUM(rating), {', '.join(f'SUM(rating = {star})' for star in REVIEW_STARS)}
+        FROM reviews
+        GROUP BY book_id
+    """))
+    updated = db.session.execute(text("""
+        UPDATE books b
+        LEFT JOIN book_rating_stats s ON s.book_id = b.id
+        SET b.rating = CASE WHEN s.review_count > 0 THEN ROUND(s.rating_sum / s.review_count, 2) ELSE 0 END
+    """)).rowcount
+    db.session.commit()
+    rebuild_book_indexes()
+    return updated
+
+# 重建评分聚合（命令行：flask --app app rebuild-rating-stats）
+@app.cli.command('rebuild-rating-stats')
+def rebuild_rating_stats_command():
+    """按 reviews 表重建 book_rating_stats 并更新图书评分"""
+    with app.app_context():
+        updated = rebuild_rating_stats()
+        print(f'评分聚合重建完成，更新了{updated}本图书的评分')
+
+# 获取图书评论（游标分页）及评分汇总
+@app.route('/api/books/<int:book_id>/reviews', methods=['GET'])
+def get_book_reviews(book_id):
+    try:
+        from flask import request
+
+        try:
+            limit = parse_page_limit(request.args.get('limit'), REVIEWS_PAGE_DEFAULT_LIMIT, REVIEWS_PAGE_MAX_LIMIT)
+            cursor_str = request.args.get('cursor', '').strip()
+            cursor = decode_keyset_cursor(cursor_str) if cursor_str else None
+        except ValueError as e:
+            return make_response(None, str(e), 400)
+
+        with app.app_context():
+            # 多取一行用于判断是否还有下一页
+            params = {'book_id': book_id, 'limit': limit + 1}
+            if cursor:
+                params['cursor_created_at'] = cursor[0]
+                params['cursor_id'] = cursor[1]
+            page_query = BOOK_REVIEWS_NEXT_PAGE if cursor else BOOK_REVIEWS_FIRST_PAGE
+            reviews = page_query.all(db.session, params)
+            has_more = len(reviews) > limit
+            if has_more:
+                reviews = reviews[:limit]
+
+            return make_response({
+                'reviews': reviews,
+                'rating': load_rating_summary(book_id),
+                'limit': limit,
+                'has_more': has_more,
+                'next_cursor': encode_keyset_cursor(reviews[-1]['created_at'], reviews[-1]['id']) if has_more else None
+            }, '获取评论列表成功')
+    except Exception as e:
+        return make_response(None, f'获取评论列表失败: {str(e)}', 500)
+
+# 发表图书评论
+@app.route('/api/books/<int:book_id>/reviews', methods=['POST'])
+def add_book_review(book_id):
+    try:
+        from flask import request
+        data = request.get_json()
+
+        # 验证必填字段
+        if not data or 'user_id' not in data or 'rating' not in data:
+            return make_response(None, '缺少必填字段', 400)
+
+        rating = data['rating']
+        if isinstance(rating, bool) or not isinstance(rating, int) or rating not in REVIEW_STARS:
+            return make_response(None, '评分必须是1-5的整数', 400)
+        comment = (data.get('comment') or '').strip()
+        if len(comment) > REVIEW_COMMENT_MAX_LENGTH:
+            return make_response(None, f'评论内容不能超过{REVIEW_COMMENT_MAX_LENGTH}个字符', 400)
+
+        with app.app_context():
+            book_check = db.session.execute(text("SELECT id FROM books WHERE id = :book_id"), {'book_id': book_id}).fetchone()
+            if not book_check:
+                return make_response(None, '图书不存在', 404)
+
+            user_check = db.session.execute(text("SELECT id FROM users WHERE id = :user_id"), {'user_id': data['user_id']}).fetchone()
+            if not user_check:
+                return make_response(None, '用户不存在', 404)
+
+            result = db.session.execute(text("""
+                INSERT INTO reviews (user_id, book_id, rating, comment)
+                VALUES (:user_id, :book_id, :rating, :comment)
+            """), {'user_id': data['user_id'], 'book_id': book_id, 'rating': rating, 'comment': comment or None})
+            review_id = result.lastrowid
+
+            apply_review_to_rating_stats(book_id, rating, 1)
+            summary = load_rating_summary(book_id)
+            db.session.commit()
+            # 评分变化后同步目录缓存和搜索索引
+            sync_books_to_indexes([book_id])
+
+            return make_response({'review_id': review_id, 'rating': summary}, '发表评论成功')
+    except Exception as e:
+        db.session.rollback()
+        return make_response(None, f'发表评论失败: {str(e)}', 500)
+
+# 删除评论（传 user_id 时只能删除该用户自己的评论）
+@app.route('/api/reviews/<int:review_id>', methods=['DELETE'])
+def delete_review(review_id):
+    try:
+        from flask import request
+        user_id = request.args.get('user_id', type=int)
+
+        with app.app_context():
+            review = db.session.execute(text("""
+                SELECT book_id, user_id, rating FROM reviews WHERE id = :review_id FOR UPDATE
+            """), {'review_id': review_id}).fetchone()
+
+            if not review:
+                return make_response(None, '评论不存在', 404)
+            if user_id is not None and review[1] != user_id:
+                return make_response(None, '只能删除自己的评论', 403)
+
+            book_id = review[0]
+            db.session.execute(text("DELETE FROM reviews WHERE id = :review_id"), {'review_id': review_id})
+            apply_review_to_rating_stats(book_id, review[2], -1)
+            summary = load_rating_summary(book_id)
+            db.session.commit()
+            sync_books_to_indexes([book_id])
+
+            return make_response({'rating': summary}, '删除评论成功')
+    except Exception as e:
+        db.session.rollback()
+        return make_response(None, f'删除评论失败: {str(e)}', 500)
@@ -0,0 +1,305 @@
+# 图书搜索索引
+# 进程内倒排索引，替代 LIKE '%关键词%' 的全表扫描
+# 分词规则：中文按字符二元组切分（同时保留单字以支持单字查询），拉丁文本按单词切分
+
+import heapq
+import math
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+
+# 字段权重：书名 > 作者 > 分类 > 描述
+FIELD_WEIGHTS = {
+    'title': 4.0,
+    'author': 3.0,
+    'category': 2.0,
+    'description': 1.0
+}
+
+# 拉丁词前缀扩展的最大词数，防止过短的前缀展开成整个词表
+MAX_PREFIX_EXPANSIONS = 50
+
+# 分面统计的价格区间和评分区间：(标签, 下限, 上限)，左闭右开，None 表示不限
+PRICE_BANDS = [
+    ('30元以下', None, 30),
+    ('30-60元', 30, 60),
+    ('60-100元', 60, 100),
+    ('100元以上', 100, None)
+]
+RATING_BANDS = [
+    ('4.5分以上', 4.5, None),
+    ('4-4.5分', 4.0, 4.5),
+    ('3-4分', 3.0, 4.0),
+    ('3分以下', None, 3.0)
+]
+
+# 中日韩文字范围（汉字、扩展A、兼容汉字、假名、韩文）
+_CJK_CHARS = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af'
+_TOKEN_PATTERN = re.compile(f'[{_CJK_CHARS}]+|[a-z0-9]+')
+
+
+def normalize_text(text):
+    """统一全角/半角并转为小写"""
+    if not text:
+        return ''
+    return unicodedata.normalize('NFKC', str(text)).lower()
+
+
+def tokenize(text, for_query=False):
+    """分词：中文输出字符二元组，拉丁文本输出单词
+
+    建索引时中文额外输出单字，这样单字查询（如"史"）也能命中；
+    查询时只输出二元组，多个二元组同时命中即近似于子串匹配。
+    """
+    tokens = []
+    for run in _TOKEN_PATTERN.findall(normalize_text(text)):
+        if run.isascii():
+            tokens.append(run)
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            if not for_query:
+                tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def band_index(value, bands):
+    """返回数值所在区间的下标"""
+    value = value or 0.0
+    for i, (_, lower, upper) in enumerate(bands):
+        if (lower is None or value >= lower) and (upper is None or value < upper):
+            return i
+    return None
+
+
+class FacetCounter:
+    """在一次遍历中统计分类、价格区间、评分区间的命中数量"""
+
+    def __init__(self):
+        self.categories = {}
+        self.price = [0] * len(PRICE_BANDS)
+        self.rating = [0] * len(RATING_BANDS)
+
+    def add_category(self, name, count=1):
+        self.categories[name] = self.categories.get(name, 0) + count
+
+    def add_book(self, book):
+        price_band = band_index(book.get('price'), PRICE_BANDS)
+        if price_band is not None:
+            self.price[price_band] += 1
+        rating_band = band_index(book.get('rating'), RATING_BANDS)
+        if rating_band is not None:
+            self.rating[rating_band] += 1
+
+    def add_band_counts(self, price_counts, rating_counts):
+        """累加按区间预先汇总好的数量（SQL 聚合结果）"""
+        self.price = [a + int(b or 0) for a, b in zip(self.price, price_counts)]
+        self.rating = [a + int(b or 0) for a, b in zip(self.rating, rating_counts)]
+
+    def to_dict(self):
+        return {
+            'category': [
+                {'name': name, 'count': count}
+                for name, count in sorted(self.categories.items(), key=lambda item: (-item[1], item[0] or ''))
+            ],
+            'price': [
+                {'label': label, 'min': lower, 'max': upper, 'count': count}
+                for (label, lower, upper), count in zip(PRICE_BANDS, self.price)
+            ],
+            'rating': [
+                {'label': label, 'min': lower, 'max': upper, 'count': count}
+                for (label, lower, upper), count in zip(RATING_BANDS, self.rating)
+            ]
+        }
+
+
+class BookSearchIndex:
+    """图书倒排索引，支持加权相关度排序、分类过滤和Top-K分页"""
+
+    def __init__(self, field_weights=None):
+        self.field_weights = dict(field_weights or FIELD_WEIGHTS)
+        self._lock = threading.RLock()
+        self._postings = {}        # 词 -> {图书ID: 字段加权词频}
+        self._doc_terms = {}       # 图书ID -> 该图书包含的词集合（删除时使用）
+        self._docs = {}            # 图书ID -> 图书数据（即搜索接口的返回格式）
+        self._category_docs = {}   # 分类名 -> 图书ID集合
+        self._latin_terms = None   # 排序后的拉丁词表，用于前缀匹配（懒构建）
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._docs)
+
+    def rebuild(self, books):
+        """用全量图书数据重建索引"""
+        with self._lock:
+            self._postings = {}
+            self._doc_terms = {}
+            self._docs = {}
+            self._category_docs = {}
+            self._latin_terms = None
+            for book in books:
+                self._add(book)
+            self.built_at = time.time()
+
+    def upsert(self, book):
+        """新增或更新一本图书"""
+        with self._lock:
+            self._remove(book['id'])
+            self._add(book)
+
+    def remove(self, book_id):
+        """从索引中删除一本图书"""
+        with self._lock:
+            self._remove(book_id)
+
+    def get(self, book_id):
+        return self._docs.get(book_id)
+
+    def _add(self, book):
+        book_id = book['id']
+        term_freqs = {}
+        for field, weight in self.field_weights.items():
+            field_counts = {}
+            for token in tokenize(book.get(field)):
+                field_counts[token] = field_counts.get(token, 0) + 1
+            for token, tf in field_counts.items():
+                # 词频做饱和处理，避免长描述中的重复词压过书名
+                term_freqs[token] = term_freqs.get(token, 0.0) + weight * tf / (tf + 1.0)
+
+        for token, score in term_freqs.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                if token.isascii():
+                    self._latin_terms = None
+            postings[book_id] = score
+
+        self._doc_terms[book_id] = set(term_freqs)
+        self._docs[book_id] = book
+        self._category_docs.setdefault(book.get('category'), set()).add(book_id)
+
+    def _remove(self, book_id):
+        book = self._docs.pop(book_id, None)
+        if book is None:
+            return
+        for token in self._doc_terms.pop(book_id, ()):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(book_id, None)
+            if not postings:
+                del self._postings[token]
+                if token.isascii():
+                    self._latin_terms = None
+        category_docs = self._category_docs.get(book.get('category'))
+        if category_docs is not None:
+            category_docs.discard(book_id)
+            if not category_docs:
+                del self._category_docs[book.get('category')]
+
+    def _expand_term(self, token):
+        """返回查询词对应的倒排表列表；拉丁词按前缀扩展（"pyth" 可命中 "python"）"""
+        if not token.isascii():
+            postings = self._postings.get(token)
+            return [postings] if postings else []
+
+        if self._latin_terms is None:
+            self._latin_terms = sorted(t for t in self._postings if t.isascii())
+        terms = self._latin_terms
+        expanded = []
+        i = bisect_left(terms, token)
+        while i < len(terms) and terms[i].startswith(token) and len(expanded) < MAX_PREFIX_EXPANSIONS:
+            expanded.append(self._postings[terms[i]])
+            i += 1
+        return expanded
+
+    def _score_term(self, token):
+        """计算单个查询词命中的图书及其得分（加权词频 × IDF）"""
+        total_docs = len(self._docs) or 1
+        scores = {}
+        for postings in self._expand_term(token):
+            idf = math.log(1.0 + total_docs / len(postings))
+            for book_id, weight in postings.items():
+                scores[book_id] = scores.get(book_id, 0.0) + weight * idf
+        return scores
+
+    def match(self, query='', category=None):
+        """返回命中的 {图书ID: 相关度得分}，所有查询词必须同时命中"""
+        with self._lock:
+            allowed = None
+            if category and category != '全部':
+                allowed = self._category_docs.get(category, set())
+
+            tokens = list(dict.fromkeys(tokenize(query, for_query=True)))
+            if not tokens:
+                if query:
+                    # 查询词只包含标点等无法分词的字符
+                    return {}
+                doc_ids = allowed if allowed is not None else self._docs.keys()
+                return dict.fromkeys(doc_ids, 0.0)
+
+            # 从命中最少的词开始求交集
+            term_scores = sorted((self._score_term(t) for t in tokens), key=len)
+            scores = term_scores[0]
+            if allowed is not None:
+                scores = {d: s for d, s in scores.items() if d in allowed}
+            for other in term_scores[1:]:
+                if not scores:
+                    break
+                scores = {d: s + other[d] for d, s in scores.items() if d in other}
+            return scores
+
+    def search(self, query='', category=None, limit=None, offset=0, facet_counter=None):
+        """搜索图书，返回 (命中总数, 当前页图书列表)
+
+        排序规则：相关度降序，其次评分降序、书名升序（与原SQL排序一致）
+        传入 facet_counter 时在同一次遍历中统计分面
+        """
+        with self._lock:
+            if facet_counter is None:
+                scores = self.match(query, category)
+            else:
+                scores = self._match_with_facets(query, category, facet_counter)
+            return len(scores), self._rank(scores, limit, offset)
+
+    def _match_with_facets(self, query, category, counter):
+        """匹配图书并统计分面
+
+        分类分面统计的是不加分类过滤时各分类的命中数，便于前端切换分类；
+        价格、评分分面统计的是当前分类过滤后的命中数。
+        """
+        if not query:
+            # 没有关键词时分类分面直接使用预先维护的分类图书集合
+            for name, book_ids in self._category_docs.items():
+                counter.add_category(name, len(book_ids))
+            scores = self.match('', category)
+            for book_id in scores:
+                counter.add_book(self._docs[book_id])
+            return scores
+
+        filtered = bool(category and category != '全部')
+        scores = {}
+        for book_id, score in self.match(query).items():
+            book = self._docs[book_id]
+            counter.add_category(book.get('category'))
+            if not filtered or book.get('category') == category:
+                scores[book_id] = score
+                counter.add_book(book)
+        return scores
+
+    def _rank(self, scores, limit, offset):
+        """排序并返回当前页图书；指定 limit 时只做 Top-K 选择"""
+        docs = self._docs
+
+        def sort_key(book_id):
+            book = docs[book_id]
+            return (-scores[book_id], -(book.get('rating') or 0.0), book.get('title') or '')
+
+        if limit is None:
+            ranked = sorted(scores, key=sort_key)[offset:]
+        else:
+            ranked = heapq.nsmallest(offset + limit, scores, key=sort_key)[offset:]
+        return [docs[book_id] for book_id in ranked]
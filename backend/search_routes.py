@@ -0,0 +1,284 @@
+# 图书搜索API
+# 搜索（内存倒排索引、MySQL ngram 全文索引或 LIKE 查询）和搜索建议接口
+# 索引的构建和随写操作的增量同步仍在 app.py 中；本模块由 app.py 末尾导入，向 app 注册路由和命令
+
+import os
+import time
+from sqlalchemy import text, bindparam
+from search_index import FacetCounter, PRICE_BANDS, RATING_BANDS
+from app import (
+    app, db, make_response, parse_page_limit, parse_fields_param, project_fields,
+    BOOK_INDEX, BOOK_INDEX_FIELDS, BOOK_INDEX_FROM, ensure_search_index, ensure_suggest_index
+)
+
+# 搜索后端：index（进程内倒排索引）、fulltext（MySQL ngram 全文索引）或 like（原 LIKE 模糊查询）
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'index')
+SEARCH_MAX_LIMIT = int(os.getenv('SEARCH_MAX_LIMIT', '100'))
+
+# 区间条件的SQL表达式（左闭右开，None表示不限）
+def band_sql_condition(column, lower, upper):
+    conditions = []
+    if lower is not None:
+        conditions.append(f"{column} >= {lower}")
+    if upper is not None:
+        conditions.append(f"{column} < {upper}")
+    return ' AND '.join(conditions) or '1=1'
+
+# SQL搜索后端的分面统计：一次 GROUP BY 同时得到各分类数量及各价格、评分区间数量
+def collect_sql_search_facets(condition, params, expanding_params, category, facet_counter):
+    band_columns = [
+        f"SUM(CASE WHEN {band_sql_condition('b.price', lower, upper)} THEN 1 ELSE 0 END)"
+        for _, lower, upper in PRICE_BANDS
+    ] + [
+        f"SUM(CASE WHEN {band_sql_condition('COALESCE(b.rating, 0)', lower, upper)} THEN 1 ELSE 0 END)"
+        for _, lower, upper in RATING_BANDS
+    ]
+    statement = text(f"""
+        SELECT c.name, COUNT(*), {', '.join(band_columns)}
+        {BOOK_INDEX_FROM}
+        WHERE {condition}
+        GROUP BY c.name
+    """)
+    if expanding_params:
+        statement = statement.bindparams(*[bindparam(name, expanding=True) for name in expanding_params])
+
+    filtered = bool(category and category != '全部')
+    price_band_count = len(PRICE_BANDS)
+    for row in db.session.execute(statement, params):
+        facet_counter.add_category(row[0], int(row[1]))
+        # 价格、评分分面只统计当前分类过滤后的命中
+        if not filtered or row[0] == category:
+            facet_counter.add_band_counts(row[2:2 + price_band_count], row[2 + price_band_count:])
+
+# 原 LIKE 模糊搜索（SEARCH_BACKEND=like 时使用，也是全文索引不可用时的回退路径）
+def search_books_with_like(query, category, limit=None, offset=0, facet_counter=None, fields=None):
+    # 构建基础查询
+    condition = "1=1"
+    params = {}
+
+    # 如果有搜索关键词,进行多字段模糊搜索
+    if query:
+        condition = """(
+                b.title LIKE :query
+                OR b.author LIKE :query
+                OR b.description LIKE :query
+                OR c.name LIKE :query
+            )"""
+        params['query'] = f'%{query}%'
+
+    if facet_counter is not None:
+        collect_sql_search_facets(condition, params, [], category, facet_counter)
+
+    row_to_dict = BOOK_INDEX.mapper(fields)
+    sql_query = f"SELECT {BOOK_INDEX.columns(fields)}{BOOK_INDEX_FROM} WHERE " + condition
+
+    # 如果指定了分类且不是"全部"
+    if category and category != '全部':
+        sql_query += " AND c.name = :category"
+        params['category'] = category
+
+    # 按评分和标题排序
+    sql_query += " ORDER BY b.rating DESC, b.title ASC"
+
+    result = db.session.execute(text(sql_query), params)
+    books = [row_to_dict(row) for row in result]
+    return len(books), (books[offset:offset + limit] if limit else books[offset:])
+
+# 全文索引配置
+FULLTEXT_INDEX_NAME = 'ft_books_text'
+# ngram 分词长度，需与 MySQL 的 ngram_token_size 一致（默认2），短于该长度的关键词无法命中全文索引
+NGRAM_TOKEN_SIZE = int(os.getenv('NGRAM_TOKEN_SIZE', '2'))
+# 全文索引是否存在的检查结果缓存时间（秒）
+FULLTEXT_CHECK_TTL = 300
+# 布尔模式下有特殊含义的字符
+FULLTEXT_OPERATOR_CHARS = '+-><()~*"@'
+
+_fulltext_index_state = {'available': None, 'checked_at': 0.0}
+
+# 检查 books 表上的全文索引是否存在（结果缓存 FULLTEXT_CHECK_TTL 秒）
+def fulltext_index_available():
+    if _fulltext_index_state['available'] is None or time.time() - _fulltext_index_state['checked_at'] > FULLTEXT_CHECK_TTL:
+        exists = db.session.execute(text("""
+            SELECT COUNT(*) FROM information_schema.STATISTICS
+            WHERE table_schema = DATABASE() AND table_name = 'books' AND index_name = :index_name
+        """), {'index_name': FULLTEXT_INDEX_NAME}).scalar()
+        _fulltext_index_state['available'] = bool(exists)
+        _fulltext_index_state['checked_at'] = time.time()
+    return _fulltext_index_state['available']
+
+# 将用户输入转换为布尔模式查询：每个词作为必须命中的短语，返回None表示无法使用全文索引
+def build_fulltext_query(query):
+    terms = []
+    for word in query.split():
+        word = ''.join(ch for ch in word if ch not in FULLTEXT_OPERATOR_CHARS)
+        if not word:
+            continue
+        if len(word) < NGRAM_TOKEN_SIZE:
+            return None
+        terms.append(f'+"{word}"')
+    return ' '.join(terms) if terms else None
+
+# MySQL 全文索引搜索（SEARCH_BACKEND=fulltext 时使用），返回None表示需要回退到 LIKE 查询
+def search_books_with_fulltext(query, category, limit=None, offset=0, facet_counter=None, fields=None):
+    if not query or not fulltext_index_available():
+        return None
+    boolean_query = build_fulltext_query(query)
+    if boolean_query is None:
+        return None
+
+    match_expr = "MATCH(b.title, b.author, b.description) AGAINST (:ft_query IN BOOLEAN MODE)"
+    condition = f"({match_expr}"
+    params = {'ft_query': boolean_query}
+    expanding_params = []
+
+    # 全文索引不包含分类名，关键词命中分类名时把该分类的图书一并返回（与 LIKE 查询结果保持一致）
+    matched_category_ids = [row[0] for row in db.session.execute(
+        text("SELECT id FROM categories WHERE name LIKE :query"), {'query': f'%{query}%'}
+    )]
+    if matched_category_ids:
+        condition += " OR b.category_id IN :matched_category_ids"
+        params['matched_category_ids'] = matched_category_ids
+        expanding_params.append('matched_category_ids')
+    condition += ")"
+
+    where_clause = f" WHERE {condition}"
+    # 如果指定了分类且不是"全部"
+    if category and category != '全部':
+        where_clause += " AND c.name = :category"
+        params['category'] = category
+
+    row_to_dict = BOOK_INDEX.mapper(fields)
+    sql_query = (f"SELECT {BOOK_INDEX.columns(fields)}, {match_expr} AS relevance{BOOK_INDEX_FROM}"
+                 + where_clause + " ORDER BY relevance DESC, b.rating DESC, b.title ASC")
+    if limit:
+        sql_query += " LIMIT :limit OFFSET :offset"
+        params['limit'] = limit
+        params['offset'] = offset
+
+    statement = text(sql_query)
+    count_statement = text(f"SELECT COUNT(*){BOOK_INDEX_FROM}{where_clause}")
+    if expanding_params:
+        statement = statement.bindparams(bindparam('matched_category_ids', expanding=True))
+        count_statement = count_statement.bindparams(bindparam('matched_category_ids', expanding=True))
+
+    try:
+        books = [row_to_dict(row) for row in db.session.execute(statement, params)]
+        if limit:
+            total = db.session.execute(count_statement, params).scalar()
+        else:
+            total = len(books)
+            books = books[offset:]
+        if facet_counter is not None:
+            collect_sql_search_facets(condition, params, expanding_params, category, facet_counter)
+    except Exception as e:
+        # 全文索引被删除等情况（MySQL错误1191），回退到 LIKE 查询并在下次检查前不再尝试
+        db.session.rollback()
+        _fulltext_index_state['available'] = False
+        _fulltext_index_state['checked_at'] = time.time()
+        app.logger.warning(f'全文索引搜索失败，回退到LIKE查询: {str(e)}')
+        return None
+    return total, books
+
+# 创建全文索引（命令行：flask --app app create-fulltext-index）
+@app.cli.command('create-fulltext-index')
+def create_fulltext_index_command():
+    """在 books(title, author, description) 上创建 ngram 全文索引"""
+    with app.app_context():
+        if fulltext_index_available():
+            print(f'全文索引 {FULLTEXT_INDEX_NAME} 已存在')
+            return
+        print(f'正在创建全文索引 {FULLTEXT_INDEX_NAME}，图书较多时可能需要几分钟...')
+        db.session.execute(text(
+            f"ALTER TABLE books ADD FULLTEXT INDEX {FULLTEXT_INDEX_NAME} (title, author, description) WITH PARSER ngram"
+        ))
+        db.session.commit()
+        _fulltext_index_state['available'] = True
+        _fulltext_index_state['checked_at'] = time.time()
+        print('全文索引创建成功')
+
+# 搜索图书API
+# 支持 limit/offset 分页，不传 limit 时返回全部命中结果
+# facets=1 时在同一次查询中返回分类、价格区间、评分区间的分面统计
+# fields 参数只返回指定字段（SQL搜索后端同时缩减 SELECT 的列）
+@app.route('/api/books/search', methods=['GET'])
+def search_books():
+    try:
+        from flask import request
+
+        # 获取搜索参数
+        query = request.args.get('q', '').strip()
+        category = request.args.get('category', '').strip()
+
+        if not query and not category:
+            return make_response(None, '请提供搜索关键词或分类', 400)
+
+        try:
+            limit = None
+            if 'limit' in request.args:
+                limit = parse_page_limit(request.args.get('limit'), SEARCH_MAX_LIMIT, SEARCH_MAX_LIMIT)
+            offset = max(0, int(request.args.get('offset', 0)))
+        except ValueError:
+            return make_response(None, '分页参数必须为整数', 400)
+
+        try:
+            fields = parse_fields_param(request.args.get('fields'), list(BOOK_INDEX_FIELDS))
+        except ValueError as e:
+            return make_response(None, str(e), 400)
+
+        with_facets = request.args.get('facets', '').lower() in ('1', 'true', 'yes')
+        facet_counter = FacetCounter() if with_facets else None
+
+        with app.app_context():
+            if SEARCH_BACKEND == 'fulltext':
+                # 全文索引不存在或关键词过短时回退到 LIKE 查询
+                search_result = search_books_with_fulltext(query, category, limit, offset, facet_counter, fields)
+                if search_result is None:
+                    facet_counter = FacetCounter() if with_facets else None
+                    search_result = search_books_with_like(query, category, limit, offset, facet_counter, fields)
+                total, books = search_result
+            elif SEARCH_BACKEND == 'like':
+                total, books = search_books_with_like(query, category, limit, offset, facet_counter, fields)
+            else:
+                # 倒排索引搜索，分类过滤和分面统计都在索引内完成
+                total, books = ensure_search_index().search(query, category, limit, offset, facet_counter)
+                if fields is not None:
+                    books = project_fields(books, fields)
+
+            response_data = {
+                'books': books,
+                'total': total,
+                'query': query,
+                'category': category,
+                'limit': limit,
+                'offset': offset
+            }
+            if with_facets:
+                response_data['facets'] = facet_counter.to_dict()
+
+            return make_response(response_data, f'搜索成功，找到{total}本图书')
+    except Exception as e:
+        return make_response(None, f'搜索图书失败: {str(e)}', 500)
+
+SUGGEST_DEFAULT_LIMIT = 8
+SUGGEST_MAX_LIMIT = 20
+
+# 搜索建议API（输入联想），从内存前缀索引返回书名、作者、分类建议，不访问数据库
+@app.route('/api/books/suggest', methods=['GET'])
+def suggest_books():
+    try:
+        from flask import request
+
+        query = request.args.get('q', '').strip()
+        try:
+            limit = parse_page_limit(request.args.get('limit'), SUGGEST_DEFAULT_LIMIT, SUGGEST_MAX_LIMIT)
+        except ValueError as e:
+            return make_response(None, str(e), 400)
+
+        if not query:
+            return make_response({'suggestions': [], 'query': query}, '获取搜索建议成功')
+
+        with app.app_context():
+            suggestions = ensure_suggest_index().suggest(query, limit)
+            return make_response({'suggestions': suggestions, 'query': query}, '获取搜索建议成功')
+    except Exception as e:
+        return make_response(None, f'获取搜索建议失败: {str(e)}', 500)
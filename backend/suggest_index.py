@@ -0,0 +1,162 @@
+# 搜索建议索引
+# 基于排序数组 + 二分查找的前缀索引，覆盖书名、作者和分类名，按热度返回 Top-N 建议
+
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+from search_index import normalize_text
+
+# 单个条目最多登记的词首后缀数（如 "Eric Matthes" 也可以用 "matthes" 匹配）
+MAX_SUFFIX_KEYS = 5
+# 前缀查询结果缓存数量
+DEFAULT_CACHE_SIZE = 4096
+
+_WORD_PATTERN = re.compile(r'[^\W_]+')
+
+# 建议类型
+SUGGEST_TYPES = ('title', 'author', 'category')
+
+
+def match_keys(text):
+    """条目的匹配键：完整文本，以及每个词首开始的后缀"""
+    normalized = normalize_text(text).strip()
+    if not normalized:
+        return []
+    keys = [normalized]
+    for match in _WORD_PATTERN.finditer(normalized):
+        if match.start() == 0:
+            continue
+        keys.append(normalized[match.start():])
+        if len(keys) > MAX_SUFFIX_KEYS:
+            break
+    return keys
+
+
+class SuggestIndex:
+    """前缀建议索引，支持按图书增量更新"""
+
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE):
+        self._lock = threading.RLock()
+        self._keys = []            # 排序的 (匹配键, 条目ID)
+        self._entries = {}         # 条目ID (类型, 文本) -> {图书ID: 热度}
+        self._entry_weights = {}   # 条目ID -> 热度合计（同一作者/分类的所有图书热度之和）
+        self._book_entries = {}    # 图书ID -> 该图书贡献的条目ID列表
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def rebuild(self, books):
+        """用全量图书数据重建索引，图书数据需包含 id/title/author/category/popularity"""
+        with self._lock:
+            self._keys = []
+            self._entries = {}
+            self._entry_weights = {}
+            self._book_entries = {}
+            self._cache.clear()
+            for book in books:
+                self._add(book, sort_keys=False)
+            self._keys.sort()
+            self.built_at = time.time()
+
+    def upsert(self, book):
+        with self._lock:
+            self._remove(book['id'])
+            self._add(book)
+
+    def remove(self, book_id):
+        with self._lock:
+            self._remove(book_id)
+
+    def _book_entry_ids(self, book):
+        entry_ids = []
+        for entry_type in SUGGEST_TYPES:
+            value = book.get(entry_type)
+            if value and str(value).strip():
+                entry_ids.append((entry_type, str(value).strip()))
+        return entry_ids
+
+    def _add(self, book, sort_keys=True):
+        book_id = book['id']
+        popularity = book.get('popularity') or 0.0
+        entry_ids = self._book_entry_ids(book)
+        for entry_id in entry_ids:
+            books = self._entries.get(entry_id)
+            if books is None:
+                books = self._entries[entry_id] = {}
+                for key in match_keys(entry_id[1]):
+                    if sort_keys:
+                        insort(self._keys, (key, entry_id))
+                    else:
+                        self._keys.append((key, entry_id))
+            books[book_id] = popularity
+            self._entry_weights[entry_id] = self._entry_weights.get(entry_id, 0.0) + popularity
+            self._invalidate(entry_id[1])
+        self._book_entries[book_id] = entry_ids
+
+    def _remove(self, book_id):
+        for entry_id in self._book_entries.pop(book_id, ()):
+            books = self._entries.get(entry_id)
+            if books is None:
+                continue
+            popularity = books.pop(book_id, 0.0)
+            self._entry_weights[entry_id] -= popularity
+            if not books:
+                del self._entries[entry_id]
+                del self._entry_weights[entry_id]
+                for key in match_keys(entry_id[1]):
+                    i = bisect_left(self._keys, (key, entry_id))
+                    if i < len(self._keys) and self._keys[i] == (key, entry_id):
+                        del self._keys[i]
+            self._invalidate(entry_id[1])
+
+    def _invalidate(self, text):
+        """清除受影响前缀的缓存结果"""
+        if not self._cache:
+            return
+        for key in match_keys(text):
+            for i in range(1, len(key) + 1):
+                self._cache.pop(key[:i], None)
+
+    def suggest(self, prefix, limit=10):
+        """返回前缀匹配的建议，按热度降序"""
+        prefix = normalize_text(prefix).strip()
+        if not prefix:
+            return []
+        with self._lock:
+            cached = self._cache.get(prefix)
+            if cached is not None:
+                cached_limit, cached_results = cached
+                # 缓存的条数足够，或者缓存时已经是全部匹配结果
+                if limit <= cached_limit or len(cached_results) < cached_limit:
+                    self._cache.move_to_end(prefix)
+                    return cached_results[:limit]
+
+            matched = set()
+            i = bisect_left(self._keys, (prefix,))
+            while i < len(self._keys) and self._keys[i][0].startswith(prefix):
+                matched.add(self._keys[i][1])
+                i += 1
+
+            weights = self._entry_weights
+            top = heapq.nsmallest(limit, matched, key=lambda e: (-weights[e], e[1]))
+            results = []
+            for entry_id in top:
+                entry_type, text = entry_id
+                books = self._entries[entry_id]
+                item = {'text': text, 'type': entry_type, 'weight': round(weights[entry_id], 4)}
+                if entry_type == 'title':
+                    # 书名建议附带热度最高的图书ID，前端可直接跳转详情页
+                    item['book_id'] = max(books, key=books.get)
+                results.append(item)
+
+            self._cache[prefix] = (limit, results)
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+            return results
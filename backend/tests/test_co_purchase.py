@@ -0,0 +1,78 @@
+# 共同购买推荐：共现计数、相似度和 NumPy / 纯Python 两种实现的一致性
+
+import math
+
+import pytest
+
+import co_purchase
+from co_purchase import CoPurchaseCounter
+
+BASKETS = [
+    [1, 2, 3],
+    [1, 2],
+    [2, 3, 3],
+    [1, 2, 4],
+    [4, 5],
+    [4, 5, 1],
+    [6],
+    [],
+]
+
+
+def count(baskets, chunk_size=co_purchase.DEFAULT_CHUNK_SIZE):
+    counter = CoPurchaseCounter(chunk_size)
+    for basket in baskets:
+        counter.add_basket(basket)
+    return counter
+
+
+def test_counts_orders_and_pairs():
+    counter = count(BASKETS)
+    # 空订单不计入
+    assert counter.order_count == 7
+    assert len(counter) == 6
+    rows = counter.neighbours(top_k=10, min_support=1)
+    pairs = {(book_id, neighbour_id): co_count for book_id, neighbour_id, _, co_count, _ in rows}
+    assert pairs[(1, 2)] == pairs[(2, 1)] == 3
+    # 同一订单中重复的图书只算一次
+    assert pairs[(2, 3)] == 2
+    assert 6 not in {book_id for book_id, *_ in rows}
+
+
+def test_cosine_and_lift_scores():
+    counter = count(BASKETS)
+    rows = {(row[0], row[1]): row[4] for row in counter.neighbours(min_support=1)}
+    # 图书1在4个订单中，图书2在4个订单中，共现3次
+    assert rows[(1, 2)] == pytest.approx(3 / math.sqrt(4 * 4))
+    lift = {(row[0], row[1]): row[4] for row in counter.neighbours(min_support=1, score='lift')}
+    assert lift[(1, 2)] == pytest.approx(3 * 7 / (4 * 4))
+    with pytest.raises(ValueError):
+        counter.neighbours(score='jaccard')
+
+
+def test_min_support_and_top_k_ranking():
+    rows = count(BASKETS).neighbours(top_k=1, min_support=2)
+    assert [(row[0], row[1], row[2]) for row in rows] == [(1, 2, 1), (2, 1, 1), (3, 2, 1), (4, 5, 1), (5, 4, 1)]
+
+
+def test_oversized_basket_counts_orders_but_not_pairs(monkeypatch):
+    monkeypatch.setattr(co_purchase, 'MAX_BASKET_SIZE', 2)
+    counter = count([[1, 2, 3], [1, 2]])
+    assert counter.order_count == 2
+    assert [(row[0], row[1], row[3]) for row in counter.neighbours(min_support=1)] == [(1, 2, 1), (2, 1, 1)]
+
+
+def test_numpy_and_python_paths_match(monkeypatch):
+    pytest.importorskip('numpy')
+    baskets = [[(order * 7 + i * 3) % 23 + 1 for i in range(order % 5 + 1)] for order in range(300)]
+    for score in co_purchase.SCORE_METHODS:
+        # 小批量合并，覆盖多次合并缓冲区的路径
+        expected = count(baskets, chunk_size=50).neighbours(top_k=5, min_support=2, score=score)
+        assert count(baskets).backend == 'numpy'
+        with monkeypatch.context() as patched:
+            patched.setattr(co_purchase, 'np', None)
+            python_counter = count(baskets, chunk_size=50)
+            assert python_counter.backend == 'python'
+            actual = python_counter.neighbours(top_k=5, min_support=2, score=score)
+        assert [row[:4] for row in actual] == [row[:4] for row in expected]
+        assert [row[4] for row in actual] == pytest.approx([row[4] for row in expected])
@@ -0,0 +1,77 @@
+# 内容相似图书：TF-IDF 向量、批量相似度和增量合并
+
+import math
+
+import pytest
+
+import content_similarity
+from content_similarity import (build_vectors, document_terms, merge_neighbour, score_against, term_vector,
+                                top_k_neighbours)
+
+BOOKS = [
+    {'id': 1, 'title': 'Python编程', 'author': '张三', 'category': '计算机', 'description': '入门教程'},
+    {'id': 2, 'title': 'Python数据分析', 'author': '李四', 'category': '计算机', 'description': '数据分析入门'},
+    {'id': 3, 'title': '红楼梦', 'author': '曹雪芹', 'category': '文学', 'description': '古典小说'},
+    {'id': 4, 'title': '红楼梦评注', 'author': '脂砚斋', 'category': '文学', 'description': '古典小说评注'},
+    {'id': 5, 'title': '三国演义', 'author': '罗贯中', 'category': '文学', 'description': '历史小说'},
+    {'id': 7, 'title': 'Java编程', 'author': '王五', 'category': '计算机', 'description': '进阶教程'},
+]
+
+
+def test_document_terms_weighted_by_field():
+    terms = document_terms({'title': 'Python', 'author': 'Python', 'category': None, 'description': ''})
+    assert terms == {'python': 7.0}
+
+
+def test_term_vector_is_normalized_and_skips_frequent_terms():
+    vector = term_vector({'a': 1, 'b': math.e, 'c': 2}, {'a': 1.0, 'b': 1.0, 'c': None}, 2.0)
+    assert set(vector) == {'a', 'b'}
+    assert math.sqrt(sum(weight * weight for weight in vector.values())) == pytest.approx(1.0)
+    assert vector['b'] == pytest.approx(2 * vector['a'])
+    assert term_vector({}, {}, 1.0) == {}
+
+
+def test_build_vectors_marks_frequent_terms():
+    book_ids, vectors, idf = build_vectors(BOOKS, max_df_ratio=0.5)
+    assert book_ids == [1, 2, 3, 4, 5, 7]
+    # "文学"出现在3本图书中，不超过一半，保留；只出现一次的词 idf 最大
+    assert idf['文学'] is not None
+    assert idf['曹雪'] > idf['文学']
+    _, _, strict_idf = build_vectors(BOOKS, max_df_ratio=0.3)
+    assert strict_idf['文学'] is None
+
+
+def test_top_k_neighbours_finds_similar_books():
+    book_ids, vectors, _ = build_vectors(BOOKS)
+    rows = top_k_neighbours(book_ids, vectors, top_k=1)
+    best = {book_id: neighbour_id for book_id, neighbour_id, _, _ in rows}
+    assert best[1] == 7
+    assert best[2] == 1
+    assert best[3] == 4
+    assert best[4] == 3
+    assert all(position == 1 for _, _, position, _ in rows)
+
+
+def test_numpy_and_python_paths_match(monkeypatch):
+    pytest.importorskip('numpy')
+    books = BOOKS + [
+        {'id': 100 + i, 'title': f'小说{i % 7}', 'author': f'作者{i % 5}', 'category': '文学',
+         'description': f'故事{i % 3} 历史'}
+        for i in range(40)
+    ]
+    book_ids, vectors, _ = build_vectors(books)
+    # 较小的块，覆盖分块和分批累加的路径
+    expected = top_k_neighbours(book_ids, vectors, top_k=5, block_elements=64)
+    monkeypatch.setattr(content_similarity, 'np', None)
+    actual = top_k_neighbours(book_ids, vectors, top_k=5)
+    assert [row[:3] for row in actual] == [row[:3] for row in expected]
+    assert [row[3] for row in actual] == pytest.approx([row[3] for row in expected])
+
+
+def test_score_against_and_merge_neighbour():
+    scores = score_against({'a': 0.6, 'b': 0.8}, [(2, 'a', 0.5), (2, 'b', 0.5), (3, 'c', 1.0), (4, 'b', 1.0)])
+    assert scores == {2: pytest.approx(0.7), 4: pytest.approx(0.8)}
+    neighbours = [(5, 0.9), (6, 0.4)]
+    assert merge_neighbour(neighbours, 7, 0.5, 2) == [(5, 0.9), (7, 0.5)]
+    # 得分为0时从列表中移除
+    assert merge_neighbour(neighbours, 5, 0.0, 2) == [(6, 0.4)]
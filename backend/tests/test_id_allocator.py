@@ -0,0 +1,54 @@
+# 图书ID分配器：最小空缺ID、归还和登记外部写入的ID
+
+from id_allocator import IdAllocator
+
+
+def test_allocates_gaps_in_ascending_order_then_next_id():
+    allocator = IdAllocator()
+    allocator.rebuild([1, 4, 5, 8])
+    assert len(allocator) == 4
+    assert [allocator.allocate() for _ in range(6)] == [2, 3, 6, 7, 9, 10]
+
+
+def test_empty_table_starts_at_one():
+    allocator = IdAllocator()
+    allocator.rebuild([])
+    assert allocator.allocate() == 1
+    assert allocator.allocate() == 2
+
+
+def test_released_id_is_reused_first():
+    allocator = IdAllocator()
+    allocator.rebuild([1, 2, 3, 4])
+    allocator.release(2)
+    allocator.release(2)
+    assert allocator.allocate() == 2
+    assert allocator.allocate() == 5
+
+
+def test_releasing_trailing_id_shrinks_next_id():
+    allocator = IdAllocator()
+    allocator.rebuild([1, 3, 4])
+    allocator.release(4)
+    allocator.release(3)
+    # 末尾归还后，紧邻末尾的空缺 2 也一并收回
+    assert len(allocator) == 0
+    assert allocator.allocate() == 2
+    assert allocator.allocate() == 3
+
+
+def test_release_ignores_unknown_ids():
+    allocator = IdAllocator()
+    allocator.rebuild([1, 2])
+    allocator.release(0)
+    allocator.release(10)
+    assert len(allocator) == 0
+    assert allocator.allocate() == 3
+
+
+def test_mark_used_records_gaps_and_consumes_free_ids():
+    allocator = IdAllocator()
+    allocator.rebuild([1, 2, 4])
+    allocator.mark_used([3, 7])
+    assert len(allocator) == 2
+    assert [allocator.allocate() for _ in range(3)] == [5, 6, 8]
@@ -0,0 +1,61 @@
+# 补货预测：移动平均、指数平滑和补货建议
+
+import pytest
+
+import restock_forecast
+from restock_forecast import forecast_demand, restock_plan, smoothing_weights
+
+SALES = [(1, 0, 2), (1, 5, 3), (2, 89, 4), (3, 88, 1), (3, 89, 2), (3, 89, 1), (9, 10, 5), (2, 90, 7)]
+
+
+def test_smoothing_weights_sum_to_one_and_favour_recent_days():
+    weights = smoothing_weights(10, 0.3)
+    assert sum(weights) == pytest.approx(1.0)
+    assert weights[-1] == pytest.approx(0.3)
+    assert weights[-1] > weights[-2] > weights[1]
+
+
+def test_moving_average_uses_last_window_days():
+    demand = forecast_demand([1, 2, 3], SALES, 90, window=14, alpha=0.3)
+    # 图书1的销量都在窗口之外
+    assert demand[1][0] == 0.0
+    # 第90天（超出范围）和未知图书9被忽略
+    assert demand[2][0] == pytest.approx(4 / 14)
+    assert demand[3][0] == pytest.approx(4 / 14)
+    assert demand[3][1] == pytest.approx(0.3 * 3 + 0.3 * 0.7 * 1)
+
+
+def test_window_is_clamped_to_history():
+    demand = forecast_demand([1], [(1, 0, 3), (1, 1, 1)], 2, window=14)
+    assert demand[1][0] == pytest.approx(2.0)
+
+
+def test_numpy_and_python_paths_match(monkeypatch):
+    pytest.importorskip('numpy')
+    expected = forecast_demand([1, 2, 3, 4], SALES, 90, window=7, alpha=0.2)
+    monkeypatch.setattr(restock_forecast, 'np', None)
+    actual = forecast_demand([1, 2, 3, 4], SALES, 90, window=7, alpha=0.2)
+    assert actual.keys() == expected.keys()
+    for book_id in expected:
+        assert actual[book_id] == pytest.approx(expected[book_id], abs=1e-12)
+
+
+def test_restock_plan_suggests_quantity_covering_lead_time_and_target():
+    plan = restock_plan({'id': 1, 'stock': 10}, 2.0, 2.5, lead_time_days=7, target_days=30)
+    assert plan['daily_demand'] == 2.5
+    assert plan['days_of_cover'] == 4.0
+    assert plan['needs_restock'] is True
+    assert plan['suggested_quantity'] == 83
+
+
+def test_restock_plan_without_sales():
+    plan = restock_plan({'id': 1, 'stock': 0}, 0.0, 0.0, lead_time_days=7, target_days=30)
+    assert plan['days_of_cover'] is None
+    assert plan['needs_restock'] is False
+    assert plan['suggested_quantity'] == 0
+
+
+def test_restock_plan_enough_stock():
+    plan = restock_plan({'id': 1, 'stock': 100}, 1.0, 1.0, lead_time_days=7, target_days=30)
+    assert plan['days_of_cover'] == 100.0
+    assert plan['needs_restock'] is False
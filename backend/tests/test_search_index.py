@@ -0,0 +1,103 @@
+# 搜索索引：分词规则和相关度排序
+
+from search_index import BookSearchIndex, FacetCounter, tokenize
+
+
+def make_book(book_id, title, author='', category='文学', description='', rating=0.0, price=50.0):
+    return {
+        'id': book_id, 'title': title, 'author': author, 'category': category,
+        'description': description, 'rating': rating, 'price': price
+    }
+
+
+def test_tokenize_chinese_bigrams_and_single_chars():
+    assert tokenize('红楼梦') == ['红', '楼', '梦', '红楼', '楼梦']
+    # 查询时只输出二元组
+    assert tokenize('红楼梦', for_query=True) == ['红楼', '楼梦']
+    # 单个汉字在查询时保留
+    assert tokenize('史', for_query=True) == ['史']
+
+
+def test_tokenize_latin_words_normalized():
+    # 全角字符转半角并转为小写，标点被丢弃
+    assert tokenize('Ｐｙｔｈｏｎ编程: Hello-World 3') == ['python', '编', '程', '编程', 'hello', 'world', '3']
+    assert tokenize('') == []
+    assert tokenize(None) == []
+
+
+def test_title_match_ranks_above_description_match():
+    index = BookSearchIndex()
+    index.rebuild([
+        make_book(1, '数据结构', description='讲解python实现'),
+        make_book(2, 'Python编程'),
+        make_book(3, '算法导论'),
+    ])
+    total, books = index.search('python')
+    assert total == 2
+    assert [book['id'] for book in books] == [2, 1]
+
+
+def test_all_query_terms_must_match():
+    index = BookSearchIndex()
+    index.rebuild([
+        make_book(1, '红楼梦', author='曹雪芹'),
+        make_book(2, '红色警戒'),
+        make_book(3, '梦的解析'),
+    ])
+    assert set(index.match('红楼梦')) == {1}
+    assert set(index.match('曹雪芹 红楼')) == {1}
+    assert index.match('！！') == {}
+
+
+def test_latin_prefix_expansion():
+    index = BookSearchIndex()
+    index.rebuild([make_book(1, 'Python Cookbook'), make_book(2, 'Java in Action')])
+    assert set(index.match('pyth')) == {1}
+
+
+def test_ties_ordered_by_rating_then_title():
+    index = BookSearchIndex()
+    index.rebuild([
+        make_book(1, 'B 小说', rating=4.0),
+        make_book(2, 'A 小说', rating=4.0),
+        make_book(3, 'C 小说', rating=4.8),
+    ])
+    _, books = index.search('小说')
+    assert [book['id'] for book in books] == [3, 2, 1]
+
+
+def test_limit_offset_and_category_filter():
+    index = BookSearchIndex()
+    index.rebuild([make_book(i, f'小说{i}', category='文学' if i % 2 else '历史', rating=i) for i in range(1, 7)])
+    total, books = index.search('小说', limit=2, offset=1)
+    assert total == 6
+    assert [book['id'] for book in books] == [5, 4]
+    total, books = index.search('小说', category='历史')
+    assert total == 3
+    assert [book['id'] for book in books] == [6, 4, 2]
+
+
+def test_upsert_and_remove_update_postings():
+    index = BookSearchIndex()
+    index.rebuild([make_book(1, '红楼梦'), make_book(2, '西游记')])
+    index.upsert(make_book(1, '水浒传'))
+    assert index.match('红楼') == {}
+    assert set(index.match('水浒')) == {1}
+    index.remove(2)
+    assert len(index) == 1
+    assert index.match('西游') == {}
+
+
+def test_facets_count_categories_before_filter():
+    index = BookSearchIndex()
+    index.rebuild([
+        make_book(1, '小说甲', category='文学', price=20, rating=4.6),
+        make_book(2, '小说乙', category='历史', price=80, rating=3.5),
+    ])
+    counter = FacetCounter()
+    total, _ = index.search('小说', category='文学', facet_counter=counter)
+    facets = counter.to_dict()
+    assert total == 1
+    assert {item['name']: item['count'] for item in facets['category']} == {'文学': 1, '历史': 1}
+    assert [band['count'] for band in facets['price']] == [1, 0, 0, 0]
+    assert [band['count'] for band in facets['rating']] == [1, 0, 0, 0]
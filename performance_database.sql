@@ -0,0 +1,151 @@
+-- ============================================
+-- 性能优化数据库脚本（索引及辅助表）
+-- 执行方式: mysql -u root -p bookstore_management_system < performance_database.sql
+-- 可以重复执行：表使用 CREATE TABLE IF NOT EXISTS，索引和列通过下面的辅助过程在不存在时才添加
+-- ============================================
+
+USE bookstore_management_system;
+
+-- 辅助过程：索引或列不存在时才执行 ALTER TABLE（脚本末尾删除）
+DELIMITER //
+DROP PROCEDURE IF EXISTS add_index_if_missing //
+CREATE PROCEDURE add_index_if_missing(IN p_table VARCHAR(64), IN p_index VARCHAR(64), IN p_definition TEXT)
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = p_table AND INDEX_NAME = p_index
+    ) THEN
+        SET @ddl = CONCAT('ALTER TABLE ', p_table, ' ADD ', p_definition);
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END //
+DROP PROCEDURE IF EXISTS add_column_if_missing //
+CREATE PROCEDURE add_column_if_missing(IN p_table VARCHAR(64), IN p_column VARCHAR(64), IN p_definition TEXT)
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = p_table AND COLUMN_NAME = p_column
+    ) THEN
+        SET @ddl = CONCAT('ALTER TABLE ', p_table, ' ADD COLUMN ', p_definition);
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END //
+DELIMITER ;
+
+-- 1. 图书列表游标分页索引 - 支持 ORDER BY created_at DESC, id DESC 的分页查询
+CALL add_index_if_missing('books', 'idx_created_at_id', 'INDEX idx_created_at_id (created_at, id)');
+
+-- 2. 图书全文索引 - 供 SEARCH_BACKEND=fulltext 使用（需 MySQL 5.7.6+ 的 ngram 分词器）
+--    也可以通过命令创建: flask --app app create-fulltext-index
+CALL add_index_if_missing('books', 'ft_books_text',
+    'FULLTEXT INDEX ft_books_text (title, author, description) WITH PARSER ngram');
+
+-- 3. 统计计数器表 - 用户/图书/订单总数和金额由写操作在同一事务中增量维护，统计接口不再扫描全表
+--    创建后执行 flask --app app reconcile-counters 初始化计数（之后也可定期执行以校正偏差）
+CREATE TABLE IF NOT EXISTS stats_counters (
+    name VARCHAR(64) PRIMARY KEY COMMENT '计数器名称',
+    value DECIMAL(20, 2) NOT NULL DEFAULT 0 COMMENT '计数值',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='统计计数器表';
+
+-- 4. 用户订单统计表 - 个人中心的订单数、已完成订单数和消费金额
+CREATE TABLE IF NOT EXISTS user_order_stats (
+    user_id INT PRIMARY KEY COMMENT '用户ID',
+    total_orders INT NOT NULL DEFAULT 0 COMMENT '订单总数',
+    completed_orders INT NOT NULL DEFAULT 0 COMMENT '已完成订单数',
+    total_spent DECIMAL(12, 2) NOT NULL DEFAULT 0 COMMENT '消费总额（不含已取消订单）'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='用户订单统计表';
+
+-- 5. 图书评分聚合表 - 评论数、评分总和和1-5星数量由评论写操作在同一事务中增量维护，books.rating 由其得出
+--    创建后执行 flask --app app rebuild-rating-stats 按已有评论初始化
+CREATE TABLE IF NOT EXISTS book_rating_stats (
+    book_id INT PRIMARY KEY COMMENT '图书ID',
+    review_count INT NOT NULL DEFAULT 0 COMMENT '评论数',
+    rating_sum INT NOT NULL DEFAULT 0 COMMENT '评分总和',
+    stars_1 INT NOT NULL DEFAULT 0 COMMENT '1星数量',
+    stars_2 INT NOT NULL DEFAULT 0 COMMENT '2星数量',
+    stars_3 INT NOT NULL DEFAULT 0 COMMENT '3星数量',
+    stars_4 INT NOT NULL DEFAULT 0 COMMENT '4星数量',
+    stars_5 INT NOT NULL DEFAULT 0 COMMENT '5星数量',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+    FOREIGN KEY (book_id) REFERENCES books(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='图书评分聚合表';
+
+-- 6. 评论列表游标分页索引 - 支持按图书 ORDER BY created_at DESC, id DESC 的分页查询
+CALL add_index_if_missing('reviews', 'idx_book_created_at_id', 'INDEX idx_book_created_at_id (book_id, created_at, id)');
+
+-- 7. 热门图书改由 GET /api/books/popular 从内存排行榜提供（按评分、评论数和近期销量排序，增量更新），
+--    不再需要每次查询都对评论表 GROUP BY 的 v_popular_books 视图
+DROP VIEW IF EXISTS v_popular_books;
+
+-- 8. 共同购买推荐表 - 每本图书的前K个共同购买邻居，按 (book_id, position) 主键顺序读取
+--    由 flask --app app build-co-purchases 整表重算（可加入定时任务）
+CREATE TABLE IF NOT EXISTS book_co_purchases (
+    book_id INT NOT NULL COMMENT '图书ID',
+    position SMALLINT NOT NULL COMMENT '排名（从1开始）',
+    neighbour_id INT NOT NULL COMMENT '推荐图书ID',
+    co_count INT NOT NULL COMMENT '共同出现的订单数',
+    score DOUBLE NOT NULL COMMENT '相似度',
+    PRIMARY KEY (book_id, position)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='共同购买推荐表';
+
+-- 9. 相似图书表 - 按书名、作者、分类和描述的 TF-IDF 余弦相似度保存每本图书的前K本相似图书
+--    由 flask --app app build-book-similarities 整体重算，修改图书的文字字段后增量更新
+CREATE TABLE IF NOT EXISTS book_similarity_terms (
+    term VARCHAR(64) NOT NULL PRIMARY KEY COMMENT '词（中文二元组或拉丁文单词）',
+    idf DOUBLE NULL COMMENT '逆文档频率（高频词为NULL，不参与计算）',
+    INDEX idx_idf (idf)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_bin COMMENT='相似图书词表';
+
+CREATE TABLE IF NOT EXISTS book_tfidf_vectors (
+    book_id INT NOT NULL COMMENT '图书ID',
+    term VARCHAR(64) NOT NULL COMMENT '词',
+    weight DOUBLE NOT NULL COMMENT '归一化后的TF-IDF权重',
+    PRIMARY KEY (book_id, term),
+    INDEX idx_term_book (term, book_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_bin COMMENT='图书TF-IDF向量表';
+
+CREATE TABLE IF NOT EXISTS book_similarities (
+    book_id INT NOT NULL COMMENT '图书ID',
+    position SMALLINT NOT NULL COMMENT '排名（从1开始）',
+    neighbour_id INT NOT NULL COMMENT '相似图书ID',
+    score DOUBLE NOT NULL COMMENT '余弦相似度',
+    PRIMARY KEY (book_id, position),
+    INDEX idx_neighbour (neighbour_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='相似图书表';
+
+-- 10. 销售汇总表 - 按天/小时、以图书/分类/全部订单为维度的销售额、销量和订单数，供 /api/analytics/sales 使用
+--     下单、取消订单时在同一事务中增量更新；创建后执行 flask --app app backfill-sales-rollups 按已有订单回填
+CREATE TABLE IF NOT EXISTS sales_rollups (
+    granularity ENUM('day', 'hour') NOT NULL COMMENT '时间粒度',
+    period_start DATETIME NOT NULL COMMENT '时间段开始',
+    dimension ENUM('book', 'category', 'all') NOT NULL COMMENT '维度',
+    dimension_id INT NOT NULL DEFAULT 0 COMMENT '图书ID或分类ID（全部订单为0）',
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0 COMMENT '销售额',
+    units INT NOT NULL DEFAULT 0 COMMENT '销量',
+    order_count INT NOT NULL DEFAULT 0 COMMENT '订单数',
+    PRIMARY KEY (granularity, dimension, period_start, dimension_id),
+    INDEX idx_period_start (period_start)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='销售汇总表';
+
+-- 11. 订单明细记录下单时的图书分类 - 销售汇总的分类维度按该分类计入和扣减，图书之后改分类不会让原分类的销售额无法扣回
+--     已有明细按图书当前分类补齐（应在执行 backfill-sales-rollups 之前执行）
+CALL add_column_if_missing('order_items', 'category_id',
+    'category_id INT NULL COMMENT ''下单时图书所属分类ID'' AFTER book_id');
+UPDATE order_items oi
+JOIN books b ON oi.book_id = b.id
+SET oi.category_id = b.category_id
+WHERE oi.category_id IS NULL;
+
+DROP PROCEDURE IF EXISTS add_index_if_missing;
+DROP PROCEDURE IF EXISTS add_column_if_missing;
+
+-- 显示创建结果
+SELECT '性能优化索引已创建！' AS result;
+
+-- 查看索引
+SHOW INDEX FROM books;
@@ -0,0 +1,49 @@
+import axiosInstance from './axiosInstance'
+
+// 销售统计分组方式
+export type SalesGroupBy = 'day' | 'hour' | 'category' | 'book'
+
+// 销售统计参数（日期格式 YYYY-MM-DD，包含结束日期；默认最近30天）
+export interface SalesAnalyticsParams {
+  from?: string
+  to?: string
+  group_by?: SalesGroupBy
+  limit?: number  // 按图书分组时返回的图书数
+}
+
+// 销售统计行：按天/小时分组时带 period，按分类带 category_id/category，按图书带 book_id/title/author
+export interface SalesRow {
+  period?: string
+  category_id?: number
+  category?: string | null
+  book_id?: number
+  title?: string | null
+  author?: string | null
+  revenue: number
+  units: number
+  order_count: number
+}
+
+// 销售统计响应接口
+export interface SalesAnalyticsResponse {
+  from: string
+  to: string
+  group_by: SalesGroupBy
+  rows: SalesRow[]
+  totals: {
+    revenue: number
+    units: number
+    order_count: number
+  }
+}
+
+// 获取销售统计（读取预先汇总的数据，不扫描订单明细）
+export const getSalesAnalytics = async (params: SalesAnalyticsParams = {}): Promise<SalesAnalyticsResponse> => {
+  try {
+    const response = await axiosInstance.get('/analytics/sales', { params })
+    return response.data
+  } catch (error) {
+    console.error('获取销售统计失败:', error)
+    throw error
+  }
+}
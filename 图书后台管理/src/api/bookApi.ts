@@ -114,12 +114,40 @@ export const deleteBook = async (id: number): Promise<void> => {
 export interface LowStockResponse {
   books: Book[]
   total: number
+  threshold: number
 }
 
-// 获取低库存图书（库存低于20本的图书）
-export const getLowStockBooks = async (): Promise<LowStockResponse> => {
+// 低库存提醒事件（snapshot 为连接后的首条全量数据）
+export type LowStockEventType = 'snapshot' | 'low_stock' | 'stock_update' | 'restocked' | 'removed'
+
+export interface LowStockEvent {
+  type: LowStockEventType
+  total: number
+  threshold: number
+  book?: Book
+  books?: Book[]
+}
+
+// 订阅低库存提醒（SSE），返回的 EventSource 需要在组件卸载时关闭
+export const subscribeLowStock = (onEvent: (event: LowStockEvent) => void): EventSource => {
+  const source = new EventSource('/api/books/low-stock/stream')
+  const eventTypes: LowStockEventType[] = ['snapshot', 'low_stock', 'stock_update', 'restocked', 'removed']
+  eventTypes.forEach(type => {
+    source.addEventListener(type, (message: MessageEvent) => {
+      onEvent({ ...JSON.parse(message.data), type })
+    })
+  })
+  source.onerror = (error) => {
+    // 浏览器会按服务端的 retry 间隔自动重连
+    console.error('低库存提醒连接中断:', error)
+  }
+  return source
+}
+
+// 获取低库存图书（默认为库存低于阈值的图书；mode 为 demand 时按销售速度返回可售天数不超过补货周期的图书）
+export const getLowStockBooks = async (mode?: 'threshold' | 'demand'): Promise<LowStockResponse> => {
   try {
-    const response = await axiosInstance.get('/books/low-stock')
+    const response = await axiosInstance.get('/books/low-stock', { params: { mode } })
     return response.data
   } catch (error) {
     console.error('获取低库存图书失败:', error)
@@ -127,6 +155,37 @@ export const getLowStockBooks = async (): Promise<LowStockResponse> => {
   }
 }
 
+// 补货预测（日需求取移动平均和指数平滑中较大的一个，days_of_cover 为按日需求估算的可售天数）
+export interface RestockSuggestion extends Book {
+  moving_average: number
+  smoothed_demand: number
+  daily_demand: number
+  days_of_cover: number | null
+  needs_restock: boolean
+  suggested_quantity: number
+}
+
+// 补货建议响应接口
+export interface RestockSuggestionsResponse {
+  books: RestockSuggestion[]
+  total: number
+  lead_time_days: number
+  target_days: number
+  history_days: number
+  generated_at: string
+}
+
+// 获取补货建议（all 为 true 时返回全部在售图书的预测）
+export const getRestockSuggestions = async (limit: number = 50, all: boolean = false): Promise<RestockSuggestionsResponse> => {
+  try {
+    const response = await axiosInstance.get('/books/restock-suggestions', { params: { limit, all: all ? 1 : undefined } })
+    return response.data
+  } catch (error) {
+    console.error('获取补货建议失败:', error)
+    throw error
+  }
+}
+
 // 获取所有图书类别
 export const getAllCategories = async (): Promise<Category[]> => {
   try {
@@ -0,0 +1,38 @@
+import axiosInstance from './axiosInstance'
+import type { UsersCountResponse } from './userApi'
+import type { Book, BooksCountResponse } from './bookApi'
+
+// 首页图书统计（total/totalStock 为可用状态图书）
+export interface DashboardBooks extends BooksCountResponse {
+  all: number
+  allStock: number
+  unavailable: number
+}
+
+// 首页统计响应接口
+export interface DashboardResponse {
+  users: UsersCountResponse
+  books: DashboardBooks
+  low_stock: {
+    total: number
+    threshold: number
+    books: Book[]
+  }
+  orders: {
+    total: number
+    amount: number
+    by_status: Record<string, number>
+  }
+  generated_at: string
+}
+
+// 获取管理后台首页统计（用户、图书、低库存、订单，一次请求）
+export const getDashboard = async (): Promise<DashboardResponse> => {
+  try {
+    const response = await axiosInstance.get('/admin/dashboard')
+    return response.data
+  } catch (error) {
+    console.error('获取首页统计失败:', error)
+    throw error
+  }
+}
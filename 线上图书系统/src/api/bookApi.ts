@@ -25,10 +25,15 @@ export interface Category {
   description?: string
 }
 
-// 获取所有图书
-export const getAllBooks = async (): Promise<Book[]> => {
+// 图书卡片（网格视图）只需要的字段，配合 fields 参数减少响应体积
+export const BOOK_CARD_FIELDS = ['id', 'title', 'author', 'category', 'price', 'rating', 'image']
+
+// 获取所有图书（fields 指定时只返回这些字段）
+export const getAllBooks = async (fields?: string[]): Promise<Book[]> => {
   try {
-    const response = await axiosInstance.get('/books')
+    const response = await axiosInstance.get('/books', {
+      params: fields ? { fields: fields.join(',') } : undefined
+    })
     // 检查响应格式并返回图书数据
     if (response && response.data && Array.isArray(response.data.books)) {
       return response.data.books
@@ -40,6 +45,37 @@ export const getAllBooks = async (): Promise<Book[]> => {
   }
 }
 
+// 分页图书列表参数接口
+export interface BooksPageParams {
+  limit?: number   // 每页数量
+  cursor?: string  // 上一页返回的 next_cursor
+  fields?: string  // 只返回的字段，逗号分隔
+}
+
+// 分页图书列表响应接口
+export interface BooksPage {
+  books: Book[]
+  limit: number
+  has_more: boolean
+  next_cursor: string | null
+}
+
+// 分页获取图书（按上架时间倒序，游标分页）
+export const getBooksPage = async (params: BooksPageParams = {}): Promise<BooksPage> => {
+  try {
+    const response = await axiosInstance.get('/books', {
+      params: { limit: params.limit ?? 20, cursor: params.cursor, fields: params.fields }
+    })
+    if (response && response.data && Array.isArray(response.data.books)) {
+      return response.data
+    }
+    return { books: [], limit: params.limit ?? 20, has_more: false, next_cursor: null }
+  } catch (error) {
+    console.error('分页获取图书列表失败:', error)
+    throw error
+  }
+}
+
 // 根据ID获取图书详情
 export const getBookById = async (id: number): Promise<Book | null> => {
   try {
@@ -54,6 +90,20 @@ export const getBookById = async (id: number): Promise<Book | null> => {
   }
 }
 
+// 批量获取图书（一次请求，返回以图书ID为键的结果，不存在的图书为 null）
+export const getBooksByIds = async (ids: number[]): Promise<Record<number, Book | null>> => {
+  try {
+    const response = await axiosInstance.post('/books/batch', { ids })
+    if (response && response.data && response.data.books) {
+      return response.data.books
+    }
+    return {}
+  } catch (error) {
+    console.error('批量获取图书失败:', error)
+    throw error
+  }
+}
+
 // 获取所有分类
 export const getAllCategories = async (): Promise<Category[]> => {
   try {
@@ -68,10 +118,37 @@ export const getAllCategories = async (): Promise<Category[]> => {
   }
 }
 
+// 搜索建议接口
+export interface Suggestion {
+  text: string
+  type: 'title' | 'author' | 'category'
+  weight: number
+  book_id?: number
+}
+
+// 获取搜索建议（输入联想）
+export const getSuggestions = async (q: string, limit: number = 8): Promise<Suggestion[]> => {
+  try {
+    const response = await axiosInstance.get('/books/suggest', {
+      params: { q, limit }
+    })
+    if (response && response.data && Array.isArray(response.data.suggestions)) {
+      return response.data.suggestions
+    }
+    return []
+  } catch (error) {
+    console.error('获取搜索建议失败:', error)
+    throw error
+  }
+}
+
 // 搜索图书参数接口
 export interface SearchBooksParams {
   q?: string        // 搜索关键词
   category?: string // 分类筛选
+  limit?: number    // 每页数量（不传则返回全部结果）
+  offset?: number   // 偏移量
+  fields?: string   // 只返回的字段，逗号分隔
 }
 
 // 搜索图书
@@ -89,3 +166,177 @@ export const searchBooks = async (params: SearchBooksParams): Promise<Book[]> =>
     throw error
   }
 }
+
+// 分面统计区间
+export interface FacetBand {
+  label: string
+  min: number | null
+  max: number | null
+  count: number
+}
+
+// 搜索分面统计
+export interface SearchFacets {
+  category: { name: string | null; count: number }[]
+  price: FacetBand[]
+  rating: FacetBand[]
+}
+
+// 带分面统计的搜索结果
+export interface SearchBooksResult {
+  books: Book[]
+  total: number
+  facets: SearchFacets
+}
+
+// 搜索图书并同时返回分类、价格、评分的分面统计（一次请求即可构建筛选项）
+export const searchBooksWithFacets = async (params: SearchBooksParams): Promise<SearchBooksResult> => {
+  try {
+    const response = await axiosInstance.get('/books/search', {
+      params: { ...params, facets: 1 }
+    })
+    if (response && response.data && Array.isArray(response.data.books)) {
+      return response.data
+    }
+    return { books: [], total: 0, facets: { category: [], price: [], rating: [] } }
+  } catch (error) {
+    console.error('搜索图书失败:', error)
+    throw error
+  }
+}
+
+// 图书评论接口
+export interface Review {
+  id: number
+  user_id: number
+  username: string | null
+  rating: number
+  comment: string | null
+  created_at: string
+}
+
+// 评分汇总（histogram 以星级 1-5 为键）
+export interface RatingSummary {
+  count: number
+  average: number
+  histogram: Record<string, number>
+}
+
+// 分页评论列表响应接口
+export interface ReviewsPage {
+  reviews: Review[]
+  rating: RatingSummary
+  limit: number
+  has_more: boolean
+  next_cursor: string | null
+}
+
+// 分页获取图书评论（按发表时间倒序，游标分页），同时返回评分汇总
+export const getBookReviews = async (bookId: number, params: { limit?: number; cursor?: string } = {}): Promise<ReviewsPage> => {
+  try {
+    const response = await axiosInstance.get(`/books/${bookId}/reviews`, {
+      params: { limit: params.limit ?? 10, cursor: params.cursor }
+    })
+    if (response && response.data && Array.isArray(response.data.reviews)) {
+      return response.data
+    }
+    return {
+      reviews: [],
+      rating: { count: 0, average: 0, histogram: {} },
+      limit: params.limit ?? 10,
+      has_more: false,
+      next_cursor: null
+    }
+  } catch (error) {
+    console.error('获取图书评论失败:', error)
+    throw error
+  }
+}
+
+// 发表评论（评分为1-5的整数），返回更新后的评分汇总
+export const createReview = async (bookId: number, userId: number, rating: number, comment?: string): Promise<RatingSummary | null> => {
+  try {
+    const response = await axiosInstance.post(`/books/${bookId}/reviews`, { user_id: userId, rating, comment })
+    if (response && response.code === 200 && response.data) {
+      return response.data.rating
+    }
+    return null
+  } catch (error) {
+    console.error('发表评论失败:', error)
+    throw error
+  }
+}
+
+// 删除自己的评论，返回更新后的评分汇总
+export const deleteReview = async (reviewId: number, userId: number): Promise<RatingSummary | null> => {
+  try {
+    const response = await axiosInstance.delete(`/reviews/${reviewId}`, { params: { user_id: userId } })
+    if (response && response.code === 200 && response.data) {
+      return response.data.rating
+    }
+    return null
+  } catch (error) {
+    console.error('删除评论失败:', error)
+    throw error
+  }
+}
+
+// 热门图书（排行榜条目在图书基本信息外带有评论数、近期销量和热度）
+export interface PopularBook extends Pick<Book, 'id' | 'title' | 'author' | 'category' | 'price' | 'image' | 'rating'> {
+  review_count: number
+  recent_sales: number
+  score: number
+}
+
+// 获取热门图书排行榜（不传分类时为全站排行）
+export const getPopularBooks = async (category?: string, limit: number = 10): Promise<PopularBook[]> => {
+  try {
+    const response = await axiosInstance.get('/books/popular', { params: { category, limit } })
+    if (response && response.data && Array.isArray(response.data.books)) {
+      return response.data.books
+    }
+    return []
+  } catch (error) {
+    console.error('获取热门图书失败:', error)
+    throw error
+  }
+}
+
+// 共同购买推荐（co_count 为共同出现的订单数，score 为相似度）
+export interface AlsoBoughtBook extends Pick<Book, 'id' | 'title' | 'author' | 'price' | 'image' | 'rating'> {
+  co_count: number
+  score: number
+}
+
+// 获取"买了这本书的人还买了"推荐
+export const getAlsoBoughtBooks = async (bookId: number, limit: number = 10): Promise<AlsoBoughtBook[]> => {
+  try {
+    const response = await axiosInstance.get(`/books/${bookId}/also-bought`, { params: { limit } })
+    if (response && response.data && Array.isArray(response.data.books)) {
+      return response.data.books
+    }
+    return []
+  } catch (error) {
+    console.error('获取推荐图书失败:', error)
+    throw error
+  }
+}
+
+// 内容相似的图书（score 为余弦相似度）
+export interface SimilarBook extends Pick<Book, 'id' | 'title' | 'author' | 'category' | 'price' | 'image' | 'rating'> {
+  score: number
+}
+
+// 获取内容相似的图书（按书名、作者、分类和描述计算）
+export const getSimilarBooks = async (bookId: number, limit: number = 10): Promise<SimilarBook[]> => {
+  try {
+    const response = await axiosInstance.get(`/books/${bookId}/similar`, { params: { limit } })
+    if (response && response.data && Array.isArray(response.data.books)) {
+      return response.data.books
+    }
+    return []
+  } catch (error) {
+    console.error('获取相似图书失败:', error)
+    throw error
+  }
+}
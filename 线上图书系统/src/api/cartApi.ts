@@ -84,3 +84,28 @@ export const clearCart = async (userId: number): Promise<void> => {
     throw error
   }
 }
+
+// 购物车批量操作（update/remove 可用 book_id 或 cart_id 指定购物车项）
+export interface CartOperation {
+  op: 'add' | 'update' | 'remove'
+  book_id?: number
+  cart_id?: number
+  quantity?: number
+}
+
+// 批量修改购物车（一个事务，任一操作失败时全部不生效），返回修改后的购物车
+export const batchUpdateCart = async (userId: number, operations: CartOperation[]): Promise<CartResponse> => {
+  try {
+    const response = await axiosInstance.post('/cart/batch', {
+      user_id: userId,
+      operations
+    })
+    if (response && response.data) {
+      return response.data
+    }
+    return { items: [], total: 0 }
+  } catch (error) {
+    console.error('批量更新购物车失败:', error)
+    throw error
+  }
+}